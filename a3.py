@@ -1,23 +1,38 @@
 #  for assignment 3
 
 from graph import Graph
+from csr import FrozenGraph
+from pqueue import make_queue
+from heuristics import goal_estimates
+from operator import itemgetter
 import heapq
+import weakref
+import instrument
 
-def dijkstra(g : Graph, start_vertex, goal_vertex): # complexity : O((V+E)logE)
+_stats = itemgetter(2)  # the stats dict of a (path, cost, stats) result
+_reverse_indexes = weakref.WeakKeyDictionary()  # graph -> (version, reverse index) for graphs that keep none
+
+@instrument.instrumented("dijkstra", _stats)
+def dijkstra(g : Graph, start_vertex, goal_vertex, pq="binary"): # complexity : O((V+E)logE)
+    # pq picks the priority queue backend, see pqueue.QUEUES
     if start_vertex not in g.list_of_neighbours:
         raise ValueError("Start vertex not in graph")
+
+    if isinstance(g, FrozenGraph):
+        return _dijkstra_frozen(g, start_vertex, goal_vertex, pq)
     
     stats = {"cost_calls": 0, "pq_pushes": 0, "pq_pops": 0}
     
     distances = {v : float('inf') for v in g.list_of_neighbours}
     distances[start_vertex] = 0
     
-    priority_queue = [(0, start_vertex)] # (distance, vertex)
+    priority_queue = make_queue(pq)
+    priority_queue.push(start_vertex, 0)
     
     came_from = {}
     
     while priority_queue:
-        current_distance, current_vertex = heapq.heappop(priority_queue)
+        current_distance, current_vertex = priority_queue.pop()
         stats["pq_pops"] += 1
         
         if current_distance > distances[current_vertex]:
@@ -29,7 +44,7 @@ def dijkstra(g : Graph, start_vertex, goal_vertex): # complexity : O((V+E)logE)
                 path.append(current_vertex)
                 current_vertex = came_from[current_vertex]
             path.append(start_vertex)
-            return path[::-1], distances[goal_vertex], stats
+            return path[::-1], distances[goal_vertex], _queue_stats(stats, priority_queue)
         
         for neighbour in g.list_of_neighbours[current_vertex]:
             nb, weight = (neighbour[0], neighbour[1]) if g.weighted else (neighbour, 1)
@@ -40,32 +55,52 @@ def dijkstra(g : Graph, start_vertex, goal_vertex): # complexity : O((V+E)logE)
             if distance < distances[nb]:
                 came_from[nb] = current_vertex
                 distances[nb] = distance
-                heapq.heappush(priority_queue, (distance, nb))
+                priority_queue.push(nb, distance)
                 stats["pq_pushes"] += 1
     
-    return None, float('inf'), stats # If goal is unreachable
+    return None, float('inf'), _queue_stats(stats, priority_queue) # If goal is unreachable
+
 
+def _queue_stats(stats, queue):
+    # backends with a real decrease-key also report how many pushes only lowered an existing key
+    if queue.decrease_key:
+        stats["pq_decrease_keys"] = queue.decrease_keys
+    return stats
 
 
-def a_star(g: Graph, start_vertex, goal_vertex): # O(ElogV)
+
+@instrument.instrumented("a_star", _stats)
+def a_star(g: Graph, start_vertex, goal_vertex, heuristic=None, pq="binary", precompute=False): # O(ElogV)
+    # heuristic(v, goal) must never overestimate, or a name from heuristics.METRICS measured between positions;
+    # defaults to "euclidean". Each vertex is estimated at most once per query, or all at once with precompute
     if start_vertex not in g.list_of_neighbours or goal_vertex not in g.list_of_neighbours:
         raise ValueError("Start or goal vertex not in graph")
 
+    if heuristic is None:
+        heuristic = "euclidean"
+
+    if isinstance(g, FrozenGraph):
+        h = goal_estimates(g, goal_vertex, heuristic, by_id=True, precompute=precompute)
+        return _a_star_frozen(g, start_vertex, goal_vertex, h, pq)
+
+    h = goal_estimates(g, goal_vertex, heuristic, precompute=precompute)
+
     stats = {"cost_calls": 0, "pq_pushes": 0, "pq_pops": 0}
 
-    open_set = [(0, start_vertex)]
+    open_set = make_queue(pq)
+    open_set.push(start_vertex, 0)
     came_from = {}
 
     g_score = {v: float('inf') for v in g.list_of_neighbours}
     f_score = {v: float('inf') for v in g.list_of_neighbours}
 
     g_score[start_vertex] = 0
-    f_score[start_vertex] = g.euclidean_distance(start_vertex, goal_vertex)
+    f_score[start_vertex] = h[start_vertex]
 
     visited = set()
 
     while open_set:
-        _, current = heapq.heappop(open_set)
+        _, current = open_set.pop()
         stats["pq_pops"] += 1
 
         if current == goal_vertex:
@@ -74,7 +109,7 @@ def a_star(g: Graph, start_vertex, goal_vertex): # O(ElogV)
                 path.append(current)
                 current = came_from[current]
             path.append(start_vertex)
-            return path[::-1], g_score[goal_vertex], stats
+            return path[::-1], g_score[goal_vertex], _queue_stats(stats, open_set)
 
         visited.add(current)
 
@@ -87,9 +122,227 @@ def a_star(g: Graph, start_vertex, goal_vertex): # O(ElogV)
             if tentative_g_score < g_score[nb]:
                 came_from[nb] = current
                 g_score[nb] = tentative_g_score
-                f_score[nb] = tentative_g_score + g.euclidean_distance(nb, goal_vertex)
+                f_score[nb] = tentative_g_score + h[nb]
                 if nb not in visited:
-                    heapq.heappush(open_set, (f_score[nb], nb))
+                    open_set.push(nb, f_score[nb])
                     stats["pq_pushes"] += 1
 
-    return None, float('inf'), stats  # If goal is unreachable
+    return None, float('inf'), _queue_stats(stats, open_set)  # If goal is unreachable
+
+
+# integer-id kernels over the CSR buffers of a FrozenGraph
+
+def _csr_path(g : FrozenGraph, came_from, source, target):
+    path = [target]
+    while path[-1] != source:
+        path.append(came_from[path[-1]])
+    return [g.labels[u] for u in reversed(path)]
+
+
+def _dijkstra_frozen(g : FrozenGraph, start_vertex, goal_vertex, pq): # O((V+E)logE)
+    stats = {"cost_calls": 0, "pq_pushes": 0, "pq_pops": 0}
+
+    offsets, targets, weights = g.offsets, g.targets, g.weights
+    source = g.ids[start_vertex]
+    goal = g.ids.get(goal_vertex, -1)
+
+    inf = float('inf')
+    distances = [inf] * g.get_v()
+    distances[source] = 0
+    came_from = [-1] * g.get_v()
+
+    priority_queue = make_queue(pq)
+    priority_queue.push(source, 0)
+
+    while priority_queue:
+        current_distance, u = priority_queue.pop()
+        stats["pq_pops"] += 1
+
+        if current_distance > distances[u]:
+            continue
+
+        if u == goal:
+            return _csr_path(g, came_from, source, goal), current_distance, _queue_stats(stats, priority_queue)
+
+        for i in range(offsets[u], offsets[u + 1]):
+            nb = targets[i]
+            stats["cost_calls"] += 1
+
+            distance = current_distance + (weights[i] if weights is not None else 1)
+
+            if distance < distances[nb]:
+                came_from[nb] = u
+                distances[nb] = distance
+                priority_queue.push(nb, distance)
+                stats["pq_pushes"] += 1
+
+    return None, inf, _queue_stats(stats, priority_queue)
+
+
+def _a_star_frozen(g : FrozenGraph, start_vertex, goal_vertex, h, pq): # O(ElogV)
+    # h[u] is the estimate for id u, see heuristics.goal_estimates
+    stats = {"cost_calls": 0, "pq_pushes": 0, "pq_pops": 0}
+
+    offsets, targets, weights = g.offsets, g.targets, g.weights
+    source = g.ids[start_vertex]
+    goal = g.ids[goal_vertex]
+
+    inf = float('inf')
+    g_score = [inf] * g.get_v()
+    g_score[source] = 0
+    came_from = [-1] * g.get_v()
+    visited = bytearray(g.get_v())
+
+    open_set = make_queue(pq)
+    open_set.push(source, 0)
+
+    while open_set:
+        _, u = open_set.pop()
+        stats["pq_pops"] += 1
+
+        if u == goal:
+            return _csr_path(g, came_from, source, goal), g_score[goal], _queue_stats(stats, open_set)
+
+        visited[u] = 1
+
+        for i in range(offsets[u], offsets[u + 1]):
+            nb = targets[i]
+            stats["cost_calls"] += 1
+
+            tentative_g_score = g_score[u] + (weights[i] if weights is not None else 1)
+
+            if tentative_g_score < g_score[nb]:
+                came_from[nb] = u
+                g_score[nb] = tentative_g_score
+                if not visited[nb]:
+                    f = tentative_g_score + h[nb]
+                    open_set.push(nb, f)
+                    stats["pq_pushes"] += 1
+
+    return None, inf, _queue_stats(stats, open_set)
+
+
+# bidirectional search: forward from the start, backward from the goal over reverse edges
+
+def _reverse_index(g : Graph): # Theta(V+E) once per graph version, Theta(1) after
+    # the graph's own maintained index, or one built here and kept until the graph changes
+    reverse_index = getattr(g, "reverse_index", None)
+    if reverse_index is not None:
+        return reverse_index
+    version = getattr(g, "version", 0)  # a FrozenGraph never changes
+    cached = _reverse_indexes.get(g)
+    if cached is None or cached[0] != version:
+        reverse_index = {v: {} for v in g.list_of_neighbours}
+        for u, edges in g.list_of_neighbours.items():
+            for e in edges:
+                if g.weighted:
+                    reverse_index[e[0]][u] = e[1]
+                else:
+                    reverse_index[e][u] = None
+        cached = _reverse_indexes[g] = (version, reverse_index)
+    return cached[1]
+
+
+def _edge_lists(g : Graph):
+    # returns (forward, backward) functions mapping a vertex to its out- and in-edges without copying them,
+    # (neighbour, weight) pairs when weighted and bare neighbours otherwise
+    forward = g.list_of_neighbours.__getitem__
+    if not g.directed:
+        return forward, forward
+
+    reverse_index = _reverse_index(g)
+    empty = {}  # vertices added since the index was built have no edges yet
+
+    if g.weighted:
+        return forward, lambda v: reverse_index.get(v, empty).items()
+    return forward, lambda v: reverse_index.get(v, empty)
+
+
+def _bidirectional(g : Graph, start_vertex, goal_vertex, potential): # O((V+E)logV)
+    # potential(v) is the forward potential, the backward search uses -potential(v);
+    # keys are distance + potential, so the search stops once top_f + top_b >= best path found
+    if start_vertex not in g.list_of_neighbours or goal_vertex not in g.list_of_neighbours:
+        raise ValueError("Start or goal vertex not in graph")
+
+    stats = {"cost_calls": 0, "pq_pushes": 0, "pq_pops": 0}
+    if start_vertex == goal_vertex:
+        return [start_vertex], 0, stats
+
+    forward, backward = _edge_lists(g)
+    weighted = g.weighted
+    sides = [
+        (forward, {start_vertex: 0}, {}, set(), [(potential(start_vertex), start_vertex)], 1),
+        (backward, {goal_vertex: 0}, {}, set(), [(-potential(goal_vertex), goal_vertex)], -1),
+    ]
+
+    best, meeting_vertex = float('inf'), None
+
+    while sides[0][4] and sides[1][4]:
+        if sides[0][4][0][0] + sides[1][4][0][0] >= best:
+            break
+
+        side = 0 if len(sides[0][4]) <= len(sides[1][4]) else 1
+        edges, distances, came_from, settled, queue, sign = sides[side]
+        other_distances = sides[1 - side][1]
+
+        _, u = heapq.heappop(queue)
+        stats["pq_pops"] += 1
+        if u in settled:
+            continue
+        settled.add(u)
+
+        for e in edges(u):
+            stats["cost_calls"] += 1
+            if weighted:
+                v, weight = e
+            else:
+                v, weight = e, 1
+            distance = distances[u] + weight
+
+            if distance < distances.get(v, float('inf')):
+                distances[v] = distance
+                came_from[v] = u
+                heapq.heappush(queue, (distance + sign * potential(v), v))
+                stats["pq_pushes"] += 1
+
+            if v in other_distances and distances[v] + other_distances[v] < best:
+                best = distances[v] + other_distances[v]
+                meeting_vertex = v
+
+    if meeting_vertex is None:
+        return None, float('inf'), stats
+
+    forward_came_from, backward_came_from = sides[0][2], sides[1][2]
+    path = [meeting_vertex]
+    while path[-1] != start_vertex:
+        path.append(forward_came_from[path[-1]])
+    path.reverse()
+    while path[-1] != goal_vertex:
+        path.append(backward_came_from[path[-1]])
+    return path, best, stats
+
+
+@instrument.instrumented("bidirectional_dijkstra", _stats)
+def bidirectional_dijkstra(g : Graph, start_vertex, goal_vertex): # O((V+E)logV)
+    return _bidirectional(g, start_vertex, goal_vertex, lambda v: 0)
+
+
+@instrument.instrumented("bidirectional_a_star", _stats)
+def bidirectional_a_star(g : Graph, start_vertex, goal_vertex, heuristic=None): # O((V+E)logV)
+    # average of the forward and backward estimates, which keeps both searches consistent;
+    # heuristic(u, v) bounds the distance from u to v, or names a symmetric metric, defaults to "euclidean"
+    if heuristic is None:
+        heuristic = "euclidean"
+    if start_vertex not in g.list_of_neighbours or goal_vertex not in g.list_of_neighbours:
+        raise ValueError("Start or goal vertex not in graph")
+
+    to_goal = goal_estimates(g, goal_vertex, heuristic)
+    if callable(heuristic):
+        from_start = goal_estimates(g, start_vertex, lambda v, start: heuristic(start, v))
+    else:
+        from_start = goal_estimates(g, start_vertex, heuristic)
+
+    def potential(v):
+        return (to_goal[v] - from_start[v]) / 2
+
+    return _bidirectional(g, start_vertex, goal_vertex, potential)
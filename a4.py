@@ -1,132 +1,186 @@
 from graph import Graph
-from collections import deque
-
-def topological_sort(graph : Graph):
-    in_degree = {v: 0 for v in graph.get_vertices()}
-
-    for u in graph.get_vertices():
-        for v in graph.neighbours(u):
-            v = v[0] if graph.weighted else v
-            in_degree[v] += 1
-
-    queue = deque([v for v in graph.get_vertices() if in_degree[v] == 0])
-    top_order = []
-    
-    while queue:
-        u = queue.popleft()
-        top_order.append(u)
-
-        for v in graph.neighbours(u):
-            v = v[0] if graph.weighted else v
+from csr import FrozenGraph
+from spt import ShortestPathTree
+import instrument
+
+def _frozen(graph : Graph):
+    return graph if isinstance(graph, FrozenGraph) else graph.freeze()
+
+def _topological_order(graph : FrozenGraph): # Theta(V+E)
+    # Kahn's algorithm over CSR ids, the order list doubles as the queue; None if there is a cycle
+    offsets, targets = graph.offsets, graph.targets
+    in_degree = [0] * graph.get_v()
+    for v in targets:
+        in_degree[v] += 1
+
+    order = [u for u in range(graph.get_v()) if in_degree[u] == 0]
+    for u in order:  # the list grows while it is walked
+        for i in range(offsets[u], offsets[u + 1]):
+            v = targets[i]
             in_degree[v] -= 1
-
             if in_degree[v] == 0:
-                queue.append(v)
-
+                order.append(v)
 
-    if len(top_order) != graph.get_v():
+    if len(order) != graph.get_v():
         return None # Cycle detected
 
-    return top_order
-
-
-def longest_path_dag(graph : Graph, start_vertex, end_vertex):
-    if not graph.directed or not graph.weighted:
-        raise ValueError("Graph must be directed and weighted for the longest path in DAG")
+    return order
 
-    top_order = topological_sort(graph)
-    if top_order is None:
-        print("The graph is not a DAG")
+@instrument.instrumented("topological_sort")
+def topological_sort(graph : Graph): # Theta(V+E)
+    frozen = _frozen(graph)
+    order = _topological_order(frozen)
+    if order is None:
         return None
-
-    print("Topological order: ", top_order)
-
-    dist = {v:float('-inf') for v in graph.get_vertices()}
-    prev = {v:None for v in graph.get_vertices()}
-    dist[start_vertex] = 0
-
-    for u in top_order:
-        if dist[u] != float('-inf'):
-            for v, w in graph.neighbours(u):
-                if dist[u] + w > dist[v]:
-                    dist[v] = dist[u] + w
-                    prev[v] = u
-
-    # Reconstruct path
-    path = []
-    current = end_vertex
-
-    while current is not None:
-        path.append(current)
-        current = prev[current]
-    
+    labels = frozen.labels
+    return [labels[u] for u in order]
+
+def _relax_dag(graph : FrozenGraph, order, sources, longest): # Theta(V+E)
+    # one pass over the edges in topological order; dist[v] is None where no source reaches v
+    offsets, targets, weights = graph.offsets, graph.targets, graph.weights
+    dist = [None] * graph.get_v()
+    prev = [-1] * graph.get_v()
+    for s in sources:
+        dist[s] = 0
+    for u in order:
+        d = dist[u]
+        if d is None:
+            continue
+        for i in range(offsets[u], offsets[u + 1]):
+            v = targets[i]
+            candidate = d + (weights[i] if weights is not None else 1)
+            current = dist[v]
+            if current is None or (candidate > current if longest else candidate < current):
+                dist[v] = candidate
+                prev[v] = u
+    if instrument.recorder is not None:
+        instrument.recorder.count("dag.edges_relaxed", sum(offsets[u + 1] - offsets[u] for u in order if dist[u] is not None))
+    return dist, prev
+
+def _dag_order(graph : Graph):
+    if not graph.directed:
+        raise ValueError("Graph must be directed")
+    frozen = _frozen(graph)
+    order = _topological_order(frozen)
+    if order is None:
+        raise ValueError("The graph is not a DAG")
+    return frozen, order
+
+def _id(frozen : FrozenGraph, vertex):
+    if vertex not in frozen.ids:
+        raise ValueError(f"Vertex {vertex} not in graph")
+    return frozen.ids[vertex]
+
+def _walk_back(frozen : FrozenGraph, prev, end):
+    path = [end]
+    while prev[path[-1]] != -1:
+        path.append(prev[path[-1]])
     path.reverse()
+    return [frozen.labels[u] for u in path]
+
+def _dag_path(frozen : FrozenGraph, order, start_vertex, end_vertex, longest):
+    s, t = _id(frozen, start_vertex), _id(frozen, end_vertex)
+    dist, prev = _relax_dag(frozen, order, [s], longest)
+    if dist[t] is None:
+        return None # No path
+    return _walk_back(frozen, prev, t), dist[t]
+
+@instrument.instrumented("dag_path_tree")
+def dag_path_tree(graph : Graph, source, longest=False): # Theta(V+E)
+    # shortest (or longest) distances from source to everything it reaches, negative weights allowed;
+    # unweighted edges count 1. Vertices source cannot reach are left out of the tree
+    frozen, order = _dag_order(graph)
+    dist, prev = _relax_dag(frozen, order, [_id(frozen, source)], longest)
+    labels = frozen.labels
+    distances = {labels[v]: d for v, d in enumerate(dist) if d is not None}
+    parent = {labels[v]: labels[p] for v, p in enumerate(prev) if p != -1}
+    return ShortestPathTree(source, distances, parent, True)
+
+@instrument.instrumented("shortest_path_dag")
+def shortest_path_dag(graph : Graph, start_vertex, end_vertex): # Theta(V+E)
+    frozen, order = _dag_order(graph)
+    return _dag_path(frozen, order, start_vertex, end_vertex, False)
+
+@instrument.instrumented("longest_path_dag")
+def longest_path_dag(graph : Graph, start_vertex, end_vertex): # Theta(V+E)
+    if not graph.directed or not graph.weighted:
+        raise ValueError("Graph must be directed and weighted for the longest path in DAG")
+    frozen, order = _dag_order(graph)  # a cycle raises, None is left to mean no path
+    return _dag_path(frozen, order, start_vertex, end_vertex, True)
 
-    if dist[end_vertex] == float('-inf'):
-        print("No path from", start_vertex, "to", end_vertex)
-        return None
+@instrument.instrumented("critical_path")
+def critical_path(graph : Graph): # Theta(V+E)
+    # longest path through the whole DAG from any vertex without predecessors: returns (path, length, finish)
+    # where finish maps every sink to the length of the longest path ending there
+    frozen, order = _dag_order(graph)
+    offsets = frozen.offsets
+    has_predecessor = bytearray(frozen.get_v())
+    for v in frozen.targets:
+        has_predecessor[v] = 1
+    dist, prev = _relax_dag(frozen, order, [u for u in order if not has_predecessor[u]], True)
 
-    print("Longest path cost:", dist[end_vertex])
-    print("Longest path:", " -> ".join(path))
-    return path, dist[end_vertex]
+    sinks = [u for u in order if offsets[u] == offsets[u + 1]]
+    finish = {frozen.labels[u]: dist[u] for u in sinks}
+    if not sinks:
+        return [], 0, finish
+    end = max(sinks, key=dist.__getitem__)
+    return _walk_back(frozen, prev, end), dist[end], finish
 
 
 
 # bonus
 
-def build_tree(inorder, preorder):
+def build_tree(inorder, preorder): # Theta(n)
+    # (root, left, right) tuples from distinct labels; the children of every node are found with one stack
+    # pass, then the tuples are assembled in reverse preorder so each child exists before its parent
+    n = len(preorder)
+    if n == 0:
+        return None
     index_map = {val: idx for idx, val in enumerate(inorder)}
-    pre_idx = [0] # list so we can modify it in the nested function
-
-    def helper(l, r):
-        if l > r:
-            return None
-
-        root = preorder[pre_idx[0]]
-        index = index_map[root]
-        pre_idx[0]+=1
-
-        left = helper(l, index - 1)
-        right = helper(index + 1, r)
-
-        return (root, left, right)
-
-    return helper(0, len(inorder) - 1)
-
-
-def tree_to_graph(tree):
+    left, right = [None] * n, [None] * n
+    stack = [0]
+    j = 0  # next inorder position not yet closed
+    for i in range(1, n):
+        parent = stack[-1]
+        if index_map[preorder[parent]] != j:
+            left[parent] = i
+        else:
+            while stack and index_map[preorder[stack[-1]]] == j:
+                parent = stack.pop()
+                j += 1
+            right[parent] = i
+        stack.append(i)
+
+    nodes = [None] * n
+    for i in range(n - 1, -1, -1):
+        l, r = left[i], right[i]
+        nodes[i] = (preorder[i], nodes[l] if l is not None else None, nodes[r] if r is not None else None)
+    return nodes[0]
+
+
+def tree_to_graph(tree): # Theta(n)
     g = Graph(directed = True, weighted = False)
+    if not tree:
+        return g
 
-    def dfs(node):
-        if not node:
-            return
-
-        root, l, r = node
-        if root not in g.get_vertices():
+    stack = [tree]
+    while stack:
+        root, l, r = stack.pop()
+        if root not in g.list_of_neighbours:
             g.add_vertex(root)
 
-        if l:
-            child = l[0] if isinstance(l, tuple) else l
-
-            if child not in g.get_vertices():
-                g.add_vertex(child)
-            g.add_edge(root, child)
-
-        if r:
-            child = r[0] if isinstance(r, tuple) else r
-
-            if child not in g.get_vertices():
-                g.add_vertex(child)
-
-            g.add_edge(root, child)
-
-        if isinstance(l, tuple):
-            dfs(l)
+        for child in (l, r):
+            if child:
+                label = child[0] if isinstance(child, tuple) else child
+                if label not in g.list_of_neighbours:
+                    g.add_vertex(label)
+                g.add_edge(root, label)
 
-        if isinstance(r, tuple):
-            dfs(r)
+        # right pushed first so the left subtree is expanded first, as before
+        for child in (r, l):
+            if isinstance(child, tuple):
+                stack.append(child)
 
-    dfs(tree)
     return g
 
 def bonus_problem(preorder, inorder, postorder):
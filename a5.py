@@ -1,75 +1,517 @@
-from collections import deque
+import heapq
+from csr import FrozenGraph
 from graph import Graph
-def maximum_matching_bipartite(graph: Graph):
+import instrument
+
+UNMATCHED = -1
+DUMMY = -2
+
+def _colour(frozen: FrozenGraph): # Theta(V+E)
+    # 2-colouring by id, every component's first vertex gets colour 0
+    offsets, targets = frozen.offsets, frozen.targets
+    colour = [-1] * frozen.get_v()
+    for start in range(len(colour)):
+        if colour[start] != -1:
+            continue
+        colour[start] = 0
+        stack = [start]
+        while stack:
+            u = stack.pop()
+            other = 1 - colour[u]
+            for v in targets[offsets[u]:offsets[u + 1]]:
+                if colour[v] == -1:
+                    colour[v] = other
+                    stack.append(v)
+                elif colour[v] != other:
+                    raise ValueError("Graph is not bipartite")
+    return colour
+
+def bipartition(graph: Graph): # Theta(V+E)
+    if graph.directed:
+        raise ValueError("Graph must be undirected")
+    frozen = graph if isinstance(graph, FrozenGraph) else graph.freeze()
+    colour = _colour(frozen)
+    U = [frozen.labels[i] for i, c in enumerate(colour) if c == 0]
+    V = [frozen.labels[i] for i, c in enumerate(colour) if c == 1]
+    return U, V
+
+def _karp_sipser(offsets, targets, left, mate): # Theta(V+E)
+    # greedy warm start: a vertex with a single free neighbour is always safe to match to it,
+    # otherwise match an arbitrary free edge; leaves far fewer free vertices for the phases below
+    degree = [offsets[v + 1] - offsets[v] for v in range(len(mate))]
+    ones = [v for v in range(len(mate)) if degree[v] == 1]
+
+    def take(u, v):
+        mate[u], mate[v] = v, u
+        for x in (u, v):
+            for w in targets[offsets[x]:offsets[x + 1]]:
+                if mate[w] == UNMATCHED:
+                    degree[w] -= 1
+                    if degree[w] == 1:
+                        ones.append(w)
+
+    def drain():
+        while ones:
+            u = ones.pop()
+            if mate[u] != UNMATCHED:
+                continue
+            for v in targets[offsets[u]:offsets[u + 1]]:
+                if mate[v] == UNMATCHED:
+                    take(u, v)
+                    break
+
+    drain()
+    for u in left:
+        if mate[u] == UNMATCHED:
+            for v in targets[offsets[u]:offsets[u + 1]]:
+                if mate[v] == UNMATCHED:
+                    take(u, v)
+                    drain()
+                    break
+
+def _hopcroft_karp(offsets, targets, left, mate): # O(E sqrt(V))
+    # mate[x] is x's partner id or UNMATCHED, for both sides; improved in place to a maximum matching.
+    # returns the number of phases and of augmenting paths found
+    inf = len(mate) + 1
+    dist = [inf] * len(mate)
+    phases = augmented = 0
+    while True:
+        # BFS layers over left vertices from every free one, stopping at the shortest augmenting length
+        queue = [u for u in left if mate[u] == UNMATCHED]
+        for u in left:
+            dist[u] = inf
+        for u in queue:
+            dist[u] = 0
+        limit = inf
+        for u in queue:  # the list grows while it is walked, so this is a FIFO scan
+            if dist[u] >= limit:
+                continue
+            for v in targets[offsets[u]:offsets[u + 1]]:
+                w = mate[v]
+                if w == UNMATCHED:
+                    if limit == inf:
+                        limit = dist[u] + 1
+                elif dist[w] == inf:
+                    dist[w] = dist[u] + 1
+                    queue.append(w)
+        if limit == inf:
+            return phases, augmented
+        phases += 1
+
+        # vertex-disjoint augmenting paths along the layers, an explicit stack instead of recursion;
+        # next_edge[u] remembers where u's scan stopped so no edge is retried within the phase
+        next_edge = list(offsets)
+        for root in left:
+            if mate[root] != UNMATCHED:
+                continue
+            stack = [root]
+            while stack:
+                u = stack[-1]
+                i, end = next_edge[u], offsets[u + 1]
+                child = UNMATCHED
+                while i < end:
+                    v = targets[i]
+                    i += 1
+                    w = mate[v]
+                    if w == UNMATCHED:
+                        # flip the path: every vertex on the stack takes the vertex below it
+                        augmented += 1
+                        while stack:
+                            x = stack.pop()
+                            mate[x], v = v, mate[x]
+                            mate[mate[x]] = x
+                        break
+                    if dist[w] == dist[u] + 1:
+                        child = w
+                        break
+                next_edge[u] = i
+                if child != UNMATCHED:
+                    stack.append(child)
+                elif stack:
+                    dist[u] = inf  # dead end for the rest of this phase
+                    stack.pop()
+
+@instrument.instrumented("maximum_matching_bipartite")
+def maximum_matching_bipartite(graph: Graph): # O(E sqrt(V))
     if graph.directed:
         raise ValueError("Graph must be undirected")
+    frozen = graph if isinstance(graph, FrozenGraph) else graph.freeze()
+    offsets, targets = frozen.offsets, frozen.targets
+    with instrument.phase("matching.colour"):
+        colour = _colour(frozen)
+    left = [u for u, c in enumerate(colour) if c == 0]
+
+    mate = [UNMATCHED] * len(colour)
+    with instrument.phase("matching.greedy"):
+        _karp_sipser(offsets, targets, left, mate)
+    if instrument.recorder is not None:
+        instrument.recorder.count("matching.greedy_pairs", sum(1 for u in left if mate[u] != UNMATCHED))
+    with instrument.phase("matching.augment"):
+        phases, augmented = _hopcroft_karp(offsets, targets, left, mate)
+    instrument.count("matching.phases", phases)
+    instrument.count("matching.augmenting_paths", augmented)
+
+    labels = frozen.labels
+    return [(labels[u], labels[mate[u]]) for u in left if mate[u] != UNMATCHED]
+
+# ============================
+# Weighted assignment
+# ============================
+
+def _sides(frozen: FrozenGraph, left):
+    # ids of the rows and the columns, from the caller's left side or else from the 2-colouring
+    colour = _colour(frozen)
+    if left is None:
+        return [u for u, c in enumerate(colour) if c == 0], [v for v, c in enumerate(colour) if c == 1]
+    rows = set()
+    for vertex in left:
+        if vertex not in frozen.ids:
+            raise ValueError(f"Vertex {vertex} not in graph")
+        rows.add(frozen.ids[vertex])
+    for u in rows:
+        for v in frozen.targets[frozen.offsets[u]:frozen.offsets[u + 1]]:
+            if v in rows:
+                raise ValueError("Left side has an edge inside it")
+    return sorted(rows), [v for v in range(len(colour)) if v not in rows]
+
+def _hungarian(cost, n, m): # O(n^2 m), n <= m
+    # Jonker-Volgenant shortest augmenting paths on a dense n x m cost matrix, one row added at a time;
+    # returns the column of every row. Dual shifts are applied lazily: minv holds reduced distances plus the
+    # running total, and each used column remembers the total when it joined, so a step is one pass over
+    # the free columns
+    inf = float('inf')
+    u, v = [0] * (n + 1), [0] * (m + 1)
+    p, way = [0] * (m + 1), [0] * (m + 1)  # p[j] is the row in column j, 1-based with 0 as the virtual start
+    joined = [0] * (m + 1)
+    for i in range(1, n + 1):
+        p[0] = i
+        j0 = 0
+        total = 0
+        minv = [inf] * (m + 1)
+        free = list(range(1, m + 1))
+        used = [0]
+        while True:
+            i0 = p[j0]
+            row, base = cost[i0 - 1], joined[j0] - u[i0]
+            best, j1 = inf, 0
+            for j in free:
+                current = base + row[j - 1] - v[j]
+                if current < minv[j]:
+                    minv[j] = current
+                    way[j] = j0
+                if minv[j] < best:
+                    best, j1 = minv[j], j
+            total = best
+            free.remove(j1)
+            used.append(j1)
+            joined[j1] = total
+            j0 = j1
+            if p[j0] == 0:
+                break
+        for j in used:
+            shift = total - joined[j]
+            u[p[j]] += shift
+            v[j] -= shift
+        while j0:
+            j1 = way[j0]
+            p[j0] = p[j1]
+            j0 = j1
+    assigned = [0] * n
+    for j in range(1, m + 1):
+        if p[j]:
+            assigned[p[j] - 1] = j - 1
+    return assigned
 
-    # Step 1: Partition the graph using BFS (coloring)
-    color = {}
-    U, V = set(), set()
-
-    for vertex in graph.get_vertices():
-        if vertex not in color:
-            queue = deque([vertex])
-            color[vertex] = 0
-            U.add(vertex)
-            while queue:
-                u = queue.popleft()
-                for v in graph.neighbours(u):
-                    if v not in color:
-                        color[v] = 1 - color[u]
-                        if color[v] == 0:
-                            U.add(v)
-                        else:
-                            V.add(v)
-                        queue.append(v)
-                    elif color[v] == color[u]:
-                        raise ValueError("Graph is not bipartite")
-
-    pair_U = {u: None for u in U}
-    pair_V = {v: None for v in V}
-    dist = {}
-
-    def bfs():
-        queue = deque()
-        for u in U:
-            if pair_U[u] is None:
-                dist[u] = 0
-                queue.append(u)
-            else:
-                dist[u] = float('inf')
-        
-        dist[None] = float('inf')
+def _dense_assignment(frozen, rows, columns, costs): # O(n^2 m)
+    # (row, column, edge index) triples, the edge being the cheapest one between the pair
+    if len(rows) > len(columns):
+        return [(u, v, i) for v, u, i in _dense_assignment(frozen, columns, rows, costs)]
+    if not rows:
+        return []
+    offsets, targets = frozen.offsets, frozen.targets
+    column_index = {v: j for j, v in enumerate(columns)}
+    low, high = min(costs, default=0), max(costs, default=0)
+    # a missing edge costs more than any difference in real cost, so cardinality comes first
+    missing = len(rows) * (high - low) + abs(high) + abs(low) + 1
+    matrix, edges = [], []
+    for u in rows:
+        row = [missing] * len(columns)
+        edge = [UNMATCHED] * len(columns)
+        for i in range(offsets[u], offsets[u + 1]):
+            j = column_index[targets[i]]
+            if costs[i] < row[j]:
+                row[j], edge[j] = costs[i], i
+        matrix.append(row)
+        edges.append(edge)
+    assigned = _hungarian(matrix, len(rows), len(columns))
+    return [(u, columns[j], edge[j]) for u, j, edge in zip(rows, assigned, edges) if edge[j] != UNMATCHED]
 
+def _sparse_assignment(frozen, rows, costs): # O(rows * E logV) worst case, usually a small region per row
+    # Jonker-Volgenant over the edge lists. Every row also gets a private dummy column costing more than any
+    # difference in real cost, so every row can be assigned and cardinality still comes first. y is the dual:
+    # cost - y[u] - y[v] >= 0 on every edge, 0 on matched ones, and free columns stay at 0. Each free row runs
+    # one dijkstra over reduced costs until the nearest free column is settled, shifts the duals of everything
+    # it settled so that path becomes tight, and flips the path. Returns (row, column, edge index) triples
+    offsets, targets = frozen.offsets, frozen.targets
+    n = frozen.get_v()
+    inf = float('inf')
+    low, high = min(costs, default=0), max(costs, default=0)
+    missing = len(rows) * (high - low) + abs(high) + abs(low) + 1
+    is_row = [False] * n
+    for u in rows:
+        is_row[u] = True
+
+    # row reduction, then every row whose cheapest column is still free takes it
+    y = [0] * n
+    mate = [UNMATCHED] * n
+    matched_edge = [UNMATCHED] * n  # row -> the edge it is matched along
+    for u in rows:
+        y[u] = min((costs[i] for i in range(offsets[u], offsets[u + 1])), default=missing)
+        for i in range(offsets[u], offsets[u + 1]):
+            if costs[i] == y[u] and mate[targets[i]] == UNMATCHED:
+                mate[u], mate[targets[i]] = targets[i], u
+                matched_edge[u] = i
+                break
+
+    dist = [inf] * n
+    via = [UNMATCHED] * n  # column -> the row its tentative distance came from
+    via_edge = [UNMATCHED] * n  # column -> the edge it came along
+    for root in rows:
+        if mate[root] != UNMATCHED:
+            continue
+        dist[root] = 0
+        touched = [root]
+        queue = [(0, root)]
+        limit, end, end_row = inf, UNMATCHED, root
         while queue:
-            u = queue.popleft()
-            if dist[u] < dist[None]:
-                for v in graph.neighbours(u):
-                    if pair_V[v] is None:
-                        if dist[None] == float('inf'):
-                            dist[None] = dist[u] + 1
-                    elif dist[pair_V[v]] == float('inf'):
-                        dist[pair_V[v]] = dist[u] + 1
-                        queue.append(pair_V[v])
-        return dist[None] != float('inf')
-
-    def dfs(u):
-        if u is not None:
-            for v in graph.neighbours(u):
-                if pair_V[v] is None or (dist[pair_V[v]] == dist[u] + 1 and dfs(pair_V[v])):
-                    pair_U[u] = v
-                    pair_V[v] = u
-                    return True
-            dist[u] = float('inf')
-            return False
-        return True
-
-    matching = 0
-    while bfs():
-        for u in U:
-            if pair_U[u] is None:
-                if dfs(u):
-                    matching += 1
-
-    matched_pairs = [(u, pair_U[u]) for u in U if pair_U[u] is not None]
-    return matched_pairs
+            d, u = heapq.heappop(queue)
+            if d > dist[u]:
+                continue
+            if d >= limit:
+                break
+            if d + missing - y[u] < limit:  # u's own dummy column
+                limit, end, end_row = d + missing - y[u], DUMMY, u
+            base = d - y[u]
+            for i in range(offsets[u], offsets[u + 1]):
+                v = targets[i]
+                nd = base + costs[i] - y[v]
+                if nd < d:
+                    nd = d  # float rounding can leave a reduced cost a hair below 0
+                if nd < dist[v]:
+                    if dist[v] == inf:
+                        touched.append(v)
+                    dist[v] = nd
+                    via[v] = u
+                    via_edge[v] = i
+                    w = mate[v]
+                    if w == UNMATCHED:
+                        if nd < limit:
+                            limit, end = nd, v
+                    elif nd < dist[w]:
+                        if dist[w] == inf:
+                            touched.append(w)
+                        dist[w] = nd
+                        heapq.heappush(queue, (nd, w))
+
+        for x in touched:
+            if dist[x] < limit:
+                if is_row[x]:
+                    y[x] += limit - dist[x]
+                else:
+                    y[x] -= limit - dist[x]
+            dist[x] = inf
+
+        # flip the path back to the root; a row given its dummy column is out of the matching for good,
+        # since nothing else can reach that column
+        u, v = (end_row, DUMMY) if end == DUMMY else (via[end], end)
+        while True:
+            previous = mate[u]
+            mate[u] = v
+            if v != DUMMY:
+                mate[v] = u
+                matched_edge[u] = via_edge[v]
+            if u == root:
+                break
+            v = previous
+            u = via[v]
+
+    return [(u, mate[u], matched_edge[u]) for u in rows if mate[u] >= 0]
+
+@instrument.instrumented("min_cost_assignment")
+def min_cost_assignment(graph: Graph, left=None, maximize=False, method="auto"): # O(n^2 m) dense, O(n E logV) sparse
+    # a maximum cardinality matching of least total weight (greatest with maximize=True), returned as
+    # (pairs, total) with pairs like maximum_matching_bipartite; left optionally names one side, otherwise
+    # the 2-colouring decides. method is "dense" (Hungarian / Jonker-Volgenant on the full cost matrix),
+    # "sparse" (the same shortest augmenting paths, searched over the edges only) or "auto"
+    if graph.directed:
+        raise ValueError("Graph must be undirected")
+    if method not in ("auto", "dense", "sparse"):
+        raise ValueError(f"Unknown assignment method {method!r}")
+    frozen = graph if isinstance(graph, FrozenGraph) else graph.freeze()
+    rows, columns = _sides(frozen, left)
+    weights = frozen.weights if frozen.weighted else [1] * len(frozen.targets)
+    costs = [-w for w in weights] if maximize else list(weights)
+
+    if method == "auto":
+        # the matrix costs rows * columns however few edges there are, so it only pays off near complete
+        method = "dense" if frozen.get_e() >= len(rows) * len(columns) else "sparse"
+    with instrument.phase("assignment." + method, rows=len(rows), columns=len(columns)):
+        if method == "dense":
+            matched = _dense_assignment(frozen, rows, columns, costs)
+        else:
+            matched = _sparse_assignment(frozen, rows, costs)
+
+    labels = frozen.labels
+    return [(labels[u], labels[v]) for u, v, _ in matched], sum(weights[i] for _, _, i in matched)
+
+# ============================
+# Incremental matching
+# ============================
+
+class IncrementalMatching:
+    # a maximum matching and 2-colouring kept valid across updates made through its add/remove methods,
+    # each repaired with at most a couple of augmenting path searches. Edge changes made to the graph directly
+    # are noticed through Graph.version and answered with a full recomputation; vertices added directly do not
+    # bump the version and are adopted as isolated vertices instead. Removing a vertex costs what the graph's
+    # remove_vertex costs, which is the sum of the neighbours' degrees for an undirected Graph or CompactGraph
+    def __init__(self, graph: Graph):
+        if graph.directed:
+            raise ValueError("Graph must be undirected")
+        self.graph = graph
+        self._rebuild()
+
+    def _rebuild(self): # O(E sqrt(V))
+        U, V = bipartition(self.graph)
+        self.colour = dict.fromkeys(U, 0)
+        self.colour.update(dict.fromkeys(V, 1))
+        self.mate = {}
+        for u, v in maximum_matching_bipartite(self.graph):
+            self.mate[u], self.mate[v] = v, u
+        self.version = self.graph.version
+
+    def _sync(self): # Theta(1), O(V) after vertices were added to the graph directly
+        if self.graph.version != self.version:
+            self._rebuild()
+        elif len(self.colour) != self.graph.get_v():
+            # an edge would have bumped the version, so every vertex without a colour is isolated
+            for x in self.graph.list_of_neighbours:
+                if x not in self.colour:
+                    self.colour[x] = 0
+
+    def _neighbours(self, vertex):
+        edges = self.graph.list_of_neighbours[vertex]
+        return [e[0] for e in edges] if self.graph.weighted else edges
+
+    def _search(self, root): # O(size of the alternating tree)
+        # BFS over alternating paths from root, unmatched edges out of outer vertices and matched edges back;
+        # returns (free vertex, parents) for the first augmenting path found or None
+        parent = {}  # inner vertex -> the outer vertex it was reached from
+        outer = {root}
+        queue = [root]
+        for a in queue:
+            for b in self._neighbours(a):
+                if b in parent or b == self.mate.get(a):
+                    continue
+                parent[b] = a
+                c = self.mate.get(b)
+                if c is None:
+                    return b, parent
+                if c not in outer:
+                    outer.add(c)
+                    queue.append(c)
+        return None
+
+    def _flip(self, root, found): # O(path length)
+        # every unmatched edge on the path becomes matched; a matched root's old partner is left to the caller
+        b, parent = found
+        while True:
+            a = parent[b]
+            previous = self.mate.get(a)
+            self.mate[a], self.mate[b] = b, a
+            if a == root:
+                return
+            b = previous
+
+    def _augment_from(self, vertex):
+        found = self._search(vertex)
+        if found is not None:
+            self._flip(vertex, found)
+
+    def _unmatch(self, vertex):
+        partner = self.mate.pop(vertex, None)
+        if partner is not None:
+            del self.mate[partner]
+        return partner
+
+    def add_vertex(self, vertex): # Theta(1)
+        self._sync()
+        self.graph.add_vertex(vertex)
+        self.colour[vertex] = 0
+
+    def remove_vertex(self, vertex): # O(sum of neighbour degrees) for the graph, the repair is one search
+        self._sync()
+        partner = self._unmatch(vertex)
+        self.graph.remove_vertex(vertex)
+        del self.colour[vertex]
+        self.version = self.graph.version
+        if partner is not None:
+            self._augment_from(partner)
+
+    def add_edge(self, u, v, weight=0): # one search from each end, O(component) if two components merge
+        self._sync()
+        if u not in self.colour or v not in self.colour:
+            raise ValueError("Vertices do not exist in current graph")
+        if self.colour[u] == self.colour[v]:
+            self._recolour(u, v)
+        self.graph.add_edge(u, v, weight)
+        self.version = self.graph.version
+
+        # the matching was maximum, so an augmenting path has to use the new edge: it runs from a free vertex
+        # alternating into u's partner, across u - v, and out through v's partner to another free vertex;
+        # a search from each partner finds the two halves, which cannot meet without an older augmenting path
+        ends = []
+        for x in (u, v):
+            partner = self.mate.get(x)
+            if partner is None:
+                ends.append(None)
+                continue
+            found = self._search(partner)
+            if found is None:
+                return
+            ends.append((partner, found))
+        for x, end in zip((u, v), ends):
+            if end is not None:
+                partner, found = end
+                self._flip(partner, found)
+        self.mate[u], self.mate[v] = v, u
+
+    def _recolour(self, u, v): # O(size of v's component)
+        # u and v are about to be joined, so v's component has to swap colours unless it already holds u
+        component = [v]
+        seen = {v}
+        for x in component:
+            for y in self._neighbours(x):
+                if y not in seen:
+                    seen.add(y)
+                    component.append(y)
+        if u in seen:
+            raise ValueError("Graph is not bipartite")
+        for x in component:
+            self.colour[x] = 1 - self.colour[x]
+
+    def remove_edge(self, u, v): # one search from each end when a matched edge goes
+        self._sync()
+        self.graph.remove_edge(u, v)
+        self.version = self.graph.version
+        if self.mate.get(u) == v:
+            self._unmatch(u)
+            self._augment_from(u)
+            if self.mate.get(u) is None:
+                self._augment_from(v)
+
+    def pairs(self): # O(V)
+        # (u, v) pairs with u on the colour 0 side, like maximum_matching_bipartite
+        return [(u, v) for u, v in self.mate.items() if self.colour[u] == 0]
+
+    def __len__(self):
+        return len(self.mate) // 2
@@ -0,0 +1,316 @@
+#  timed scenarios over the seeded generators at several scales: best wall time, peak traced memory and the
+#  search counters of every scenario as JSON, optionally compared against a stored baseline run
+#
+#    python benchmark.py --scale medium --output results.json
+#    python benchmark.py --scale medium --baseline results.json   # exits 1 if a scenario got slower
+
+import argparse
+import fnmatch
+import json
+import math
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from functools import lru_cache
+
+import generators
+from graph import Graph
+from loader import load_edge_list
+from compact import load_compact
+from a3 import dijkstra, a_star, bidirectional_dijkstra
+from a4 import topological_sort, critical_path
+from a5 import maximum_matching_bipartite, min_cost_assignment
+from spt import shortest_path_tree
+from dynamic import DynamicShortestPathTree
+
+SCALES = {"small": 1_000, "medium": 10_000, "large": 100_000}  # roughly the number of vertices
+THRESHOLD = 1.25  # a scenario regresses once it takes this many times its baseline time
+NOISE_FLOOR = 0.005  # seconds, smaller slowdowns are timer and scheduler noise and never count
+DEGREE = 4  # average out-degree of the random graphs
+UPDATE_BATCHES = 20  # batches of edge reweights in the dynamic shortest path scenarios
+UPDATE_BATCH_SIZE = 5
+
+
+@lru_cache(maxsize=None)
+def _generate(name, *args): # scenarios that do not mutate their graph share it
+    return getattr(generators, name)(*args)
+
+
+def _grid(n, seed):
+    side = max(2, math.isqrt(n))
+    return _generate("grid_network", side, side, seed), side * side - 1
+
+
+def _edge_list(g : Graph):
+    if g.weighted:
+        return [(u, v, w) for u, edges in g.list_of_neighbours.items() for v, w in edges]
+    return [(u, v) for u, edges in g.list_of_neighbours.items() for v in edges]
+
+
+def _write_edge_list(g : Graph, path):
+    with open(path, 'w') as file:
+        file.write(("directed" if g.directed else "undirected") + (" weighted\n" if g.weighted else " unweighted\n"))
+        file.writelines(" ".join(map(str, edge)) + "\n" for edge in _edge_list(g))
+
+
+def _build(vertices, edges, directed, weighted):
+    g = Graph(directed=directed, weighted=weighted)
+    for v in vertices:
+        g.add_vertex(v)
+    for edge in edges:
+        g.add_edge(*edge)
+    return g
+
+
+def _count(iterator):
+    return sum(1 for _ in iterator)
+
+
+def _search_stats(result):
+    return result[2]
+
+
+# each scenario is (name, setup, run): setup(n, seed, workdir) returns the arguments of run and is not timed,
+# run may return a dict of counters that is reported with the timing
+
+def _er(n, seed):
+    return _generate("erdos_renyi", n, DEGREE * n, seed)
+
+
+def _setup_text(n, seed, workdir):
+    path = os.path.join(workdir, f"er_{n}_{seed}.txt")
+    if not os.path.exists(path):
+        _write_edge_list(_er(n, seed), path)
+    return (path,)
+
+
+def _setup_binary(n, seed, workdir):
+    path = os.path.join(workdir, f"er_{n}_{seed}.bin")
+    if not os.path.exists(path):
+        _er(n, seed).save_binary(path)
+    return (path,)
+
+
+def _setup_build(n, seed, workdir):
+    g = _er(n, seed)
+    return list(g.list_of_neighbours), _edge_list(g), g.directed, g.weighted
+
+
+def _setup_removals(n, seed, workdir):
+    g = _er(n, seed)
+    copy = _build(g.list_of_neighbours, _edge_list(g), g.directed, g.weighted)
+    return copy, _edge_list(g)[::10]
+
+
+def _setup_vertex_removals(n, seed, workdir):
+    g = _er(n, seed)
+    copy = _build(g.list_of_neighbours, _edge_list(g), g.directed, g.weighted)
+    copy.build_reverse_index()
+    return copy, list(g.list_of_neighbours)[::100]
+
+
+def _remove_edges(g, edges):
+    for u, v, _ in edges:
+        g.remove_edge(u, v)
+
+
+def _remove_vertices(g, vertices):
+    for v in vertices:
+        g.remove_vertex(v)
+
+
+def _setup_search(n, seed, workdir):
+    g, goal = _grid(n, seed)
+    return g, 0, goal
+
+
+def _setup_frozen_search(n, seed, workdir):
+    g, goal = _grid(n, seed)
+    return g.freeze(), 0, goal
+
+
+def _setup_dag(n, seed, workdir):
+    return (_generate("random_dag", n, DEGREE * n, seed),)
+
+
+def _setup_matching(n, seed, workdir):
+    return (_generate("random_bipartite", n // 2, n // 2, 3 * n // 2, seed),)
+
+
+def _setup_assignment(n, seed, workdir):
+    side = max(2, n // 10)
+    return _generate("random_bipartite", side, side, 5 * side, seed, True), None, False, "sparse"
+
+
+def _setup_updates(n, seed, workdir):
+    # the same seeded batches of doubled and halved weights for the repaired and the recomputed tree
+    g = _er(n, seed)
+    edges = _edge_list(g)
+    copy = _build(g.list_of_neighbours, edges, g.directed, g.weighted)
+    rng = random.Random(seed)
+    batches = [[(u, v, w * 2 if rng.random() < 0.5 else max(1, w // 2))
+                for u, v, w in rng.sample(edges, UPDATE_BATCH_SIZE)] for _ in range(UPDATE_BATCHES)]
+    return copy, 0, batches
+
+
+def _setup_dynamic_updates(n, seed, workdir):
+    g, source, batches = _setup_updates(n, seed, workdir)
+    return DynamicShortestPathTree(g, source), batches
+
+
+def _dynamic_updates(tree, batches):
+    for batch in batches:
+        tree.apply(batch)
+    return {key: tree.stats[key] for key in ("batches", "affected", "repaired")}
+
+
+def _recomputed_updates(g, source, batches):
+    for batch in batches:
+        for u, v, w in batch:
+            g.set_weight(u, v, w)
+        tree = shortest_path_tree(g, source)
+    return {"batches": len(batches), "settled": len(tree)}
+
+
+def _assignment(g, left, maximize, method):
+    return {"pairs": len(min_cost_assignment(g, left, maximize, method)[0])}
+
+
+def _matching(g):
+    return {"pairs": len(maximum_matching_bipartite(g))}
+
+
+SCENARIOS = [
+    ("load/edge_list", _setup_text, load_edge_list),
+    ("load/compact", _setup_text, load_compact),
+    ("load/binary", _setup_binary, Graph.load_binary),
+    ("mutation/add_edges", _setup_build, _build),
+    ("mutation/remove_edges", _setup_removals, _remove_edges),
+    ("mutation/remove_vertices", _setup_vertex_removals, _remove_vertices),
+    ("freeze", lambda n, seed, workdir: (_er(n, seed),), Graph.freeze),
+    ("traversal/bfs", lambda n, seed, workdir: (_er(n, seed).BFS_iter(0),), _count),
+    ("traversal/dfs", lambda n, seed, workdir: (_er(n, seed).DFS_iter(0),), _count),
+    ("traversal/bfs_levels_power_law",
+     lambda n, seed, workdir: (_generate("barabasi_albert", n, DEGREE // 2, seed).BFS_levels(0, True),), _count),
+    ("shortest_path/dijkstra", _setup_search, lambda g, s, t: _search_stats(dijkstra(g, s, t))),
+    ("shortest_path/a_star", _setup_search, lambda g, s, t: _search_stats(a_star(g, s, t))),
+    ("shortest_path/a_star_frozen", _setup_frozen_search, lambda g, s, t: _search_stats(a_star(g, s, t))),
+    ("shortest_path/bidirectional_dijkstra", _setup_search,
+     lambda g, s, t: _search_stats(bidirectional_dijkstra(g, s, t))),
+    ("shortest_path/dynamic_updates", _setup_dynamic_updates, _dynamic_updates),
+    ("shortest_path/recomputed_updates", _setup_updates, _recomputed_updates),
+    ("dag/topological_sort", _setup_dag, topological_sort),
+    ("dag/critical_path", _setup_dag, critical_path),
+    ("matching/hopcroft_karp", _setup_matching, _matching),
+    ("matching/assignment", _setup_assignment, _assignment),
+]
+
+
+def _measure(setup, run, n, seed, workdir, repeat):
+    times = []
+    counters = None
+    for _ in range(repeat):
+        args = setup(n, seed, workdir)
+        start = time.perf_counter()
+        result = run(*args)
+        times.append(time.perf_counter() - start)
+        if isinstance(result, dict):
+            counters = result
+
+    # memory is traced in a separate run, tracing slows the interpreter down too much to time it as well
+    args = setup(n, seed, workdir)
+    tracemalloc.start()
+    try:
+        run(*args)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    entry = {"seconds": min(times), "mean_seconds": sum(times) / len(times), "peak_bytes": peak}
+    if counters is not None:
+        entry["stats"] = counters
+    return entry
+
+
+def run_suite(n, repeat=3, seed=0, only=None, progress=None): # runs every scenario whose name matches a pattern in only
+    if repeat <= 0:
+        raise ValueError("repeat must be positive")
+    selected = [s for s in SCENARIOS if only is None or any(fnmatch.fnmatch(s[0], pattern) for pattern in only)]
+    if not selected:
+        raise ValueError(f"No scenario matches {only}")
+
+    workdir = tempfile.mkdtemp(prefix="graph-benchmark-")
+    results = {}
+    try:
+        for name, setup, run in selected:
+            results[name] = _measure(setup, run, n, seed, workdir, repeat)
+            if progress is not None:
+                progress(name, results[name])
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+        _generate.cache_clear()
+
+    return {
+        "n": n,
+        "seed": seed,
+        "repeat": repeat,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "results": results,
+    }
+
+
+def compare(report, baseline, threshold=THRESHOLD): # rows of (name, baseline seconds, seconds, ratio, regressed)
+    if report["n"] != baseline["n"] or report["seed"] != baseline["seed"]:
+        raise ValueError("Baseline was recorded at a different scale or seed")
+    rows = []
+    for name, entry in report["results"].items():
+        if name not in baseline["results"]:
+            continue
+        before = baseline["results"][name]["seconds"]
+        ratio = entry["seconds"] / before if before > 0 else math.inf
+        rows.append((name, before, entry["seconds"], ratio, ratio > threshold and entry["seconds"] - before > NOISE_FLOOR))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the graph algorithms on seeded synthetic graphs")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    parser.add_argument("--n", type=int, help="number of vertices, overrides --scale")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--only", nargs="+", metavar="PATTERN", help="scenario names or globs, e.g. 'shortest_path/*'")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--baseline", help="JSON report of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD)
+    args = parser.parse_args(argv)
+
+    def progress(name, entry):
+        print(f"{name:40} {entry['seconds'] * 1000:10.2f} ms {entry['peak_bytes'] / 2 ** 20:8.2f} MiB", file=sys.stderr)
+
+    report = run_suite(args.n or SCALES[args.scale], args.repeat, args.seed, args.only, progress)
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    if args.baseline is None:
+        return 0
+    with open(args.baseline) as file:
+        rows = compare(report, json.load(file), args.threshold)
+    for name, before, after, ratio, regressed in rows:
+        print(f"{name:40} {before * 1000:10.2f} -> {after * 1000:10.2f} ms  x{ratio:.2f}{'  REGRESSION' if regressed else ''}",
+              file=sys.stderr)
+    return 1 if any(row[4] for row in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+#  versioned binary graph file, loaded through mmap without parsing the edge arrays
+
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from csr import FrozenGraph
+
+MAGIC = b'GRPH'
+VERSION = 1
+
+DIRECTED = 1
+WEIGHTED = 2
+FLOAT_WEIGHTS = 4
+HAS_POSITIONS = 8
+BIG_ENDIAN = 16
+
+# magic, version, flags, reserved, V, E, label table size in bytes
+HEADER = struct.Struct('<4sIIIQQQ')
+
+
+def encode_labels(labels):  # Theta(V)
+    # JSON; labels are dict keys and so never lists, which lets tuples travel as lists and come back as tuples
+    try:
+        return json.dumps(labels).encode()
+    except TypeError:
+        raise ValueError("Vertex labels must be str, int, float, bool, None or tuples of those") from None
+
+
+def label_from_json(value):  # a label as it came out of json.loads
+    return tuple(map(label_from_json, value)) if isinstance(value, list) else value
+
+
+def decode_labels(data):  # Theta(V)
+    return [label_from_json(label) for label in json.loads(data)]
+
+
+def encode(g):  # Theta(V+E)
+    # the whole file as a list of byte sections, also used to publish a graph into shared memory
+    frozen = g if isinstance(g, FrozenGraph) else g.freeze()
+    v, e = frozen.get_v(), frozen.get_e()
+
+    weights = frozen.weights
+    if frozen.weighted and not isinstance(weights, array):
+        weights = array(weights.format, weights)
+    positions = [p for label in frozen.labels for p in frozen.positions.get(label, (float('nan'),) * 2)]
+    labels = encode_labels(frozen.labels)
+
+    flags = ((DIRECTED if frozen.directed else 0) |
+             (WEIGHTED if frozen.weighted else 0) |
+             (FLOAT_WEIGHTS if frozen.weighted and weights.typecode == 'd' else 0) |
+             (HAS_POSITIONS if frozen.positions else 0) |
+             (BIG_ENDIAN if sys.byteorder == 'big' else 0))
+
+    # every section is a multiple of 8 bytes, so the arrays stay aligned for memoryview.cast
+    sections = [HEADER.pack(MAGIC, VERSION, flags, 0, v, e, len(labels)),
+                array('q', frozen.offsets).tobytes(),
+                array('q', frozen.targets).tobytes()]
+    if frozen.weighted:
+        sections.append(weights.tobytes())
+    if frozen.positions:
+        sections.append(array('d', positions).tobytes())
+    sections.append(labels)
+    return sections
+
+
+def save_binary(g, file_path):  # Theta(V+E)
+    # written next to the target and renamed, so a graph still mapped from file_path is never truncated
+    sections = encode(g)
+    temp_path = f"{file_path}.tmp{os.getpid()}"
+    with open(temp_path, 'wb') as file:
+        for section in sections:
+            file.write(section)
+    os.replace(temp_path, file_path)
+
+
+def load_binary(file_path):  # O(V) parsing, the edge arrays are mapped in place
+    with open(file_path, 'rb') as file:
+        mm = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    return decode(mm)
+
+
+def decode(buffer):  # O(V) parsing, the edge arrays are views into buffer
+    view = memoryview(buffer)
+    if len(view) < HEADER.size:
+        raise ValueError("Not a binary graph file")
+    magic, version, flags, _, v, e, label_size = HEADER.unpack_from(view, 0)
+    if magic != MAGIC:
+        raise ValueError("Not a binary graph file")
+    if version != VERSION:
+        raise ValueError(f"Unsupported binary graph version {version}")
+    if bool(flags & BIG_ENDIAN) != (sys.byteorder == 'big'):
+        raise ValueError("Binary graph file was written on a machine with a different byte order")
+
+    words = (v + 1) + e + (e if flags & WEIGHTED else 0) + (2 * v if flags & HAS_POSITIONS else 0)
+    if len(view) != HEADER.size + 8 * words + label_size:
+        raise ValueError("Binary graph file is truncated or corrupt")
+
+    position = HEADER.size
+
+    def section(typecode, count):
+        nonlocal position
+        start, position = position, position + 8 * count
+        return view[start:position].cast(typecode)
+
+    offsets = section('q', v + 1)
+    targets = section('q', e)
+    weights = section('d' if flags & FLOAT_WEIGHTS else 'q', e) if flags & WEIGHTED else None
+    coordinates = section('d', 2 * v) if flags & HAS_POSITIONS else None
+    labels = decode_labels(bytes(view[position:position + label_size]))
+
+    positions = {}
+    if coordinates is not None:
+        for i, label in enumerate(labels):
+            x, y = coordinates[2 * i], coordinates[2 * i + 1]
+            if x == x and y == y:  # NaN marks a vertex without a position
+                positions[label] = (x, y)
+
+    return FrozenGraph(labels, offsets, targets, weights, bool(flags & DIRECTED), bool(flags & WEIGHTED), positions)
@@ -0,0 +1,85 @@
+#  bounded LRU/TTL cache for shortest path query results, dropped whenever the graph is mutated
+
+import time
+from collections import OrderedDict
+from graph import Graph
+from spt import shortest_path_tree
+
+
+class QueryCache:
+    def __init__(self, g : Graph, maxsize=1024, ttl=None, clock=time.monotonic):
+        if maxsize <= 0:
+            raise ValueError("Cache size must be positive")
+        self.graph = g
+        self.maxsize = maxsize
+        self.ttl = ttl  # seconds a result stays valid, None keeps it until evicted or invalidated
+        self.clock = clock
+        self.entries = OrderedDict()  # key -> (expires_at, result), least recently used first
+        self.version = self._graph_version()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "invalidations": 0}
+
+    def _graph_version(self):
+        # a FrozenGraph never changes, so it has no version
+        return getattr(self.graph, "version", 0)
+
+    def _check_version(self): # Theta(1), clearing is Theta(size) once per mutation batch
+        version = self._graph_version()
+        if version != self.version:
+            self.version = version
+            if self.entries:
+                self.entries.clear()
+                self.stats["invalidations"] += 1
+
+    def query(self, algorithm, start_vertex, goal_vertex, **options): # Theta(1) on a hit
+        # algorithm is any search with the dijkstra signature, e.g. a3.dijkstra or a3.a_star;
+        # the cached (path, cost, stats) tuple is shared between hits, so callers must not mutate it
+        key = (algorithm, start_vertex, goal_vertex, tuple(sorted(options.items())))
+        result = self.get(key)
+        if result is None:
+            self.stats["misses"] += 1
+            result = algorithm(self.graph, start_vertex, goal_vertex, **options)
+            self.put(key, result)
+        else:
+            self.stats["hits"] += 1
+        return result
+
+    def tree(self, source, pq="binary"): # Theta(1) on a hit, O((V+E)logV) on a miss
+        # the complete shortest path tree from source, one entry per source sharing the LRU, TTL and invalidation
+        # of the query results; like them the cached ShortestPathTree is shared between hits
+        key = (shortest_path_tree, source, pq)
+        tree = self.get(key)
+        if tree is None:
+            self.stats["misses"] += 1
+            tree = shortest_path_tree(self.graph, source, pq=pq)
+            self.put(key, tree)
+        else:
+            self.stats["hits"] += 1
+        return tree
+
+    def get(self, key): # Theta(1)
+        self._check_version()
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        expires_at, result = entry
+        if expires_at is not None and self.clock() >= expires_at:
+            del self.entries[key]
+            self.stats["expirations"] += 1
+            return None
+        self.entries.move_to_end(key)
+        return result
+
+    def put(self, key, result): # Theta(1)
+        self._check_version()
+        expires_at = self.clock() + self.ttl if self.ttl is not None else None
+        self.entries[key] = (expires_at, result)
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def clear(self): # Theta(size)
+        self.entries.clear()
+
+    def __len__(self):
+        return len(self.entries)
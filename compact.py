@@ -0,0 +1,497 @@
+#  mutable Graph backend for very large graphs: labels are interned to dense integer ids once, and every
+#  adjacency list is a block of one shared typed array (weights in a parallel one) instead of a Python list of
+#  labels or (label, weight) tuples. Same public interface as Graph, list_of_neighbours is a read-only view
+
+from array import array
+from collections.abc import Mapping
+import instrument
+from csr import FrozenGraph
+from graph import Graph
+from loader import CHUNK_SIZE, _find_duplicate_line, _lines, _read_header
+from spatial import Positions
+
+TARGET_TYPECODE = 'i'  # ids below 2**31, half the size of a CSR target
+WEIGHT_TYPECODES = 'iqd'  # weights start as 32-bit ints and widen once a weight does not fit
+MIN_CAPACITY = 4  # slots given to a block the first time it has to move
+_FREE = object()  # labels entry of an id whose vertex was removed, reused by the next add_vertex
+
+
+class _CompactAdjacency(Mapping):
+    # read-only stand-in for Graph.list_of_neighbours, built on demand from the blocks
+    __slots__ = ("_graph",)
+
+    def __init__(self, graph):
+        self._graph = graph
+
+    def __getitem__(self, vertex):  # Theta(deg(vertex))
+        g = self._graph
+        u = g.ids[vertex]
+        s, n = g.start[u], g.length[u]
+        labels = g.labels
+        if g.weighted:
+            if g.floats is not None:
+                return [(labels[v], w if f else int(w))
+                        for v, w, f in zip(g.targets[s:s + n], g.weights[s:s + n], g.floats[s:s + n])]
+            return [(labels[v], w) for v, w in zip(g.targets[s:s + n], g.weights[s:s + n])]
+        return [labels[v] for v in g.targets[s:s + n]]
+
+    def __contains__(self, vertex):  # Theta(1)
+        return vertex in self._graph.ids
+
+    def __iter__(self):
+        return iter(self._graph.ids)
+
+    def __len__(self):
+        return len(self._graph.ids)
+
+
+class CompactGraph:
+    # the out-edges of id u are targets[start[u]:start[u] + length[u]], with room for capacity[u] before the
+    # block has to move to the end of the buffer; moved-out blocks are garbage until pack() squeezes them out
+    __slots__ = ("directed", "weighted", "labels", "ids", "start", "length", "capacity", "targets", "weights",
+                 "floats", "garbage", "free", "positions", "version", "list_of_neighbours", "edge_index", "reverse_index",
+                 "spatial_index", "coordinates", "__weakref__")
+
+    def __init__(self, directed=True, weighted=False, weight_typecode='i'):
+        self.directed = directed
+        self.weighted = weighted
+        self.labels = []  # id -> label
+        self.ids = {}  # label -> id, in insertion order like Graph.list_of_neighbours
+        self.start = array('q')
+        self.length = array('i')
+        self.capacity = array('i')
+        self.targets = array(TARGET_TYPECODE)
+        self.weights = array(weight_typecode)  # parallel to targets
+        # once weights are 'd', 1 where the stored weight was a float, so int weights still come back as ints
+        # (exactly up to 2**53)
+        self.floats = None
+        self.garbage = 0  # slots of targets no block owns
+        self.free = []  # ids of removed vertices
+
+        self.positions = Positions()
+        self.version = 0
+        self.list_of_neighbours = _CompactAdjacency(self)
+        self.edge_index = None  # never kept, edge lookups scan a block in C
+        self.reverse_index = None  # optional, the same {vertex: {predecessor: weight}} as Graph.reverse_index
+        self.spatial_index = None
+        self.coordinates = None
+
+    @classmethod
+    def from_graph(cls, g):  # Theta(V+E)
+        compact = cls(g.directed, g.weighted)
+        for v in g.list_of_neighbours:
+            compact._intern(v)
+        ids = compact.ids
+        for u, edges in g.list_of_neighbours.items():
+            i = ids[u]
+            compact.start[i] = len(compact.targets)
+            compact.length[i] = compact.capacity[i] = len(edges)
+            if g.weighted:
+                compact.targets.extend(array(TARGET_TYPECODE, [ids[e[0]] for e in edges]))
+                compact._extend_weights([e[1] for e in edges])
+            else:
+                compact.targets.extend(array(TARGET_TYPECODE, [ids[e] for e in edges]))
+        compact.positions.update(g.positions)
+        return compact
+
+    def build_edge_index(self):  # Theta(1)
+        pass  # is_edge and get_weight already scan a packed block, a dict per vertex would cost more than it saves
+
+    def drop_edge_index(self):  # Theta(1)
+        pass
+
+    build_reverse_index = Graph.build_reverse_index
+    drop_reverse_index = Graph.drop_reverse_index
+
+    def _intern(self, label):  # Theta(1)
+        if self.free:
+            i = self.free.pop()
+            self.labels[i] = label
+        else:
+            i = len(self.labels)
+            self.labels.append(label)
+            self.start.append(len(self.targets))
+            self.length.append(0)
+            self.capacity.append(0)
+        self.ids[label] = i
+        return i
+
+    def _widen(self, weights):  # Theta(E), at most twice in the life of the graph
+        code = self.weights.typecode
+        for w in weights:
+            if not isinstance(w, int) or not -2 ** 63 <= w < 2 ** 63:
+                code = 'd'
+                break
+            if not -2 ** 31 <= w < 2 ** 31 and code == 'i':
+                code = 'q'
+        if code != self.weights.typecode:
+            self.weights = array(code, iter(self.weights))
+            if code == 'd':
+                self.floats = array('b', [0]) * len(self.weights)
+
+    def _extend_weights(self, weights):
+        self._widen(weights)
+        self.weights.extend(array(self.weights.typecode, weights))
+        if self.floats is not None:
+            self.floats.extend(array('b', [not isinstance(w, int) for w in weights]))
+
+    def _grow(self, u):  # amortised Theta(1)
+        # doubles u's block, in place when it is the last block, otherwise by moving it to the end
+        if self.garbage > len(self.targets) // 3 + 1024:  # moved blocks leave up to half the buffer behind
+            self.pack()
+        s, n, cap = self.start[u], self.length[u], self.capacity[u]
+        new_cap = max(MIN_CAPACITY, 2 * cap)
+        end = len(self.targets)
+        if s + cap != end or cap == 0:
+            self.targets.extend(self.targets[s:s + n])
+            if self.weighted:
+                self.weights.extend(self.weights[s:s + n])
+                if self.floats is not None:
+                    self.floats.extend(self.floats[s:s + n])
+            self.garbage += cap
+            self.start[u] = end
+            cap = n
+        self.targets.extend(array(TARGET_TYPECODE, [0]) * (new_cap - cap))
+        if self.weighted:
+            self.weights.extend(array(self.weights.typecode, [0]) * (new_cap - cap))
+            if self.floats is not None:
+                self.floats.extend(array('b', [0]) * (new_cap - cap))
+        self.capacity[u] = new_cap
+
+    def pack(self, slack=0):  # Theta(V+E)
+        # rewrites every block back to back with room for slack more edges, dropping the garbage;
+        # the buffers are refilled in place so existing references to them stay valid
+        targets = array(TARGET_TYPECODE)
+        weights = array(self.weights.typecode)
+        floats = array('b')
+        for u in range(len(self.labels)):
+            s, n = self.start[u], self.length[u]
+            self.start[u] = len(targets)
+            if self.labels[u] is _FREE:
+                self.capacity[u] = 0
+                continue
+            targets.extend(self.targets[s:s + n])
+            if self.weighted:
+                weights.extend(self.weights[s:s + n])
+            if self.floats is not None:
+                floats.extend(self.floats[s:s + n])
+            if slack:
+                targets.extend(array(TARGET_TYPECODE, [0]) * slack)
+                if self.weighted:
+                    weights.extend(array(weights.typecode, [0]) * slack)
+                if self.floats is not None:
+                    floats.extend(array('b', [0]) * slack)
+            self.capacity[u] = n + slack
+        self.targets[:] = targets
+        self.weights[:] = weights
+        if self.floats is not None:
+            self.floats[:] = floats
+        self.garbage = 0
+
+    def _block(self, u):  # Theta(deg(u)), a copy of u's targets
+        s = self.start[u]
+        return self.targets[s:s + self.length[u]]
+
+    def _store(self, i, weight):
+        try:
+            self.weights[i] = weight
+        except (OverflowError, TypeError):
+            self._widen((weight,))
+            self.weights[i] = weight
+        if self.floats is not None:
+            self.floats[i] = not isinstance(weight, int)
+
+    def _weight(self, i):  # Theta(1)
+        w = self.weights[i]
+        return w if self.floats is None or self.floats[i] else int(w)
+
+    def _append(self, u, v, weight):  # amortised Theta(1)
+        if self.length[u] == self.capacity[u]:
+            self._grow(u)
+        i = self.start[u] + self.length[u]
+        self.targets[i] = v
+        if self.weighted:
+            self._store(i, weight)
+        self.length[u] += 1
+
+    def _id(self, vertex):
+        if vertex not in self.ids:
+            raise ValueError("Vertex not in Graph")
+        return self.ids[vertex]
+
+    def _ids(self, start_vertex, terminal_vertex):
+        if start_vertex not in self.ids or terminal_vertex not in self.ids:
+            raise ValueError("Vertices do not exist in current graph")
+        return self.ids[start_vertex], self.ids[terminal_vertex]
+
+    def add_vertex(self, name):  # Theta(1)
+        if name in self.ids:
+            raise ValueError("Vertex already in Graph")
+        if instrument.recorder is not None:
+            instrument.recorder.count("graph.add_vertex")
+        self._intern(name)
+        if self.reverse_index is not None:
+            self.reverse_index[name] = {}
+
+    def add_edge(self, start_vertex, terminal_vertex, weight=0):  # O(deg(start_vertex)) scanned in C
+        u, v = self._ids(start_vertex, terminal_vertex)
+        if v in self._block(u):
+            raise ValueError("Edge already exists")
+        self._append(u, v, weight)
+        self.version += 1
+        if instrument.recorder is not None:
+            instrument.recorder.count("graph.add_edge")
+        if self.reverse_index is not None:
+            self.reverse_index[terminal_vertex][start_vertex] = weight if self.weighted else None
+
+        if not self.directed and u not in self._block(v):
+            self._append(v, u, weight)
+            if self.reverse_index is not None:
+                self.reverse_index[start_vertex][terminal_vertex] = weight if self.weighted else None
+
+    def _find(self, u, v, missing="Edge does not exist"):  # O(deg(u)), position of v in targets
+        try:
+            return self.start[u] + self._block(u).index(v)
+        except ValueError:
+            raise ValueError(missing) from None
+
+    def _remove_entry(self, u, v):  # O(deg(u)), later entries shift down by one
+        i = self._find(u, v)
+        end = self.start[u] + self.length[u]
+        self.targets[i:end - 1] = self.targets[i + 1:end]
+        if self.weighted:
+            self.weights[i:end - 1] = self.weights[i + 1:end]
+        if self.floats is not None:
+            self.floats[i:end - 1] = self.floats[i + 1:end]
+        self.length[u] -= 1
+        if self.reverse_index is not None:
+            del self.reverse_index[self.labels[v]][self.labels[u]]
+
+    def remove_edge(self, start_vertex, terminal_vertex):  # O(deg)
+        u, v = self._ids(start_vertex, terminal_vertex)
+
+        self._remove_entry(u, v)
+        self.version += 1
+        if instrument.recorder is not None:
+            instrument.recorder.count("graph.remove_edge")
+        if not self.directed:
+            self._remove_entry(v, u)
+
+    def remove_vertex(self, vertex):  # O(V+E) directed, O(sum of neighbour degrees) undirected
+        if vertex not in self.ids:
+            raise ValueError("Vertex does not exist in current graph")
+        self.version += 1
+        if instrument.recorder is not None:
+            instrument.recorder.count("graph.remove_vertex")
+        self._write_position(vertex, None)
+        if self.coordinates is not None:
+            self.coordinates.remove(vertex)
+
+        v = self.ids.pop(vertex)
+        # undirected edges are symmetric, so only v's neighbours can point back at it
+        if self.reverse_index is not None:
+            for t in self._block(v):
+                self.reverse_index[self.labels[t]].pop(vertex, None)
+            sources = [self.ids[u] for u in self.reverse_index[vertex] if u != vertex]
+        else:
+            sources = set(self._block(v)) if not self.directed else self.ids.values()
+        for u in sources:
+            if u != v and v in self._block(u):
+                self._remove_entry(u, v)
+        if self.reverse_index is not None:
+            del self.reverse_index[vertex]
+        self.labels[v] = _FREE
+        self.garbage += self.capacity[v]
+        self.length[v] = self.capacity[v] = 0
+        self.free.append(v)
+
+    def get_v(self):  # O(1)
+        return len(self.ids)
+
+    def get_e(self):  # O(V)
+        return sum(self.length)
+
+    def out_degree(self, vertex):  # Theta(1)
+        return self.length[self._id(vertex)]
+
+    def is_edge(self, start_vertex, terminal_vertex):  # O(deg) scanned in C
+        u, v = self._ids(start_vertex, terminal_vertex)
+        exists = v in self._block(u)
+        if not self.directed:
+            exists = exists and u in self._block(v)
+        return exists
+
+    def neighbours(self, vertex) -> list:  # Theta(deg(vertex))
+        if vertex not in self.ids:
+            raise ValueError("Vertex not in Graph")
+        return self.list_of_neighbours[vertex]
+
+    def neighbours_v2(self, vertex):  # Theta(1)
+        return iter(self.neighbours(vertex))
+
+    def inbound_neighbours(self, vertex):  # O(V+E) scanned in C, O(in-degree) reverse indexed
+        if not self.directed:
+            return self.neighbours(vertex)
+        v = self._id(vertex)
+        if self.reverse_index is not None:
+            return list(self.reverse_index[vertex])
+        return [self.labels[u] for u in self.ids.values() if v in self._block(u)]
+
+    def get_vertices(self):  # O(V)
+        return list(self.ids)
+
+    def change_if_directed(self, option: bool):  # O(V+E)
+        if self.directed == option:
+            return
+        self.version += 1
+        if not option:
+            # every edge gets its reverse, with the same weight, unless the reverse already exists
+            for u in list(self.ids.values()):
+                s = self.start[u]
+                for i, v in enumerate(self._block(u)):
+                    if u not in self._block(v):
+                        self._append(v, u, self._weight(s + i) if self.weighted else 0)
+                        s = self.start[u]  # appending may have moved u's block
+        self.directed = option
+        if self.reverse_index is not None:
+            self.build_reverse_index()
+
+    def get_weight(self, start_vertex, terminal_vertex):  # O(deg(start_vertex))
+        if not self.weighted:
+            raise ValueError("Graph is not weighted")
+        if start_vertex not in self.ids:
+            raise ValueError("Start vertex does not exist")
+        return self._weight(self._find(self.ids[start_vertex], self.ids.get(terminal_vertex, -1)))
+
+    def set_weight(self, start_vertex, terminal_vertex, weight):  # O(deg)
+        if not self.weighted:
+            raise ValueError("Graph is not weighted")
+        if start_vertex not in self.ids:
+            raise ValueError("Start vertex does not exist")
+        u, v = self.ids[start_vertex], self.ids.get(terminal_vertex, -1)
+        i = self._find(u, v)
+        j = self._find(v, u, "Reverse edge does not exist") if not self.directed else None
+        self._store(i, weight)
+        self.version += 1
+        if j is not None:
+            self._store(j, weight)
+        if self.reverse_index is not None:
+            self.reverse_index[terminal_vertex][start_vertex] = weight
+            if not self.directed:
+                self.reverse_index[start_vertex][terminal_vertex] = weight
+
+    def change_if_weighted(self, option: bool):  # O(V+E)
+        if self.weighted == option:
+            return
+        self.version += 1
+        # new weights are 0, as in Graph
+        self.weights = array('i', [0]) * len(self.targets) if option else array('i')
+        self.floats = None
+        self.weighted = option
+        if self.reverse_index is not None:
+            self.build_reverse_index()
+
+    @instrument.instrumented("freeze")
+    def freeze(self):  # Theta(V+E)
+        labels = list(self.ids)
+        order = list(self.ids.values())
+        offsets = array('q', [0])
+        targets = array(TARGET_TYPECODE)
+        weights = array(self.weights.typecode) if self.weighted else None
+        for u in order:
+            s, n = self.start[u], self.length[u]
+            targets.extend(self.targets[s:s + n])
+            if self.weighted:
+                weights.extend(self.weights[s:s + n])
+            offsets.append(len(targets))
+        if order != list(range(len(order))):
+            # removed or reused ids, renumber in vertex order
+            remap = array('q', [-1]) * len(self.labels)
+            for new, old in enumerate(order):
+                remap[old] = new
+            targets = [remap[v] for v in targets]
+        if self.weighted and weights.typecode == 'i':
+            weights = array('q', weights)  # FrozenGraph and the binary format use 8-byte weights
+        return FrozenGraph(labels, offsets, array('q', targets), weights, self.directed, self.weighted, self.positions)
+
+    def thaw(self):  # Theta(V+E), an ordinary Graph
+        g = Graph(directed=self.directed, weighted=self.weighted)
+        g.list_of_neighbours = {v: self.list_of_neighbours[v] for v in self.ids}
+        g.positions.update(self.positions)
+        return g
+
+    def read_from_file(file_path, chunk_size=CHUNK_SIZE):  # Theta(V+E)
+        return load_compact(file_path, chunk_size)
+
+    def load_binary(file_path):  # Theta(V+E), copied out of the memory-mapped file
+        return CompactGraph.from_graph(Graph.load_binary(file_path))
+
+    # positions, spatial queries, traversals, printing and saving only go through the public interface,
+    # so Graph's implementations are shared as they are
+    save_binary = Graph.save_binary
+    read_positions_from_file = Graph.read_positions_from_file
+    set_position = Graph.set_position
+    _write_position = Graph._write_position
+    nearest_vertex = Graph.nearest_vertex
+    euclidean_distance = Graph.euclidean_distance
+    build_spatial_index = Graph.build_spatial_index
+    drop_spatial_index = Graph.drop_spatial_index
+    build_coordinates = Graph.build_coordinates
+    drop_coordinates = Graph.drop_coordinates
+    print_positions = Graph.print_positions
+    BFS_iter = Graph.BFS_iter
+    DFS_iter = Graph.DFS_iter
+    BFS_levels = Graph.BFS_levels
+    __str__ = Graph.__str__
+
+
+@instrument.instrumented("load_compact")
+def load_compact(file_path, chunk_size=CHUNK_SIZE):  # Theta(V+E)
+    # the edge-list format of loader.load_edge_list, read straight into a CompactGraph without building the
+    # dict-of-lists form first; blocks grow while the file is read and are packed tight at the end
+    with open(file_path, 'rb') as file:
+        directed, weighted, header_size = _read_header(file)
+        g = CompactGraph(directed, weighted)
+        ids, intern, append = g.ids, g._intern, g._append
+        expected = 3 if weighted else 2
+        line_number = 1
+        for _, lines in _lines(file, header_size, False, chunk_size):
+            for raw in lines:
+                line_number += 1
+                parts = raw.split()
+                if not parts:
+                    continue
+                u = ids.get(parts[0])
+                if u is None:
+                    u = intern(parts[0])
+                if len(parts) == 1:
+                    continue
+                if len(parts) < expected:
+                    raise ValueError(f"Line {line_number}: expected {expected} fields, got {len(parts)}")
+                v = ids.get(parts[1])
+                if v is None:
+                    v = intern(parts[1])
+
+                weight = 0
+                if weighted:
+                    try:
+                        weight = int(parts[2])
+                    except ValueError:
+                        raise ValueError(f"Line {line_number}: invalid weight {parts[2]!r}") from None
+                append(u, v, weight)
+                if not directed and u != v:
+                    append(v, u, weight)
+
+    g.pack()
+    for u in range(len(g.labels)):
+        block = g._block(u)
+        if len(set(block)) != len(block):
+            seen = set()
+            for v in block:
+                if v in seen:
+                    a, b = g.labels[u], g.labels[v]
+                    raise ValueError(f"Line {_find_duplicate_line(file_path, a, b, directed)}: edge already exists ({a}, {b})")
+                seen.add(v)
+    if instrument.recorder is not None:
+        instrument.recorder.count("load_compact.lines", line_number - 1)
+    return g
@@ -0,0 +1,240 @@
+#  contraction hierarchies: preprocess a static weighted graph once, then answer shortest path queries
+#  with a bidirectional search that only climbs towards higher ranked vertices
+
+import heapq
+import json
+from binary import encode_labels, label_from_json
+from graph import Graph
+
+FORMAT_VERSION = 1
+PRIORITY_SETTLE_LIMIT = 50  # cheaper witness searches while only estimating a vertex's priority
+
+
+class ContractionHierarchy:
+    def __init__(self, labels, rank, up, down, middle):
+        self.labels = labels  # id -> label
+        self.ids = {label: i for i, label in enumerate(labels)}
+        self.rank = rank  # contraction order, higher ranks were contracted later
+        self.up = up  # up[u] = [(v, w)] for edges u -> v with rank[v] > rank[u]
+        self.down = down  # down[v] = [(u, w)] for edges u -> v with rank[u] > rank[v]
+        self.middle = middle  # {(u, v): contracted vertex a shortcut u -> v skips over}
+
+    def get_v(self):  # O(1)
+        return len(self.labels)
+
+    def shortcut_count(self):  # O(1)
+        return len(self.middle)
+
+    def query(self, start_vertex, goal_vertex): # O(search space in the hierarchy)
+        if start_vertex not in self.ids or goal_vertex not in self.ids:
+            raise ValueError("Start or goal vertex not in graph")
+
+        stats = {"cost_calls": 0, "pq_pushes": 0, "pq_pops": 0}
+        source, target = self.ids[start_vertex], self.ids[goal_vertex]
+
+        inf = float('inf')
+        sides = [(self.up, {source: 0}, {}, [(0, source)]), (self.down, {target: 0}, {}, [(0, target)])]
+        best, meeting_vertex = inf, None
+
+        # unlike plain bidirectional dijkstra each side runs until its own queue minimum reaches the best path
+        side = 0
+        while True:
+            if not (sides[side][3] and sides[side][3][0][0] < best):
+                side = 1 - side
+                if not (sides[side][3] and sides[side][3][0][0] < best):
+                    break
+
+            edges, distances, came_from, queue = sides[side]
+            other_distances = sides[1 - side][1]
+
+            d, u = heapq.heappop(queue)
+            stats["pq_pops"] += 1
+            if d > distances[u]:
+                continue
+
+            if u in other_distances and d + other_distances[u] < best:
+                best = d + other_distances[u]
+                meeting_vertex = u
+
+            for v, w in edges[u]:
+                stats["cost_calls"] += 1
+                distance = d + w
+                if distance < distances.get(v, inf):
+                    distances[v] = distance
+                    came_from[v] = u
+                    heapq.heappush(queue, (distance, v))
+                    stats["pq_pushes"] += 1
+
+            side = 1 - side
+
+        if meeting_vertex is None:
+            return None, inf, stats
+
+        forward_came_from, backward_came_from = sides[0][2], sides[1][2]
+        hops = [meeting_vertex]
+        while hops[-1] != source:
+            hops.append(forward_came_from[hops[-1]])
+        hops.reverse()
+        while hops[-1] != target:
+            hops.append(backward_came_from[hops[-1]])
+
+        path = [source]
+        for i in range(len(hops) - 1):
+            self._unpack(hops[i], hops[i + 1], path)
+        return [self.labels[u] for u in path], best, stats
+
+    def _unpack(self, u, v, path): # O(edges the shortcut stands for), iterative so deep shortcuts cannot recurse
+        stack = [(u, v)]
+        while stack:
+            a, b = stack.pop()
+            m = self.middle.get((a, b))
+            if m is None:
+                path.append(b)
+            else:
+                stack.append((m, b))
+                stack.append((a, m))
+
+    def save(self, file_path): # Theta(V+E)
+        encode_labels(self.labels)  # raises ValueError for labels that would not load back the same
+        data = {
+            "version": FORMAT_VERSION,
+            "labels": self.labels,
+            "rank": self.rank,
+            "up": [[x for edge in edges for x in edge] for edges in self.up],
+            "down": [[x for edge in edges for x in edge] for edges in self.down],
+            "middle": [[u, v, m] for (u, v), m in self.middle.items()],
+        }
+        with open(file_path, 'w') as file:
+            json.dump(data, file)
+
+    @classmethod
+    def load(cls, file_path): # Theta(V+E)
+        with open(file_path, 'r') as file:
+            data = json.load(file)
+        if data.get("version") != FORMAT_VERSION:
+            raise ValueError("Unsupported contraction hierarchy file")
+
+        def pairs(flat):
+            return [(flat[i], flat[i + 1]) for i in range(0, len(flat), 2)]
+
+        return cls([label_from_json(label) for label in data["labels"]], data["rank"],
+                   [pairs(edges) for edges in data["up"]],
+                   [pairs(edges) for edges in data["down"]],
+                   {(u, v): m for u, v, m in data["middle"]})
+
+
+def _witness_search(out_edges, contracted, source, skipped, targets, limit, settle_limit): # bounded dijkstra
+    # distances from source that avoid the vertex being contracted,
+    # stopping past limit or once every target is settled
+    distances = {source: 0}
+    queue = [(0, source)]
+    settled = 0
+    remaining = len(targets)
+    while queue and settled < settle_limit:
+        d, u = heapq.heappop(queue)
+        if d > distances[u]:
+            continue
+        if d > limit:
+            break
+        settled += 1
+        if u in targets:
+            remaining -= 1
+            if remaining == 0:
+                break
+        for v, w in out_edges[u].items():
+            if v == skipped or contracted[v]:
+                continue
+            distance = d + w
+            if distance < distances.get(v, float('inf')):
+                distances[v] = distance
+                heapq.heappush(queue, (distance, v))
+    return distances
+
+
+def _shortcuts(out_edges, in_edges, contracted, v, settle_limit):
+    # shortcuts (u, w, length) that contracting v would need
+    needed = []
+    outgoing = [(w, l) for w, l in out_edges[v].items() if not contracted[w]]
+    if not outgoing:
+        return needed
+    limit = max(l for _, l in outgoing)
+    targets = {w for w, _ in outgoing}
+    for u, l_in in in_edges[v].items():
+        if contracted[u]:
+            continue
+        distances = _witness_search(out_edges, contracted, u, v, targets - {u}, l_in + limit, settle_limit)
+        for w, l_out in outgoing:
+            if w != u and distances.get(w, float('inf')) > l_in + l_out:
+                needed.append((u, w, l_in + l_out))
+    return needed
+
+
+def build_contraction_hierarchy(g : Graph, settle_limit=500): # preprocessing, roughly O(V * witness search)
+    labels = list(g.list_of_neighbours)
+    ids = {label: i for i, label in enumerate(labels)}
+    n = len(labels)
+
+    out_edges = [{} for _ in range(n)]
+    in_edges = [{} for _ in range(n)]
+    for label in labels:
+        u = ids[label]
+        for edge in g.list_of_neighbours[label]:
+            v, w = (ids[edge[0]], edge[1]) if g.weighted else (ids[edge], 1)
+            if w < 0:
+                raise ValueError("Contraction hierarchies need non-negative weights")
+            if u != v and w < out_edges[u].get(v, float('inf')):
+                out_edges[u][v] = w
+                in_edges[v][u] = w
+
+    contracted = [False] * n
+    deleted_neighbours = [0] * n
+    rank = [0] * n
+    up = [[] for _ in range(n)]
+    down = [[] for _ in range(n)]
+    middle = {}
+
+    def priority(v):
+        # edge difference plus the number of already contracted neighbours, which spreads contraction evenly
+        return (len(_shortcuts(out_edges, in_edges, contracted, v, min(settle_limit, PRIORITY_SETTLE_LIMIT)))
+                - len(out_edges[v]) - len(in_edges[v]) + deleted_neighbours[v])
+
+    latest = [priority(v) for v in range(n)]  # the queue keeps stale entries, only the latest one counts
+    queue = [(p, v) for v, p in enumerate(latest)]
+    heapq.heapify(queue)
+
+    order = 0
+    while queue:
+        p, v = heapq.heappop(queue)
+        if contracted[v] or p != latest[v]:
+            continue
+        # lazy update: neighbours of neighbours may have changed v's priority, re-evaluate before committing
+        latest[v] = priority(v)
+        if queue and latest[v] > queue[0][0]:
+            heapq.heappush(queue, (latest[v], v))
+            continue
+
+        for u, w, length in _shortcuts(out_edges, in_edges, contracted, v, settle_limit):
+            if length < out_edges[u].get(w, float('inf')):
+                out_edges[u][w] = length
+                in_edges[w][u] = length
+                middle[(u, w)] = v
+
+        rank[v] = order
+        order += 1
+        contracted[v] = True
+
+        for w, length in out_edges[v].items():
+            up[v].append((w, length))
+            del in_edges[w][v]
+            deleted_neighbours[w] += 1
+        for u, length in in_edges[v].items():
+            down[v].append((u, length))
+            del out_edges[u][v]
+            deleted_neighbours[u] += 1
+        # contracting v changed its neighbours' edge differences, refresh them now
+        for x in set(out_edges[v]) | set(in_edges[v]):
+            latest[x] = priority(x)
+            heapq.heappush(queue, (latest[x], x))
+        out_edges[v], in_edges[v] = {}, {}
+
+    return ContractionHierarchy(labels, rank, up, down, middle)
@@ -0,0 +1,177 @@
+#  immutable compressed sparse row snapshot of a Graph
+
+from array import array
+from collections.abc import Mapping
+
+
+def _weight_typecode(weights):
+    return 'q' if all(isinstance(w, int) for w in weights) else 'd'
+
+
+class _AdjacencyView(Mapping):
+    # read-only stand-in for Graph.list_of_neighbours, built on demand from the CSR buffers
+    def __init__(self, frozen):
+        self._frozen = frozen
+
+    def __getitem__(self, vertex):  # Theta(deg(vertex))
+        f = self._frozen
+        u = f.ids[vertex]
+        lo, hi = f.offsets[u], f.offsets[u + 1]
+        labels = f.labels
+        if f.weighted:
+            return [(labels[f.targets[i]], f.weights[i]) for i in range(lo, hi)]
+        return [labels[f.targets[i]] for i in range(lo, hi)]
+
+    def __contains__(self, vertex):  # Theta(1)
+        return vertex in self._frozen.ids
+
+    def __iter__(self):
+        return iter(self._frozen.labels)
+
+    def __len__(self):
+        return len(self._frozen.labels)
+
+
+class FrozenGraph:
+    def __init__(self, labels, offsets, targets, weights=None, directed=True, weighted=False, positions=None):
+        self.labels = labels  # id -> label
+        self.ids = {label: i for i, label in enumerate(labels)}  # label -> id
+        self.offsets = offsets  # out-edges of u are targets[offsets[u]:offsets[u + 1]]
+        self.targets = targets
+        self.weights = weights  # parallel to targets, None when unweighted
+        self.directed = directed
+        self.weighted = weighted
+        self.positions = dict(positions) if positions else {}
+        self.list_of_neighbours = _AdjacencyView(self)
+
+    @classmethod
+    def from_graph(cls, g):  # Theta(V+E)
+        labels = list(g.list_of_neighbours)
+        ids = {label: i for i, label in enumerate(labels)}
+
+        offsets = array('q', [0])
+        targets = array('q')
+        raw_weights = []
+        for v in labels:
+            for edge in g.list_of_neighbours[v]:
+                if g.weighted:
+                    targets.append(ids[edge[0]])
+                    raw_weights.append(edge[1])
+                else:
+                    targets.append(ids[edge])
+            offsets.append(len(targets))
+
+        weights = array(_weight_typecode(raw_weights), raw_weights) if g.weighted else None
+        return cls(labels, offsets, targets, weights, g.directed, g.weighted, g.positions)
+
+    def __setattr__(self, name, value):
+        if name in self.__dict__:
+            raise AttributeError("FrozenGraph is immutable")
+        super().__setattr__(name, value)
+
+    # ============================
+    # Read-only Graph interface
+    # ============================
+
+    def get_v(self):  # O(1)
+        return len(self.labels)
+
+    def get_e(self):  # O(1)
+        return len(self.targets)
+
+    def get_vertices(self):  # O(V)
+        return list(self.labels)
+
+    def out_degree(self, vertex):  # Theta(1)
+        u = self._id(vertex)
+        return self.offsets[u + 1] - self.offsets[u]
+
+    def neighbours(self, vertex) -> list:  # Theta(deg(vertex))
+        if vertex not in self.ids:
+            raise ValueError("Vertex not in Graph")
+        return self.list_of_neighbours[vertex]
+
+    def neighbours_v2(self, vertex):  # Theta(1)
+        return iter(self.neighbours(vertex))
+
+    def inbound_neighbours(self, vertex):  # O(E)
+        if not self.directed:
+            return self.neighbours(vertex)
+        v = self._id(vertex)
+        ans = []
+        for u in range(len(self.labels)):
+            for i in range(self.offsets[u], self.offsets[u + 1]):
+                if self.targets[i] == v:
+                    ans.append(self.labels[u])
+                    break
+        return ans
+
+    def is_edge(self, start_vertex, terminal_vertex):  # O(deg(start_vertex))
+        if start_vertex not in self.ids or terminal_vertex not in self.ids:
+            raise ValueError("Vertices do not exist in current graph")
+        return self._edge_index(self.ids[start_vertex], self.ids[terminal_vertex]) is not None
+
+    def get_weight(self, start_vertex, terminal_vertex):  # O(deg(start_vertex))
+        if not self.weighted:
+            raise ValueError("Graph is not weighted")
+        if start_vertex not in self.ids:
+            raise ValueError("Start vertex does not exist")
+        i = self._edge_index(self.ids[start_vertex], self.ids.get(terminal_vertex, -1))
+        if i is None:
+            raise ValueError("Edge does not exist")
+        return self.weights[i]
+
+    def euclidean_distance(self, v1, v2):
+        if v1 not in self.positions or v2 not in self.positions:
+            raise ValueError("Vertex position not found")
+
+        x1, y1 = self.positions[v1]
+        x2, y2 = self.positions[v2]
+
+        return ((x1 - x2) ** 2 + (y1 - y2) ** 2) ** 0.5
+
+    @property
+    def coordinates(self):  # Theta(V) on first use, Theta(1) after
+        # positions as contiguous arrays indexed by id, see heuristics.Coordinates; an attribute like
+        # Graph.coordinates, but always available since the positions cannot change
+        if "_coordinates" not in self.__dict__:
+            from heuristics import Coordinates
+            self._coordinates = Coordinates(self.labels, self.positions, self.ids)
+        return self._coordinates
+
+    def BFS_iter(self, start_vertex):  # theta(1)
+        from graph import BFSIterator
+        return BFSIterator(self, start_vertex)
+
+    def DFS_iter(self, start_vertex):  # theta(1)
+        from graph import DFSIterator
+        return DFSIterator(self, start_vertex)
+
+    def BFS_levels(self, start_vertex, direction_optimizing=False):  # theta(1)
+        from graph import LevelBFSIterator
+        return LevelBFSIterator(self, start_vertex, direction_optimizing)
+
+    def thaw(self):  # Theta(V+E)
+        from graph import Graph
+        g = Graph(directed=self.directed, weighted=self.weighted)
+        g.list_of_neighbours = {v: self.list_of_neighbours[v] for v in self.labels}
+        g.positions.update(self.positions)
+        return g
+
+    def save_binary(self, file_path):  # Theta(V+E)
+        from binary import save_binary
+        save_binary(self, file_path)
+
+    def __str__(self):  # theta(V+E)
+        return str(self.thaw())
+
+    def _id(self, vertex):
+        if vertex not in self.ids:
+            raise ValueError("Vertex not in Graph")
+        return self.ids[vertex]
+
+    def _edge_index(self, u, v):
+        for i in range(self.offsets[u], self.offsets[u + 1]):
+            if self.targets[i] == v:
+                return i
+        return None
@@ -0,0 +1,142 @@
+#  dynamic single source shortest paths: keep a shortest path tree valid across batches of edge updates
+#  by repairing only the vertices whose distance can change (Ramalingam-Reps style)
+
+import heapq
+from graph import Graph
+from spt import ShortestPathTree, shortest_path_tree
+
+
+class DynamicShortestPathTree(ShortestPathTree):
+    # the graph must only change through apply(); repairs of a directed graph read in-edges from a private
+    # {vertex: {predecessor: weight}} map kept here, the graph itself is left without a reverse index.
+    # stats keeps the initial search counters and adds batches, affected and repaired summed over every
+    # apply(), last_batch holds affected and repaired for the most recent one
+    def __init__(self, g : Graph, source):
+        tree = shortest_path_tree(g, source)
+        super().__init__(source, tree.distances, tree.parent, True, stats=tree.stats)
+        self.graph = g
+        self.inbound = None
+        if g.directed:
+            self.inbound = {v: {} for v in g.list_of_neighbours}
+            for u, edges in g.list_of_neighbours.items():
+                for e in edges:
+                    if g.weighted:
+                        self.inbound[e[0]][u] = e[1]
+                    else:
+                        self.inbound[e][u] = 1
+        self.children = {v: set() for v in self.distances}
+        for v, p in self.parent.items():
+            self.children[p].add(v)
+        self.stats.update({"batches": 0, "affected": 0, "repaired": 0})
+        self.last_batch = {"affected": 0, "repaired": 0}
+
+    def _in_edges(self, v):
+        g = self.graph
+        if g.directed:
+            return self.inbound.get(v, {}).items()
+        return [(u, w) for u, w in g.list_of_neighbours[v]] if g.weighted else [(u, 1) for u in g.list_of_neighbours[v]]
+
+    def _out_edges(self, u):
+        g = self.graph
+        return g.list_of_neighbours[u] if g.weighted else [(v, 1) for v in g.list_of_neighbours[u]]
+
+    def _weight(self, u, v):
+        g = self.graph
+        if not g.is_edge(u, v):
+            return None
+        return g.get_weight(u, v) if g.weighted else 1
+
+    def _attach(self, v, p, d):
+        old = self.parent.get(v)
+        if old is not None:
+            self.children[old].discard(v)
+        self.distances[v] = d
+        self.parent[v] = p
+        self.children.setdefault(p, set()).add(v)
+        self.children.setdefault(v, set())
+
+    def _validate(self, changes): # O(len(changes) * deg)
+        # replays which edges exist through the batch, so a bad change is reported before anything is applied
+        g = self.graph
+        present = {}
+        for u, v, weight in changes:
+            key = (u, v) if g.directed else frozenset((u, v))
+            exists = present[key] if key in present else g.is_edge(u, v)
+            if weight is None and not exists:
+                raise ValueError("Edge does not exist")
+            present[key] = weight is not None
+
+    def apply(self, changes): # O(affected * log(affected) + edges touching them)
+        # changes is a list of (u, v, weight): weight None deletes the edge, otherwise the edge is inserted
+        # or reweighted; for an unweighted graph any weight inserts. Returns the number of vertices repaired.
+        # A batch is checked as a whole first, on a ValueError neither the graph nor the tree has changed.
+        g = self.graph
+        changes = list(changes)
+        self._validate(changes)
+        directed_changes = []
+        for u, v, weight in changes:
+            old = self._weight(u, v)
+            if weight is None:
+                if old is None:
+                    raise ValueError("Edge does not exist")
+                g.remove_edge(u, v)
+            elif old is None:
+                g.add_edge(u, v, weight)
+            elif g.weighted:
+                g.set_weight(u, v, weight)
+            new = None if weight is None else (weight if g.weighted else 1)
+            directed_changes.append((u, v, old, new))
+            if self.inbound is not None:
+                if new is None:
+                    del self.inbound[v][u]
+                else:
+                    self.inbound.setdefault(v, {})[u] = new
+            if not g.directed:
+                directed_changes.append((v, u, old, new))
+
+        # 1. an edge on the tree that got longer or vanished invalidates the subtree hanging below it
+        affected = set()
+        for u, v, old, new in directed_changes:
+            if self.parent.get(v) == u and v not in affected and (new is None or new > old):
+                stack = [v]
+                while stack:
+                    x = stack.pop()
+                    if x not in affected:
+                        affected.add(x)
+                        stack.extend(self.children.get(x, ()))
+
+        for x in affected:
+            self.children[self.parent.pop(x)].discard(x)
+            del self.distances[x]
+        for x in affected:
+            self.children[x] = set()
+
+        # 2. seed the repair queue: affected vertices from their best unaffected in-neighbour,
+        #    and the heads of edges that got shorter or were inserted
+        queue = []
+        for x in affected:
+            for u, w in self._in_edges(x):
+                if u in self.distances:
+                    heapq.heappush(queue, (self.distances[u] + w, x, u))
+        for u, v, old, new in directed_changes:
+            if new is not None and u in self.distances and (old is None or new < old):
+                if self.distances[u] + new < self.distances.get(v, float('inf')):
+                    heapq.heappush(queue, (self.distances[u] + new, v, u))
+
+        # 3. dijkstra restricted to vertices whose distance improves
+        repaired = set()
+        while queue:
+            d, v, p = heapq.heappop(queue)
+            if d >= self.distances.get(v, float('inf')):
+                continue
+            self._attach(v, p, d)
+            repaired.add(v)
+            for x, w in self._out_edges(v):
+                if d + w < self.distances.get(x, float('inf')):
+                    heapq.heappush(queue, (d + w, x, v))
+
+        self.last_batch = {"affected": len(affected), "repaired": len(repaired)}
+        self.stats["batches"] += 1
+        self.stats["affected"] += len(affected)
+        self.stats["repaired"] += len(repaired)
+        return len(repaired | affected)
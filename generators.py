@@ -0,0 +1,146 @@
+#  seeded synthetic graphs for tests and benchmarks, the same arguments always give the same graph;
+#  vertices are integers (tuples for the bipartite sides) and weights are positive integers unless stated;
+#  min_weight and max_weight bound random weights, floats draws them uniformly from that range instead
+
+import math
+import random
+from graph import Graph
+
+GRID_SPACING = 100  # distance between neighbouring grid intersections
+
+
+def _graph(adjacency, directed, weighted, positions=None): # Theta(1)
+    g = Graph(adjacency, directed=directed, weighted=weighted)
+    if positions:
+        g.positions.update(positions)
+    return g
+
+
+def _weight(rng, min_weight, max_weight, floats):
+    return rng.uniform(min_weight, max_weight) if floats else rng.randint(min_weight, max_weight)
+
+
+def _link(adjacency, u, v, weight, directed, weighted):
+    adjacency[u].append((v, weight) if weighted else v)
+    if not directed:
+        adjacency[v].append((u, weight) if weighted else u)
+
+
+def grid_network(rows, cols, seed=0, directed=False, drop=0.0, diagonal=False): # Theta(rows*cols)
+    # a road-like grid with positions: each street is at least as long as the straight line between its ends,
+    # so the euclidean heuristic stays admissible (manhattan too, octile with diagonal streets);
+    # drop removes that fraction of streets at random
+    rng = random.Random(seed)
+    adjacency = {r * cols + c: [] for r in range(rows) for c in range(cols)}
+    positions = {r * cols + c: (float(c * GRID_SPACING), float(r * GRID_SPACING)) for r in range(rows) for c in range(cols)}
+    steps = [(0, 1), (1, 0)] + ([(1, 1), (1, -1)] if diagonal else [])
+    for r in range(rows):
+        for c in range(cols):
+            u = r * cols + c
+            for dr, dc in steps:
+                if not (r + dr < rows and 0 <= c + dc < cols) or rng.random() < drop:
+                    continue
+                v = u + dr * cols + dc
+                length = GRID_SPACING if dr == 0 or dc == 0 else math.ceil(GRID_SPACING * math.sqrt(2))
+                _link(adjacency, u, v, length + rng.randrange(GRID_SPACING // 2), directed, True)
+                if directed and rng.random() < 0.8:  # most streets are two-way
+                    _link(adjacency, v, u, length + rng.randrange(GRID_SPACING // 2), True, True)
+    return _graph(adjacency, directed, True, positions)
+
+
+def random_geometric(n, m, seed=0, directed=True, side=100.0): # Theta(n+m)
+    # n points uniform in a side x side square joined by m distinct random edges, each weighted at least its
+    # straight-line length (rounded up, plus up to 10), so the euclidean heuristic stays admissible
+    if m > n * (n - 1) // (1 if directed else 2):
+        raise ValueError("Too many edges for the number of vertices")
+    rng = random.Random(seed)
+    positions = {v: (rng.uniform(0, side), rng.uniform(0, side)) for v in range(n)}
+    adjacency = {v: [] for v in range(n)}
+    seen = set()
+    while len(seen) < m:
+        u, v = rng.randrange(n), rng.randrange(n)
+        key = (u, v) if directed or u < v else (v, u)
+        if u == v or key in seen:
+            continue
+        seen.add(key)
+        _link(adjacency, u, v, int(math.dist(positions[u], positions[v])) + 1 + rng.randrange(10), directed, True)
+    return _graph(adjacency, directed, True, positions)
+
+
+def erdos_renyi(n, m, seed=0, directed=True, weighted=True, max_weight=100, min_weight=1, floats=False): # Theta(n+m)
+    # G(n, m): m distinct edges chosen uniformly, no self loops
+    if m > n * (n - 1) // (1 if directed else 2):
+        raise ValueError("Too many edges for the number of vertices")
+    rng = random.Random(seed)
+    adjacency = {v: [] for v in range(n)}
+    seen = set()
+    while len(seen) < m:
+        u, v = rng.randrange(n), rng.randrange(n)
+        if u == v:
+            continue
+        key = (u, v) if directed or u < v else (v, u)
+        if key in seen:
+            continue
+        seen.add(key)
+        _link(adjacency, u, v, _weight(rng, min_weight, max_weight, floats), directed, weighted)
+    return _graph(adjacency, directed, weighted)
+
+
+def barabasi_albert(n, k, seed=0, weighted=True, max_weight=100, min_weight=1, floats=False): # Theta(n*k)
+    # undirected preferential attachment: each new vertex links to k distinct earlier vertices picked in
+    # proportion to their degree, which gives the power-law degree tail of social and web graphs
+    if not 0 < k < n:
+        raise ValueError("k must be between 1 and n - 1")
+    rng = random.Random(seed)
+    adjacency = {v: [] for v in range(n)}
+    ends = []  # every edge endpoint once, so a uniform pick is a degree-proportional pick
+    for v in range(k + 1):  # a small clique to start from
+        for u in range(v):
+            _link(adjacency, u, v, _weight(rng, min_weight, max_weight, floats), False, weighted)
+            ends += (u, v)
+    for v in range(k + 1, n):
+        chosen = set()
+        while len(chosen) < k:
+            chosen.add(rng.choice(ends))
+        for u in sorted(chosen):
+            _link(adjacency, u, v, _weight(rng, min_weight, max_weight, floats), False, weighted)
+            ends += (u, v)
+    return _graph(adjacency, False, weighted)
+
+
+def random_dag(n, m, seed=0, weighted=True, max_weight=100, min_weight=1, floats=False): # Theta(n+m)
+    # edges only run from lower to higher numbers, the vertices are listed in a shuffled order
+    if m > n * (n - 1) // 2:
+        raise ValueError("Too many edges for the number of vertices")
+    rng = random.Random(seed)
+    order = list(range(n))
+    rng.shuffle(order)
+    adjacency = {v: [] for v in order}
+    seen = set()
+    while len(seen) < m:
+        u, v = rng.randrange(n), rng.randrange(n)
+        if u == v:
+            continue
+        u, v = min(u, v), max(u, v)
+        if (u, v) in seen:
+            continue
+        seen.add((u, v))
+        _link(adjacency, u, v, _weight(rng, min_weight, max_weight, floats), True, weighted)
+    return _graph(adjacency, True, weighted)
+
+
+def random_bipartite(a, b, m, seed=0, weighted=False, max_weight=100, min_weight=1, floats=False): # Theta(a+b+m)
+    # undirected with sides ('L', i) and ('R', j)
+    if m > a * b:
+        raise ValueError("Too many edges for the sides")
+    rng = random.Random(seed)
+    adjacency = {('L', i): [] for i in range(a)}
+    adjacency.update({('R', j): [] for j in range(b)})
+    seen = set()
+    while len(seen) < m:
+        key = (rng.randrange(a), rng.randrange(b))
+        if key in seen:
+            continue
+        seen.add(key)
+        _link(adjacency, ('L', key[0]), ('R', key[1]), _weight(rng, min_weight, max_weight, floats), False, weighted)
+    return _graph(adjacency, False, weighted)
@@ -1,15 +1,74 @@
+from collections import deque
+import instrument
+from spatial import Positions, SpatialIndex
+
 class Graph:
-    def __init__(self, n: dict = None, directed=True, weighted=False):
+    def __init__(self, n: dict = None, directed=True, weighted=False, indexed=False, reverse_indexed=False):
         self.list_of_neighbours = n if n is not None else {}
         self.directed = directed
         self.weighted = weighted
         
-        self.positions = {} # store (x,y) positions for each vertex
+        self.positions = Positions() # store (x,y) positions for each vertex, a dict that counts writes for the spatial index
+
+        self.version = 0 # bumped by every successful mutation that can change a shortest path or a_star result, lets caches detect stale results
+
+        self.edge_index = None # optional {vertex: {neighbour: position in list_of_neighbours[vertex]}}
+        if indexed:
+            self.build_edge_index()
+
+        self.reverse_index = None # optional {vertex: {predecessor: weight}}, weight is None when unweighted
+        if reverse_indexed:
+            self.build_reverse_index()
+
+        self.spatial_index = None # optional SpatialIndex over positions, kept in step by set_position and remove_vertex
+
+        self.coordinates = None # optional heuristics.Coordinates, positions as contiguous arrays for a_star
+
+    def build_edge_index(self):  # Theta(V+E)
+        self.edge_index = {}
+        for vertex, edges in self.list_of_neighbours.items():
+            self.edge_index[vertex] = {(e[0] if self.weighted else e): i for i, e in enumerate(edges)}
+
+    def drop_edge_index(self):  # Theta(1)
+        self.edge_index = None
+
+    def build_reverse_index(self):  # Theta(V+E)
+        self.reverse_index = {v: {} for v in self.list_of_neighbours}
+        for u, edges in self.list_of_neighbours.items():
+            for e in edges:
+                if self.weighted:
+                    self.reverse_index[e[0]][u] = e[1]
+                else:
+                    self.reverse_index[e][u] = None
+
+    def drop_reverse_index(self):  # Theta(1)
+        self.reverse_index = None
+
+    def build_spatial_index(self):  # O(V log^2 V)
+        if not isinstance(self.positions, Positions):
+            self.positions = Positions(self.positions)  # replaced by a plain dict, which cannot report writes
+        self.spatial_index = SpatialIndex(self.positions)
+
+    def drop_spatial_index(self):  # Theta(1)
+        self.spatial_index = None
+
+    def build_coordinates(self):  # Theta(V)
+        from heuristics import Coordinates
+        self.coordinates = Coordinates(list(self.list_of_neighbours), self.positions)
+
+    def drop_coordinates(self):  # Theta(1)
+        self.coordinates = None
 
     def add_vertex(self, name):  # Theta(1)
         if name in self.list_of_neighbours:
             raise ValueError("Vertex already in Graph")
+        if instrument.recorder is not None:
+            instrument.recorder.count("graph.add_vertex")
         self.list_of_neighbours[name] = []
+        if self.edge_index is not None:
+            self.edge_index[name] = {}
+        if self.reverse_index is not None:
+            self.reverse_index[name] = {}
 
     def add_edge(self, start_vertex, terminal_vertex, weight=0):  # Theta(1)
         if start_vertex not in self.list_of_neighbours or terminal_vertex not in self.list_of_neighbours:
@@ -18,49 +77,110 @@ class Graph:
         edge = (terminal_vertex, weight) if self.weighted else terminal_vertex
         reversed_edge = (start_vertex, weight) if self.weighted else start_vertex
 
-        if self.weighted:
-            if any(e[0] == terminal_vertex for e in self.list_of_neighbours[start_vertex]):
-                raise ValueError("Edge already exists")
-        else:
-            if edge in self.list_of_neighbours[start_vertex]:
-                raise ValueError("Edge already exists")
+        if self._has_edge(start_vertex, terminal_vertex):
+            raise ValueError("Edge already exists")
 
-        self.list_of_neighbours[start_vertex].append(edge)
+        self._append_edge(start_vertex, terminal_vertex, edge)
+        self.version += 1
+        if instrument.recorder is not None:
+            instrument.recorder.count("graph.add_edge")
 
         if not self.directed:
-            if self.weighted:
-                if not any(e[0] == start_vertex for e in self.list_of_neighbours[terminal_vertex]):
-                    self.list_of_neighbours[terminal_vertex].append(reversed_edge)
-            else:
-                if reversed_edge not in self.list_of_neighbours[terminal_vertex]:
-                    self.list_of_neighbours[terminal_vertex].append(reversed_edge)
+            if not self._has_edge(terminal_vertex, start_vertex):
+                self._append_edge(terminal_vertex, start_vertex, reversed_edge)
+
+    def _has_edge(self, from_vertex, to_vertex):  # O(1) indexed, O(E/V) otherwise
+        if self.edge_index is not None:
+            return to_vertex in self.edge_index[from_vertex]
+        if self.weighted:
+            return any(e[0] == to_vertex for e in self.list_of_neighbours[from_vertex])
+        return to_vertex in self.list_of_neighbours[from_vertex]
+
+    def _append_edge(self, from_vertex, to_vertex, edge):  # Theta(1)
+        self.list_of_neighbours[from_vertex].append(edge)
+        if self.edge_index is not None:
+            self.edge_index[from_vertex][to_vertex] = len(self.list_of_neighbours[from_vertex]) - 1
+        if self.reverse_index is not None:
+            self.reverse_index[to_vertex][from_vertex] = edge[1] if self.weighted else None
+
+    def _delete_edge_at(self, from_vertex, position):  # O(E/V), only entries after position shift
+        edges = self.list_of_neighbours[from_vertex]
+        del edges[position]
+        index = self.edge_index[from_vertex]
+        for i in range(position, len(edges)):
+            index[edges[i][0] if self.weighted else edges[i]] = i
 
     def remove_edge(self, start_vertex, terminal_vertex):  # O(E/V)
         if start_vertex not in self.list_of_neighbours or terminal_vertex not in self.list_of_neighbours:
             raise ValueError("Vertices do not exist in current graph")
 
-        def remove_single_edge(from_vertex, to_vertex):
-            if self.weighted:
-                for e in self.list_of_neighbours[from_vertex]:
-                    if e[0] == to_vertex:
-                        self.list_of_neighbours[from_vertex].remove(e)
-                        return
+        self._remove_entry(start_vertex, terminal_vertex)
+        self.version += 1
+        if instrument.recorder is not None:
+            instrument.recorder.count("graph.remove_edge")
+        if not self.directed:
+            self._remove_entry(terminal_vertex, start_vertex)
+
+    def _remove_entry(self, from_vertex, to_vertex):  # O(E/V)
+        if self.edge_index is not None:
+            position = self.edge_index[from_vertex].pop(to_vertex, None)
+            if position is None:
                 raise ValueError("Edge does not exist")
+            self._delete_edge_at(from_vertex, position)
+        elif self.weighted:
+            for e in self.list_of_neighbours[from_vertex]:
+                if e[0] == to_vertex:
+                    self.list_of_neighbours[from_vertex].remove(e)
+                    break
             else:
-                try:
-                    self.list_of_neighbours[from_vertex].remove(to_vertex)
-                except ValueError:
-                    raise ValueError("Edge does not exist")
-
-        remove_single_edge(start_vertex, terminal_vertex)
-        if not self.directed:
-            remove_single_edge(terminal_vertex, start_vertex)
+                raise ValueError("Edge does not exist")
+        else:
+            try:
+                self.list_of_neighbours[from_vertex].remove(to_vertex)
+            except ValueError:
+                raise ValueError("Edge does not exist")
+        if self.reverse_index is not None:
+            del self.reverse_index[to_vertex][from_vertex]
 
-    def remove_vertex(self, vertex):  # O(V+E)
+    def remove_vertex(self, vertex):  # O(V+E), O(sum of neighbour degrees) undirected, O(deg(vertex)) reverse indexed
         if vertex not in self.list_of_neighbours:
             raise ValueError("Vertex does not exist in current graph")
+        self.version += 1
+        if instrument.recorder is not None:
+            instrument.recorder.count("graph.remove_vertex")
+        self._write_position(vertex, None)
+        if self.coordinates is not None:
+            self.coordinates.remove(vertex)
+
+        if self.reverse_index is not None:
+            for e in self.list_of_neighbours[vertex]:
+                self.reverse_index[e[0] if self.weighted else e].pop(vertex, None)
+            for predecessor in list(self.reverse_index[vertex]):
+                self._remove_entry(predecessor, vertex)
+            del self.reverse_index[vertex]
+            del self.list_of_neighbours[vertex]
+            if self.edge_index is not None:
+                del self.edge_index[vertex]
+            return
+
+        # undirected edges are symmetric, so only the vertex's own neighbours can point back at it
+        if self.directed:
+            sources = list(self.list_of_neighbours)
+        else:
+            sources = {e[0] if self.weighted else e for e in self.list_of_neighbours[vertex]} - {vertex}
+
+        if self.edge_index is not None:
+            del self.edge_index[vertex]
+            for key in sources:
+                if key == vertex:
+                    continue
+                position = self.edge_index[key].pop(vertex, None)
+                if position is not None:
+                    self._delete_edge_at(key, position)
+            del self.list_of_neighbours[vertex]
+            return
 
-        for key in list(self.list_of_neighbours.keys()):
+        for key in sources:
             if self.weighted:
                 self.list_of_neighbours[key] = [e for e in self.list_of_neighbours[key] if e[0] != vertex]
             else:
@@ -78,9 +198,14 @@ class Graph:
             result += len(i)
         return result
 
-    def is_edge(self, start_vertex, terminal_vertex):  # O(E/V)
+    def is_edge(self, start_vertex, terminal_vertex):  # O(E/V), O(1) indexed
         if start_vertex not in self.list_of_neighbours or terminal_vertex not in self.list_of_neighbours:
             raise ValueError("Vertices do not exist in current graph")
+        if self.edge_index is not None:
+            exists = terminal_vertex in self.edge_index[start_vertex]
+            if not self.directed:
+                exists = exists and start_vertex in self.edge_index[terminal_vertex]
+            return exists
         if self.weighted:
             exists = any(e[0] == terminal_vertex for e in self.list_of_neighbours[start_vertex])
             if not self.directed:
@@ -103,9 +228,13 @@ class Graph:
             raise ValueError("Vertex not in Graph")
         return iter(self.list_of_neighbours[vertex])
 
-    def inbound_neighbours(self, vertex):  # O(V+E)
+    def inbound_neighbours(self, vertex):  # O(V+E), O(in-degree) reverse indexed
         if not self.directed:
             return self.neighbours(vertex)
+        if self.reverse_index is not None:
+            if vertex not in self.reverse_index:
+                raise ValueError("Vertex not in Graph")
+            return list(self.reverse_index[vertex])
         ans = []
         for v in self.list_of_neighbours:
             if self.weighted:
@@ -122,6 +251,7 @@ class Graph:
     def change_if_directed(self, option: bool): # O(V+E)
         if self.directed == option:
             return
+        self.version += 1
 
         if option:
             # Converting from undirected to directed
@@ -155,21 +285,38 @@ class Graph:
                 else:
                     self.list_of_neighbours[u] = list(set(self.list_of_neighbours[u]))
 
-    def get_weight(self, start_vertex, terminal_vertex): # Theta(E/V)
+        if self.edge_index is not None:
+            self.build_edge_index()
+        if self.reverse_index is not None:
+            self.build_reverse_index()
+
+    def get_weight(self, start_vertex, terminal_vertex): # Theta(E/V), O(1) indexed
         if not self.weighted:
             raise ValueError("Graph is not weighted")
         if start_vertex not in self.list_of_neighbours:
             raise ValueError("Start vertex does not exist")
+        if self.edge_index is not None:
+            position = self.edge_index[start_vertex].get(terminal_vertex)
+            if position is None:
+                raise ValueError("Edge does not exist")
+            return self.list_of_neighbours[start_vertex][position][1]
         for edge in self.list_of_neighbours[start_vertex]:
             if isinstance(edge, tuple) and edge[0] == terminal_vertex:
                 return edge[1]
         raise ValueError("Edge does not exist")
 
-    def set_weight(self, start_vertex, terminal_vertex, weight): # O(E/V)
+    def set_weight(self, start_vertex, terminal_vertex, weight): # O(E/V), O(1) indexed
         if not self.weighted:
             raise ValueError("Graph is not weighted")
         if start_vertex not in self.list_of_neighbours:
             raise ValueError("Start vertex does not exist")
+        if not self._has_edge(start_vertex, terminal_vertex):
+            raise ValueError("Edge does not exist")
+        self.version += 1
+        if self.edge_index is not None:
+            self._set_weight_indexed(start_vertex, terminal_vertex, weight)
+            self._set_inbound_weight(start_vertex, terminal_vertex, weight)
+            return
         updated = False
         for idx, edge in enumerate(self.list_of_neighbours[start_vertex]):
             if edge[0] == terminal_vertex:
@@ -187,10 +334,30 @@ class Graph:
                     break
             if not updated:
                 raise ValueError("Reverse edge does not exist")
+        self._set_inbound_weight(start_vertex, terminal_vertex, weight)
+
+    def _set_inbound_weight(self, start_vertex, terminal_vertex, weight): # Theta(1)
+        if self.reverse_index is None:
+            return
+        self.reverse_index[terminal_vertex][start_vertex] = weight
+        if not self.directed:
+            self.reverse_index[start_vertex][terminal_vertex] = weight
+
+    def _set_weight_indexed(self, start_vertex, terminal_vertex, weight): # Theta(1)
+        position = self.edge_index[start_vertex].get(terminal_vertex)
+        if position is None:
+            raise ValueError("Edge does not exist")
+        self.list_of_neighbours[start_vertex][position] = (terminal_vertex, weight)
+        if not self.directed:
+            position = self.edge_index[terminal_vertex].get(start_vertex)
+            if position is None:
+                raise ValueError("Reverse edge does not exist")
+            self.list_of_neighbours[terminal_vertex][position] = (start_vertex, weight)
 
     def change_if_weighted(self, option: bool): # O(V+E)
         if self.weighted == option:
             return
+        self.version += 1
         if option:
             # Convert from unweighted to weighted
             for vertex in self.list_of_neighbours:
@@ -209,6 +376,8 @@ class Graph:
                         new_list.append(edge)
                 self.list_of_neighbours[vertex] = new_list
         self.weighted = option
+        if self.reverse_index is not None:
+            self.build_reverse_index()
 
     def __str__(self): # theta(V+E)
         s = ("directed weighted\n" if self.directed and self.weighted else
@@ -225,43 +394,17 @@ class Graph:
                 s += f"{k}\n"
         return s
 
-    def read_from_file(file_path):
-        with open(file_path, 'r') as file:
-            
-            first_line = file.readline().strip().lower().split()
-            directed = 'directed' in first_line
-            weighted = 'weighted' in first_line
-            
+    def read_from_file(file_path, indexed=False, reverse_indexed=False):  # Theta(V+E)
+        from loader import load_edge_list
+        return load_edge_list(file_path, indexed=indexed, reverse_indexed=reverse_indexed)
 
-            print(first_line)
+    def save_binary(self, file_path):  # Theta(V+E)
+        from binary import save_binary
+        save_binary(self, file_path)
 
-            g = Graph(directed=directed, weighted=weighted)
-            
-            for line in file:
-                parts = line.strip().split()
-                if not parts:
-                    continue
-                
-                if len(parts) == 1:
-                    vertex = parts[0]
-                    if vertex not in g.list_of_neighbours:
-                        g.add_vertex(vertex)
-                elif weighted:
-                    start_vertex, terminal_vertex = parts[0], parts[1]
-                    weight_str = parts[2]
-                    weight = int(weight_str)
-                    
-                    for v in [start_vertex, terminal_vertex]:
-                        if v not in g.list_of_neighbours:
-                            g.add_vertex(v)
-                    g.add_edge(start_vertex, terminal_vertex, weight)
-                else:
-                    start_vertex, terminal_vertex = parts[0], parts[1]
-                    for v in [start_vertex, terminal_vertex]:
-                        if v not in g.list_of_neighbours: 
-                            g.add_vertex(v)
-                    g.add_edge(start_vertex, terminal_vertex)
-        return g
+    def load_binary(file_path):  # returns a FrozenGraph over the memory-mapped file
+        from binary import load_binary
+        return load_binary(file_path)
 
     def read_positions_from_file(self, file_path):
         with open(file_path, 'r') as file:
@@ -272,7 +415,44 @@ class Graph:
                     continue
                 vertex, x, y = parts[0], float(parts[1]), float(parts[2])
                 self.positions[vertex] = (x,y)
-    
+        self.version += 1
+        if self.spatial_index is not None:
+            self.build_spatial_index()
+        if self.coordinates is not None:
+            self.build_coordinates()
+
+    def _write_position(self, vertex, position):  # Theta(1), amortised O(log^2 V) spatially indexed
+        # sets or, for None, removes a position; an index that was current is kept in step, a stale one is
+        # left for nearest_vertex to rebuild
+        index = self.spatial_index
+        current = index is not None and index.mirrors(self.positions)
+        if position is None:
+            self.positions.pop(vertex, None)
+        else:
+            self.positions[vertex] = position
+        if current:
+            if position is None:
+                index.remove(vertex)
+            else:
+                index.insert(vertex, *position)
+            index.source_version = self.positions.version
+
+    def set_position(self, vertex, x, y):  # Theta(1), amortised O(log^2 V) spatially indexed
+        self._write_position(vertex, (x, y))
+        self.version += 1  # a_star results depend on positions
+        if self.coordinates is not None:
+            self.coordinates.set(vertex, x, y)
+
+    def nearest_vertex(self, x, y):  # O(log V) spatially indexed, Theta(V) otherwise
+        # snaps a coordinate to the closest positioned vertex
+        if not self.positions:
+            raise ValueError("No vertex positions")
+        if self.spatial_index is not None:
+            if not self.spatial_index.mirrors(self.positions):
+                self.build_spatial_index()  # positions were written or replaced directly, not through set_position
+            return self.spatial_index.nearest(x, y)[0][0]
+        return min(self.positions, key=lambda v: (self.positions[v][0] - x) ** 2 + (self.positions[v][1] - y) ** 2)
+
     def euclidean_distance(self,v1,v2):
         if v1 not in self.positions or v2 not in self.positions:
             raise ValueError("Vertex position not found")
@@ -282,6 +462,11 @@ class Graph:
         
         return ((x1 - x2)** 2 + (y1 - y2) ** 2) ** 0.5
 
+    @instrument.instrumented("freeze")
+    def freeze(self):  # Theta(V+E)
+        from csr import FrozenGraph
+        return FrozenGraph.from_graph(self)
+
     # for debugging
     def print_positions(self):
         for k in self.list_of_neighbours:
@@ -299,6 +484,9 @@ class Graph:
     def DFS_iter(self, start_vertex): # theta(1)
         return DFSIterator(self, start_vertex)
 
+    def BFS_levels(self, start_vertex, direction_optimizing=False): # theta(1)
+        return LevelBFSIterator(self, start_vertex, direction_optimizing)
+
     # Iterator classes for BFS and DFS
 
 class BFSIterator:
@@ -306,22 +494,33 @@ class BFSIterator:
         if start_vertex not in graph.list_of_neighbours:
             raise ValueError("Start vertex not in graph")
         self.graph = graph
-        self.queue = [(start_vertex, 0)]  # (vertex, distance)
+        self.queue = deque([(start_vertex, 0)])  # (vertex, distance)
         self.visited = {start_vertex}
+        self.recorder = instrument.recorder  # counts visits and scanned edges while recording
 
     def __iter__(self):
         return self
 
-    def __next__(self): # O(E)
+    def __next__(self): # O(E/V)
         if not self.queue:
             raise StopIteration
-        current, dist = self.queue.pop(0)
-
-        for neighbor in self.graph.list_of_neighbours[current]:
-            nb = neighbor[0] if self.graph.weighted else neighbor
-            if nb not in self.visited:
-                self.visited.add(nb)
-                self.queue.append((nb, dist + 1))
+        current, dist = self.queue.popleft()
+
+        visited, queue = self.visited, self.queue
+        edges = self.graph.list_of_neighbours[current]
+        if self.recorder is not None:
+            self.recorder.count("bfs.vertices")
+            self.recorder.count("bfs.edges_scanned", len(edges))
+        if self.graph.weighted:
+            for nb, _ in edges:
+                if nb not in visited:
+                    visited.add(nb)
+                    queue.append((nb, dist + 1))
+        else:
+            for nb in edges:
+                if nb not in visited:
+                    visited.add(nb)
+                    queue.append((nb, dist + 1))
         return (current, dist)
 
 class DFSIterator:
@@ -331,21 +530,107 @@ class DFSIterator:
         self.graph = graph
         self.stack = [(start_vertex, 0)]  # (vertex, depth)
         self.visited = set()
+        self.recorder = instrument.recorder  # counts visits and scanned edges while recording
 
     def __iter__(self):
         return self
 
     def __next__(self): # O(E/V)
-        while self.stack:
-            current, depth = self.stack.pop()
-            if current in self.visited:
+        visited, stack = self.visited, self.stack
+        while stack:
+            current, depth = stack.pop()
+            if current in visited:
                 continue
-            self.visited.add(current)
-            neighbors = list(self.graph.list_of_neighbours[current])
-            for neighbor in neighbors:
-                nb = neighbor[0] if self.graph.weighted else neighbor
-                if nb not in self.visited:
-                    self.stack.append((nb, depth + 1))
+            visited.add(current)
+            edges = self.graph.list_of_neighbours[current]
+            if self.recorder is not None:
+                self.recorder.count("dfs.vertices")
+                self.recorder.count("dfs.edges_scanned", len(edges))
+            if self.graph.weighted:
+                for nb, _ in edges:
+                    if nb not in visited:
+                        stack.append((nb, depth + 1))
+            else:
+                for nb in edges:
+                    if nb not in visited:
+                        stack.append((nb, depth + 1))
             return (current, depth)
         raise StopIteration
-  
+
+class LevelBFSIterator:
+    # yields (depth, [vertices at that depth]) one whole frontier at a time;
+    # direction_optimizing switches to bottom-up steps (every unvisited vertex looks for a parent in the
+    # frontier) while the frontier is large, which is cheaper on low-diameter graphs
+    ALPHA = 14  # go bottom-up once the frontier's out-edges exceed the unexplored edges / ALPHA
+    BETA = 24  # go back top-down once the frontier shrinks below V / BETA
+
+    def __init__(self, graph, start_vertex, direction_optimizing=False):
+        if start_vertex not in graph.list_of_neighbours:
+            raise ValueError("Start vertex not in graph")
+        self.graph = graph
+        self.frontier = [start_vertex]
+        self.visited = {start_vertex}
+        self.depth = 0
+        self.direction_optimizing = direction_optimizing and self._has_inbound_edges()
+        self.bottom_up = False
+        self.unexplored_edges = graph.get_e() if self.direction_optimizing else 0
+        self.recorder = instrument.recorder  # counts levels and bottom-up steps while recording
+
+    def _has_inbound_edges(self):
+        return not self.graph.directed or getattr(self.graph, "reverse_index", None) is not None
+
+    def _targets(self, vertex):
+        edges = self.graph.list_of_neighbours[vertex]
+        return [e[0] for e in edges] if self.graph.weighted else edges
+
+    def _sources(self, vertex):
+        if not self.graph.directed:
+            return self._targets(vertex)
+        return self.graph.reverse_index[vertex]
+
+    def __iter__(self):
+        return self
+
+    def __next__(self): # O(E) per level
+        if not self.frontier:
+            raise StopIteration
+        level = (self.depth, self.frontier)
+        if self.direction_optimizing:
+            self._choose_direction()
+        if self.recorder is not None:
+            self.recorder.count("bfs_levels.levels")
+            self.recorder.count("bfs_levels.vertices", len(self.frontier))
+            if self.bottom_up:
+                self.recorder.count("bfs_levels.bottom_up_steps")
+        self.frontier = self._bottom_up_step() if self.bottom_up else self._top_down_step()
+        self.depth += 1
+        return level
+
+    def _choose_direction(self):
+        frontier_edges = sum(len(self.graph.list_of_neighbours[v]) for v in self.frontier)
+        self.unexplored_edges -= frontier_edges
+        if not self.bottom_up and frontier_edges > self.unexplored_edges / self.ALPHA:
+            self.bottom_up = True
+        elif self.bottom_up and len(self.frontier) < self.graph.get_v() / self.BETA:
+            self.bottom_up = False
+
+    def _top_down_step(self):
+        visited, next_frontier = self.visited, []
+        for u in self.frontier:
+            for v in self._targets(u):
+                if v not in visited:
+                    visited.add(v)
+                    next_frontier.append(v)
+        return next_frontier
+
+    def _bottom_up_step(self):
+        visited, frontier, next_frontier = self.visited, set(self.frontier), []
+        for v in self.graph.list_of_neighbours:
+            if v in visited:
+                continue
+            for u in self._sources(v):
+                if u in frontier:
+                    next_frontier.append(v)
+                    break
+        visited.update(next_frontier)
+        return next_frontier
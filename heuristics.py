@@ -0,0 +1,169 @@
+#  straight-line heuristics for a_star: positions as contiguous coordinate arrays, and per-query estimates
+#  to one goal that evaluate each vertex at most once or are all computed up front in one pass
+
+import math
+from array import array
+
+EARTH_RADIUS = 6371008.8  # mean radius in metres; haversine positions are (longitude, latitude) in degrees
+
+
+def euclidean(x1, y1, x2, y2): # Theta(1)
+    return math.hypot(x1 - x2, y1 - y2)
+
+
+def manhattan(x1, y1, x2, y2): # Theta(1), admissible on 4-connected grids
+    return abs(x1 - x2) + abs(y1 - y2)
+
+
+def octile(x1, y1, x2, y2): # Theta(1), admissible on 8-connected grids with diagonal steps of sqrt(2)
+    dx, dy = abs(x1 - x2), abs(y1 - y2)
+    return max(dx, dy) + (math.sqrt(2) - 1) * min(dx, dy)
+
+
+def haversine(x1, y1, x2, y2): # Theta(1), great-circle distance in metres
+    lon1, lat1, lon2, lat2 = math.radians(x1), math.radians(y1), math.radians(x2), math.radians(y2)
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS * math.asin(min(1.0, math.sqrt(a)))
+
+
+METRICS = {
+    "euclidean": euclidean,
+    "manhattan": manhattan,
+    "octile": octile,
+    "haversine": haversine,
+}
+
+
+def _sweep(metric, xs, ys, gx, gy): # Theta(V)
+    # metric from every (xs[i], ys[i]) to (gx, gy) as one array, with the per-goal terms hoisted out of the loop
+    if metric is euclidean:
+        hypot = math.hypot
+        return array('d', [hypot(x - gx, y - gy) for x, y in zip(xs, ys)])
+    if metric is manhattan:
+        return array('d', [abs(x - gx) + abs(y - gy) for x, y in zip(xs, ys)])
+    if metric is octile:
+        diagonal = math.sqrt(2) - 1
+        steps = ((abs(x - gx), abs(y - gy)) for x, y in zip(xs, ys))
+        return array('d', [max(dx, dy) + diagonal * min(dx, dy) for dx, dy in steps])
+    if metric is haversine:
+        radians, sin, cos, asin, sqrt = math.radians, math.sin, math.cos, math.asin, math.sqrt
+        lon2, lat2 = radians(gx), radians(gy)
+        cos_lat2 = cos(lat2)
+        halves = ((sin((radians(y) - lat2) / 2), cos(radians(y)), sin((radians(x) - lon2) / 2)) for x, y in zip(xs, ys))
+        return array('d', [2 * EARTH_RADIUS * asin(min(1.0, sqrt(a * a + c * cos_lat2 * b * b))) for a, c, b in halves])
+    return array('d', [metric(x, y, gx, gy) for x, y in zip(xs, ys)])
+
+
+class Coordinates:
+    # positions as two array('d') indexed by vertex id, nan where a vertex has no position; ids may be shared
+    # with a FrozenGraph so its CSR ids index the arrays directly
+    def __init__(self, labels, positions, ids=None): # Theta(V)
+        nan = float('nan')
+        self.ids = ids if ids is not None else {label: i for i, label in enumerate(labels)}
+        self.xs = array('d', [positions[label][0] if label in positions else nan for label in labels])
+        self.ys = array('d', [positions[label][1] if label in positions else nan for label in labels])
+
+    def set(self, label, x, y): # amortised Theta(1)
+        i = self.ids.get(label)
+        if i is None:
+            self.ids[label] = len(self.xs)
+            self.xs.append(x)
+            self.ys.append(y)
+        else:
+            self.xs[i] = x
+            self.ys[i] = y
+
+    def remove(self, label): # Theta(1), the slot stays allocated as nan until the arrays are rebuilt
+        i = self.ids.pop(label, None)
+        if i is not None:
+            self.xs[i] = self.ys[i] = float('nan')
+
+    def get(self, label): # Theta(1)
+        i = self.ids.get(label)
+        if i is None or self.xs[i] != self.xs[i]:
+            raise ValueError("Vertex position not found")
+        return self.xs[i], self.ys[i]
+
+
+class GoalEstimates(dict):
+    # h[v] is function(v), computed on first lookup and kept for the rest of the query
+    __slots__ = ("function",)
+
+    def __init__(self, function):
+        super().__init__()
+        self.function = function
+
+    def __missing__(self, v):
+        value = self[v] = self.function(v)
+        return value
+
+
+def goal_estimates(g, goal_vertex, heuristic="euclidean", by_id=False, precompute=False): # Theta(1), Theta(V) precomputed
+    # h[v] bounds the distance from v to goal_vertex for one query. heuristic is a name from METRICS or any
+    # heuristic(v, goal) callable; by_id keys h by FrozenGraph ids instead of labels. precompute fills in every
+    # positioned vertex in one pass, which pays off when the search is expected to touch most of the graph
+    labels = g.labels if by_id else None
+    if callable(heuristic):
+        if by_id:
+            function = lambda u: heuristic(labels[u], goal_vertex)
+        else:
+            function = lambda v: heuristic(v, goal_vertex)
+        h = GoalEstimates(function)
+        if precompute:
+            for v in (range(len(labels)) if by_id else g.list_of_neighbours):
+                h[v]
+        return h
+
+    metric = METRICS.get(heuristic)
+    if metric is None:
+        raise ValueError(f"Unknown heuristic {heuristic!r}, expected one of {sorted(METRICS)}")
+
+    coordinates = g.coordinates
+    if coordinates is None:
+        # plain Graph without coordinate arrays, read the positions dict
+        positions = g.positions
+        if goal_vertex not in positions:
+            raise ValueError("Vertex position not found")
+        gx, gy = positions[goal_vertex]
+
+        def function(v):
+            if v not in positions:
+                raise ValueError("Vertex position not found")
+            x, y = positions[v]
+            return metric(x, y, gx, gy)
+
+        h = GoalEstimates(function)
+        if precompute:
+            # vertices without a position are left to the lazy lookup, which only fails if the search reaches them
+            for v in g.list_of_neighbours:
+                if v in positions:
+                    h[v]
+        return h
+
+    gx, gy = coordinates.get(goal_vertex)
+    xs, ys, ids = coordinates.xs, coordinates.ys, coordinates.ids
+
+    def function(v):
+        i = v if by_id else ids.get(v)
+        if i is None or xs[i] != xs[i]:
+            raise ValueError("Vertex position not found")
+        return metric(xs[i], ys[i], gx, gy)
+
+    if not precompute:
+        return GoalEstimates(function)
+
+    distances = _sweep(metric, xs, ys, gx, gy)
+    # nan never compares equal to itself, it marks a vertex without a position; those are left to the
+    # lazy lookup as above
+    if by_id:
+        if all(d == d for d in distances):
+            return distances
+        h = GoalEstimates(function)
+        h.update((i, d) for i, d in enumerate(distances) if d == d)
+        return h
+    h = GoalEstimates(function)
+    for v in g.list_of_neighbours:
+        i = ids.get(v)
+        if i is not None and distances[i] == distances[i]:
+            h[v] = distances[i]
+    return h
@@ -0,0 +1,191 @@
+#  opt-in instrumentation: counters, wall-clock timers per operation and phase, and tracemalloc memory figures,
+#  reported to pluggable sinks. While nothing is recording, every hook costs one global check
+#
+#    with instrument.recording(JSONLinesSink("queries.jsonl")) as recorder:
+#        dijkstra(g, s, t)
+#    recorder.summary()  # {"counters": {"dijkstra.pq_pops": ...}, "timers": {"dijkstra": {...}}}
+
+import contextlib
+import functools
+import json
+import logging
+import time
+import tracemalloc
+
+recorder = None  # the active Recorder, None while instrumentation is off; only ever read through this module
+
+_IDLE = contextlib.nullcontext()
+
+
+class MemorySink:
+    # keeps every record in a list, for tests and interactive use
+    def __init__(self):
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+class LoggingSink:
+    # one log line per record, as JSON
+    def __init__(self, logger=None, level=logging.INFO):
+        self.logger = logger if logger is not None else logging.getLogger("graph")
+        self.level = level
+
+    def emit(self, record):
+        if self.logger.isEnabledFor(self.level):
+            self.logger.log(self.level, "%s", json.dumps(record, default=str))
+
+
+class JSONLinesSink:
+    # one JSON object per line; a path is opened for appending and closed with the recorder,
+    # an open file is only flushed
+    def __init__(self, file):
+        self.owned = isinstance(file, str)
+        self.file = open(file, 'a') if self.owned else file
+
+    def emit(self, record):
+        self.file.write(json.dumps(record, default=str) + "\n")
+
+    def close(self):
+        if self.owned:
+            self.file.close()
+        else:
+            self.file.flush()
+
+
+class Recorder:
+    # counters and timers add up over everything recorded; each span also emits its own record with the time it
+    # took and the counters reported while it was the innermost open span
+    def __init__(self, sinks=(), memory=False):
+        self.sinks = list(sinks)
+        self.counters = {}
+        self.timers = {}  # name -> [calls, total seconds]
+        self.memory = memory
+        self._spans = []  # open span records, innermost last
+        self._started_tracing = memory and not tracemalloc.is_tracing()
+        if self._started_tracing:
+            tracemalloc.start()
+
+    def count(self, name, amount=1): # Theta(1)
+        self.counters[name] = self.counters.get(name, 0) + amount
+        if self._spans:
+            counters = self._spans[-1]["counters"]
+            counters[name] = counters.get(name, 0) + amount
+
+    def add(self, counters, prefix=None): # Theta(len(counters)), e.g. the stats dict of a search
+        for name, amount in counters.items():
+            self.count(f"{prefix}.{name}" if prefix else name, amount)
+
+    @contextlib.contextmanager
+    def span(self, name, **fields):
+        record = {"event": name, **fields, "counters": {}}
+        if self.memory:
+            if self._spans:
+                # the peak is about to be reset, fold it into the enclosing span first
+                parent = self._spans[-1]
+                parent["_peak"] = max(parent["_peak"], tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+            record["_base"] = record["_peak"] = tracemalloc.get_traced_memory()[0]
+        self._spans.append(record)
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            seconds = time.perf_counter() - start
+            self._spans.pop()
+            record["seconds"] = seconds
+            timer = self.timers.setdefault(name, [0, 0.0])
+            timer[0] += 1
+            timer[1] += seconds
+            if self.memory:
+                current, peak = tracemalloc.get_traced_memory()
+                peak = max(peak, record.pop("_peak"))
+                base = record.pop("_base")
+                record["memory_bytes"] = current - base
+                record["peak_bytes"] = peak - base
+                if self._spans:
+                    self._spans[-1]["_peak"] = max(self._spans[-1]["_peak"], peak)
+            self.emit(record)
+
+    def snapshot(self, label, limit=10): # the allocation sites holding the most memory right now
+        if not tracemalloc.is_tracing():
+            raise ValueError("Memory snapshots need Recorder(memory=True) or tracemalloc running")
+        top = tracemalloc.take_snapshot().statistics('lineno')[:limit]
+        self.emit({"event": "memory_snapshot", "label": label,
+                   "top": [{"site": str(stat.traceback), "bytes": stat.size, "blocks": stat.count} for stat in top]})
+
+    def emit(self, record):
+        for sink in self.sinks:
+            sink.emit(record)
+
+    def summary(self):
+        return {
+            "counters": dict(self.counters),
+            "timers": {name: {"calls": calls, "seconds": seconds} for name, (calls, seconds) in self.timers.items()},
+        }
+
+    def close(self): # emits the summary and closes the sinks
+        self.emit({"event": "summary", **self.summary()})
+        for sink in self.sinks:
+            if hasattr(sink, "close"):
+                sink.close()
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+
+def enable(*sinks, memory=False): # replaces any active recorder without closing it
+    global recorder
+    recorder = Recorder(sinks, memory)
+    return recorder
+
+
+def disable(): # closes and returns the active recorder
+    global recorder
+    previous, recorder = recorder, None
+    if previous is not None:
+        previous.close()
+    return previous
+
+
+@contextlib.contextmanager
+def recording(*sinks, memory=False):
+    # records everything inside the block, then restores whatever was recording before
+    global recorder
+    outer = recorder
+    recorder = Recorder(sinks, memory)
+    try:
+        yield recorder
+    finally:
+        inner, recorder = recorder, outer
+        inner.close()
+
+
+def count(name, amount=1): # no-op while disabled
+    if recorder is not None:
+        recorder.count(name, amount)
+
+
+def phase(name, **fields): # with instrument.phase("augment"): ... times the block while recording
+    if recorder is None:
+        return _IDLE
+    return recorder.span(name, **fields)
+
+
+def instrumented(name, stats=None):
+    # decorator that wraps every call in a span; stats(result) may pick a counters dict out of the result,
+    # which is then recorded under name, e.g. the stats of a3.dijkstra as dijkstra.pq_pops
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if recorder is None:
+                return function(*args, **kwargs)
+            active = recorder
+            with active.span(name):
+                result = function(*args, **kwargs)
+                if stats is not None:
+                    active.add(stats(result), name)
+            return result
+        return wrapper
+    return decorate
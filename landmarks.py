@@ -0,0 +1,150 @@
+#  ALT heuristic: A* with landmarks and the triangle inequality, no vertex positions needed
+
+import heapq
+import random
+from array import array
+from graph import Graph
+
+
+def _edges(g : Graph): # Theta(V+E)
+    # (forward, backward) lists of (neighbour, weight) pairs by vertex, unweighted edges cost 1
+    forward = {v: [] for v in g.list_of_neighbours}
+    backward = {v: [] for v in g.list_of_neighbours} if g.directed else forward
+    for u, edges in g.list_of_neighbours.items():
+        for e in edges:
+            v, w = e if g.weighted else (e, 1)
+            forward[u].append((v, w))
+            if g.directed:
+                backward[v].append((u, w))
+    return forward.__getitem__, backward.__getitem__
+
+
+def _distances_from(ids, source, edges): # O((V+E)logV)
+    # single source dijkstra over edges(u) -> [(v, w)], returns (distances by id, parent by id, settle order)
+    inf = float('inf')
+    distances = array('d', [inf]) * len(ids)
+    parent = [None] * len(ids)
+    order = []
+    distances[ids[source]] = 0
+    queue = [(0, source)]
+    while queue:
+        d, u = heapq.heappop(queue)
+        if d > distances[ids[u]]:
+            continue
+        order.append(u)
+        for v, w in edges(u):
+            distance = d + w
+            if distance < distances[ids[v]]:
+                distances[ids[v]] = distance
+                parent[ids[v]] = u
+                heapq.heappush(queue, (distance, v))
+    return distances, parent, order
+
+
+def _farthest(g : Graph, ids, k, rng, edges):
+    # each new landmark is the vertex farthest from all landmarks chosen so far,
+    # vertices in a part of the graph no landmark reaches come first
+    vertices = list(g.list_of_neighbours)
+    chosen = [rng.choice(vertices)]
+    closest = _distances_from(ids, chosen[0], edges)[0]
+    # the random start only seeds the sweep, it is replaced by the vertex farthest from it
+    chosen = [max(vertices, key=lambda v: closest[ids[v]])]
+    closest = _distances_from(ids, chosen[0], edges)[0]
+    while len(chosen) < k:
+        candidate = max((v for v in vertices if v not in chosen), key=lambda v: closest[ids[v]])
+        chosen.append(candidate)
+        distances = _distances_from(ids, candidate, edges)[0]
+        for i in range(len(closest)):
+            if distances[i] < closest[i]:
+                closest[i] = distances[i]
+    return chosen
+
+
+def _avoid(g : Graph, ids, k, rng, edges, heuristic):
+    # Goldberg & Werneck: grow a shortest path tree from a random root, weigh each vertex by how badly
+    # the current landmarks bound its distance from the root, and descend into the heaviest subtree
+    # that holds no landmark yet; the leaf reached becomes the next landmark
+    vertices = list(g.list_of_neighbours)
+    while len(heuristic.landmarks) < k:
+        root = rng.choice(vertices)
+        distances, parent, order = _distances_from(ids, root, edges)
+
+        size = [0] * len(ids)
+        blocked = set(heuristic.landmarks)
+        children = {}
+        for v in reversed(order):  # children are settled after their parent
+            i = ids[v]
+            if v in blocked:
+                size[i] = 0
+            else:
+                size[i] += distances[i] - (heuristic(root, v) if heuristic.landmarks else 0)
+            p = parent[i]
+            if p is not None:
+                if v in blocked:
+                    blocked.add(p)
+                size[ids[p]] += size[i]
+                children.setdefault(p, []).append(v)
+
+        v = root
+        while v in children:
+            v = max(children[v], key=lambda c: size[ids[c]])
+        if v in heuristic.landmarks:
+            v = rng.choice([u for u in vertices if u not in heuristic.landmarks])
+        heuristic.add_landmark(v)
+
+
+class LandmarkHeuristic:
+    def __init__(self, g : Graph):
+        self.ids = {v: i for i, v in enumerate(g.list_of_neighbours)}
+        self.landmarks = []
+        self.from_landmark = []  # from_landmark[i][v] = d(landmark i, v)
+        self.to_landmark = []  # to_landmark[i][v] = d(v, landmark i)
+        self._edges = _edges(g)
+        self._goal = None
+
+    def add_landmark(self, landmark): # two dijkstra runs, 2V doubles of storage
+        forward, backward = self._edges
+        self.landmarks.append(landmark)
+        self.from_landmark.append(_distances_from(self.ids, landmark, forward)[0])
+        self.to_landmark.append(_distances_from(self.ids, landmark, backward)[0])
+        self._goal = None
+
+    def __call__(self, vertex, goal): # O(k)
+        # d(v, t) >= d(L, t) - d(L, v) and d(v, t) >= d(v, L) - d(t, L), terms involving an unreachable
+        # landmark are skipped so the bound never overestimates
+        if goal != self._goal:
+            t = self.ids[goal]
+            self._goal = goal
+            self._goal_terms = [(f, f[t], b, b[t]) for f, b in zip(self.from_landmark, self.to_landmark)]
+        v = self.ids[vertex]
+        inf = float('inf')
+        best = 0
+        for f, f_goal, b, b_goal in self._goal_terms:
+            if f_goal != inf and f[v] != inf and f_goal - f[v] > best:
+                best = f_goal - f[v]
+            if b_goal != inf and b[v] != inf and b[v] - b_goal > best:
+                best = b[v] - b_goal
+        return best
+
+
+def landmark_heuristic(g : Graph, k=8, strategy="avoid", seed=None): # O(k(V+E)logV) preprocessing
+    # returns a LandmarkHeuristic usable as a_star(g, s, t, heuristic=...)
+    if g.get_v() == 0:
+        raise ValueError("Graph has no vertices")
+    if strategy not in ("farthest", "avoid"):
+        raise ValueError("Unknown landmark strategy")
+    for v in g.list_of_neighbours:
+        for edge in g.list_of_neighbours[v]:
+            if g.weighted and edge[1] < 0:
+                raise ValueError("Landmark bounds need non-negative weights")
+
+    k = min(k, g.get_v())
+    rng = random.Random(seed)
+    heuristic = LandmarkHeuristic(g)
+    forward, _ = heuristic._edges
+    if strategy == "farthest":
+        for landmark in _farthest(g, heuristic.ids, k, rng, forward):
+            heuristic.add_landmark(landmark)
+    else:
+        _avoid(g, heuristic.ids, k, rng, forward, heuristic)
+    return heuristic
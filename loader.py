@@ -0,0 +1,126 @@
+#  streaming bulk loader for the edge-list text format used by Graph.read_from_file
+
+import mmap
+from graph import Graph
+import instrument
+
+CHUNK_SIZE = 1 << 22  # bytes per read
+
+
+def _read_header(file):
+    line = file.readline()
+    first_line = line.decode().strip().lower().split()
+    return 'directed' in first_line, 'weighted' in first_line, len(line)
+
+
+def _chunks(file, offset, use_mmap, chunk_size):
+    if use_mmap:
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for start in range(offset, len(mm), chunk_size):
+                yield mm[start:start + chunk_size]
+        return
+    while True:
+        chunk = file.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+
+def _lines(file, offset, use_mmap, chunk_size):
+    # yields complete decoded lines, a line split across two chunks is stitched back together
+    tail = b''
+    for chunk in _chunks(file, offset, use_mmap, chunk_size):
+        buffer = tail + chunk
+        cut = buffer.rfind(b'\n') + 1
+        tail = buffer[cut:]
+        yield len(chunk), buffer[:cut].decode().split('\n')[:-1] if cut else []
+    if tail:
+        yield 0, [tail.decode()]
+
+
+def _find_duplicate_line(file_path, u, v, directed):
+    # slow path, only taken once a duplicate edge is known to exist
+    seen = 0
+    with open(file_path, 'r') as file:
+        next(file)
+        for line_number, line in enumerate(file, start=2):
+            parts = line.split()
+            if len(parts) < 2:
+                continue
+            a, b = parts[0], parts[1]
+            if (a, b) == (u, v) or (not directed and (b, a) == (u, v)):
+                seen += 1
+                if seen == 2:
+                    return line_number
+    return None
+
+
+def _check_duplicates(file_path, adjacency, directed, weighted):  # Theta(V+E)
+    for u, edges in adjacency.items():
+        targets = [e[0] for e in edges] if weighted else edges
+        if len(set(targets)) == len(targets):
+            continue
+        seen = set()
+        for v in targets:
+            if v in seen:
+                line_number = _find_duplicate_line(file_path, u, v, directed)
+                raise ValueError(f"Line {line_number}: edge already exists ({u}, {v})")
+            seen.add(v)
+
+
+@instrument.instrumented("load_edge_list")
+def load_edge_list(file_path, use_mmap=False, chunk_size=CHUNK_SIZE, progress=None,
+                   indexed=False, reverse_indexed=False):  # Theta(V+E)
+    # progress(lines_read, bytes_read) is called once per chunk
+    adjacency = {}
+    line_number = 1
+    bytes_read = 0
+
+    with open(file_path, 'rb') as file:
+        directed, weighted, header_size = _read_header(file)
+        bytes_read += header_size
+        expected = 3 if weighted else 2
+
+        for size, lines in _lines(file, header_size, use_mmap, chunk_size):
+            for raw in lines:
+                line_number += 1
+                parts = raw.split()
+                if not parts:
+                    continue
+
+                u = parts[0]
+                edges = adjacency.get(u)
+                if edges is None:
+                    edges = adjacency[u] = []
+                if len(parts) == 1:
+                    continue
+                if len(parts) < expected:
+                    raise ValueError(f"Line {line_number}: expected {expected} fields, got {len(parts)}")
+
+                v = parts[1]
+                reverse_edges = adjacency.get(v)
+                if reverse_edges is None:
+                    reverse_edges = adjacency[v] = []
+
+                if weighted:
+                    try:
+                        weight = int(parts[2])
+                    except ValueError:
+                        raise ValueError(f"Line {line_number}: invalid weight {parts[2]!r}") from None
+                    edges.append((v, weight))
+                    if not directed and u != v:
+                        reverse_edges.append((u, weight))
+                else:
+                    edges.append(v)
+                    if not directed and u != v:
+                        reverse_edges.append(u)
+
+            bytes_read += size
+            if progress is not None:
+                progress(line_number, bytes_read)
+
+    _check_duplicates(file_path, adjacency, directed, weighted)
+    if instrument.recorder is not None:
+        instrument.recorder.count("load_edge_list.lines", line_number - 1)
+        instrument.recorder.count("load_edge_list.bytes", bytes_read)
+    return Graph(adjacency, directed=directed, weighted=weighted, indexed=indexed, reverse_indexed=reverse_indexed)
@@ -0,0 +1,96 @@
+#  many-to-many shortest path distances: one multi-target dijkstra per source, sources spread over processes
+
+import heapq
+import os
+from array import array
+from csr import FrozenGraph
+from graph import Graph
+from shared import GraphPool
+
+# sources * (V+E) below which processes=None stays in this process: starting a pool costs about as much as
+# 100k units of search, so smaller matrices finish before the workers would
+PARALLEL_THRESHOLD = 500_000
+
+
+class DistanceMatrix:
+    def __init__(self, sources, targets, values):
+        self.sources = sources
+        self.targets = targets
+        self.values = values  # row-major array('d'), values[i * len(targets) + j] = d(sources[i], targets[j])
+        self.rows = _positions(sources)  # label -> first row, first column below
+        self.columns = _positions(targets)
+
+    def __getitem__(self, index): # Theta(1)
+        i, j = index
+        return self.values[i * len(self.targets) + j]
+
+    def row(self, i): # Theta(M)
+        m = len(self.targets)
+        return self.values[i * m:(i + 1) * m]
+
+    def distance(self, source, target): # Theta(1)
+        if source not in self.rows or target not in self.columns:
+            raise ValueError("Vertex not in distance matrix")
+        return self[self.rows[source], self.columns[target]]
+
+    def to_lists(self): # Theta(NM)
+        return [list(self.row(i)) for i in range(len(self.sources))]
+
+
+def _positions(labels): # Theta(len(labels))
+    positions = {}
+    for i, label in enumerate(labels):
+        positions.setdefault(label, i)
+    return positions
+
+
+def _row(g : FrozenGraph, source, targets): # O((V+E)logV), usually far less
+    # dijkstra from source that stops as soon as every target is settled
+    offsets, graph_targets, weights = g.offsets, g.targets, g.weights
+    inf = float('inf')
+    distances = {source: 0}
+    settled = set()
+    remaining = set(targets)
+    queue = [(0, source)]
+    while queue and remaining:
+        d, u = heapq.heappop(queue)
+        if u in settled:
+            continue
+        settled.add(u)
+        remaining.discard(u)
+        for i in range(offsets[u], offsets[u + 1]):
+            v = graph_targets[i]
+            distance = d + (weights[i] if weights is not None else 1)
+            if distance < distances.get(v, inf):
+                distances[v] = distance
+                heapq.heappush(queue, (distance, v))
+    return array('d', [distances[t] if t in settled else inf for t in targets])
+
+
+def distance_matrix(g : Graph, sources, targets, processes=None): # O(N(V+E)logV / processes)
+    # processes=None uses every core once the matrix is worth a pool (PARALLEL_THRESHOLD), 1 runs in this process
+    frozen = g if isinstance(g, FrozenGraph) else g.freeze()
+    for v in list(sources) + list(targets):
+        if v not in frozen.ids:
+            raise ValueError(f"Vertex {v} not in graph")
+
+    source_ids = [frozen.ids[v] for v in sources]
+    target_ids = [frozen.ids[v] for v in targets]
+
+    if processes is None:
+        work = len(source_ids) * (len(frozen.labels) + len(frozen.targets))
+        processes = (os.cpu_count() or 1) if work >= PARALLEL_THRESHOLD else 1
+    processes = min(processes, len(source_ids))
+
+    values = array('d')
+    if processes <= 1:
+        for s in source_ids:
+            values.extend(_row(frozen, s, target_ids))
+    else:
+        # workers attach to one shared copy of the CSR arrays, nothing graph-sized is pickled;
+        # the published snapshot keeps frozen's vertex order, so the ids carry over
+        with GraphPool(frozen, processes) as pool:
+            for row in pool.map(_row, [(s, target_ids) for s in source_ids]):
+                values.extend(row)
+
+    return DistanceMatrix(list(sources), list(targets), values)
@@ -0,0 +1,97 @@
+#  breadth first search from many sources at once: one sweep seeded with every source (nearest source),
+#  or many independent sweeps sharing each edge scan through bit-parallel visited sets (one bit per source)
+
+import os
+from csr import FrozenGraph
+from graph import Graph
+from shared import GraphPool
+
+BATCH_SIZE = 256  # sources per bit-parallel sweep, wider batches share more edge scans but carry bigger masks
+
+
+def multi_source_bfs(g : Graph, sources, max_depth=None): # Theta(V+E)
+    # hop distance from every reached vertex to its nearest source, and which source that is
+    # (ties go to the source listed first); max_depth stops after that many hops
+    distances, nearest = {}, {}
+    frontier = []
+    for s in sources:
+        if s not in g.list_of_neighbours:
+            raise ValueError(f"Source vertex {s} not in graph")
+        if s not in distances:
+            distances[s] = 0
+            nearest[s] = s
+            frontier.append(s)
+
+    depth = 0
+    while frontier and (max_depth is None or depth < max_depth):
+        depth += 1
+        next_frontier = []
+        for u in frontier:
+            edges = g.list_of_neighbours[u]
+            for v in ([e[0] for e in edges] if g.weighted else edges):
+                if v not in distances:
+                    distances[v] = depth
+                    nearest[v] = nearest[u]
+                    next_frontier.append(v)
+        frontier = next_frontier
+    return distances, nearest
+
+
+def _sweep(g : FrozenGraph, source_ids, max_depth): # O(depth * (V+E)) big-int operations of len(source_ids) bits
+    # one level-synchronous pass for a whole batch: bit i of seen[v] is set once source i has reached v
+    offsets, targets, labels = g.offsets, g.targets, g.labels
+    results = [{labels[s]: 0} for s in source_ids]
+    seen = [0] * len(labels)
+    frontier = {}
+    for i, s in enumerate(source_ids):
+        seen[s] |= 1 << i
+        frontier[s] = frontier.get(s, 0) | 1 << i
+
+    depth = 0
+    while frontier and (max_depth is None or depth < max_depth):
+        depth += 1
+        next_frontier = {}
+        for u, mask in frontier.items():
+            for v in targets[offsets[u]:offsets[u + 1]]:
+                new = mask & ~seen[v]
+                if new:
+                    seen[v] |= new
+                    next_frontier[v] = next_frontier.get(v, 0) | new
+
+        for v, mask in next_frontier.items():
+            label = labels[v]
+            while mask:
+                low = mask & -mask
+                results[low.bit_length() - 1][label] = depth
+                mask ^= low
+        frontier = next_frontier
+    return results
+
+
+def batched_bfs(g : Graph, sources, max_depth=None, batch_size=BATCH_SIZE, processes=1): # O(N/batch_size * depth * (V+E))
+    # an independent BFS per source, returned as one {vertex: hops} dict per source in the order given;
+    # max_depth=k gives k-hop neighbourhoods, None full reachability. processes=None uses every core
+    if batch_size <= 0:
+        raise ValueError("Batch size must be positive")
+    frozen = g if isinstance(g, FrozenGraph) else g.freeze()
+    for s in sources:
+        if s not in frozen.ids:
+            raise ValueError(f"Source vertex {s} not in graph")
+
+    source_ids = [frozen.ids[s] for s in sources]
+    batches = [source_ids[i:i + batch_size] for i in range(0, len(source_ids), batch_size)]
+
+    if processes is None:
+        processes = os.cpu_count() or 1
+    processes = min(processes, len(batches))
+
+    results = []
+    if processes <= 1:
+        for batch in batches:
+            results.extend(_sweep(frozen, batch, max_depth))
+    else:
+        # workers attach to one shared copy of the CSR arrays, see shared.GraphPool
+        with GraphPool(frozen, processes) as pool:
+            for batch_result in pool.map(_sweep, [(batch, max_depth) for batch in batches], 1):
+                results.extend(batch_result)
+    return results
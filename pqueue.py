@@ -0,0 +1,228 @@
+#  interchangeable priority queues for dijkstra and a_star
+#  every backend has push(item, priority), pop() -> (priority, item) and len();
+#  backends with decrease_key = True update an item already in the queue instead of adding a duplicate
+
+import heapq
+from itertools import count
+
+
+class BinaryHeap:
+    # lazy binary heap: improving an item pushes a second entry, the stale one is skipped by the caller
+    decrease_key = False
+
+    def __init__(self):
+        self.heap = []
+        self.counter = count()  # tie breaker, so equal priorities never compare vertex labels
+        self.decrease_keys = 0
+
+    def push(self, item, priority): # O(logn)
+        heapq.heappush(self.heap, (priority, next(self.counter), item))
+
+    def pop(self): # O(logn)
+        priority, _, item = heapq.heappop(self.heap)
+        return priority, item
+
+    def __len__(self):
+        return len(self.heap)
+
+
+class DaryHeap:
+    # indexed d-ary heap with a real decrease-key, holds every item at most once
+    decrease_key = True
+
+    def __init__(self, d=4):
+        self.d = d
+        self.items = []
+        self.priorities = []
+        self.position = {}
+        self.decrease_keys = 0
+
+    def push(self, item, priority): # O(log_d n)
+        i = self.position.get(item)
+        if i is None:
+            i = len(self.items)
+            self.items.append(item)
+            self.priorities.append(priority)
+            self.position[item] = i
+        elif priority < self.priorities[i]:
+            self.priorities[i] = priority
+            self.decrease_keys += 1
+        else:
+            return
+        self._sift_up(i)
+
+    def pop(self): # O(d log_d n)
+        items, priorities = self.items, self.priorities
+        item, priority = items[0], priorities[0]
+        del self.position[item]
+        last_item, last_priority = items.pop(), priorities.pop()
+        if items:
+            items[0], priorities[0] = last_item, last_priority
+            self.position[last_item] = 0
+            self._sift_down(0)
+        return priority, item
+
+    def _sift_up(self, i):
+        items, priorities, position, d = self.items, self.priorities, self.position, self.d
+        item, priority = items[i], priorities[i]
+        while i > 0:
+            parent = (i - 1) // d
+            if priorities[parent] <= priority:
+                break
+            items[i], priorities[i] = items[parent], priorities[parent]
+            position[items[i]] = i
+            i = parent
+        items[i], priorities[i] = item, priority
+        position[item] = i
+
+    def _sift_down(self, i):
+        items, priorities, position, d = self.items, self.priorities, self.position, self.d
+        n = len(items)
+        item, priority = items[i], priorities[i]
+        while True:
+            first = d * i + 1
+            if first >= n:
+                break
+            best = min(range(first, min(first + d, n)), key=priorities.__getitem__)
+            if priorities[best] >= priority:
+                break
+            items[i], priorities[i] = items[best], priorities[best]
+            position[items[i]] = i
+            i = best
+        items[i], priorities[i] = item, priority
+        position[item] = i
+
+    def __len__(self):
+        return len(self.items)
+
+
+class BucketQueue:
+    # Dial's algorithm: one bucket per integer distance and a cursor that only moves forward,
+    # so it needs non-negative integer priorities that never drop below the last one popped
+    decrease_key = False
+
+    def __init__(self):
+        self.buckets = {}
+        self.cursor = 0
+        self.size = 0
+        self.decrease_keys = 0
+
+    def push(self, item, priority): # O(1)
+        key = int(priority)
+        if key != priority or key < self.cursor:
+            raise ValueError("Bucket queue needs non-negative integer priorities that never decrease")
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = self.buckets[key] = []
+        bucket.append(item)
+        self.size += 1
+
+    def pop(self): # O(1) amortised over the largest distance
+        if not self.size:
+            raise IndexError("pop from empty queue")
+        while not self.buckets.get(self.cursor):
+            self.buckets.pop(self.cursor, None)
+            self.cursor += 1
+        self.size -= 1
+        return self.cursor, self.buckets[self.cursor].pop()
+
+    def __len__(self):
+        return self.size
+
+
+class _PairingNode:
+    __slots__ = ("item", "priority", "child", "sibling", "parent")
+
+    def __init__(self, item, priority):
+        self.item = item
+        self.priority = priority
+        self.child = None
+        self.sibling = None
+        self.parent = None  # the previous sibling, or the parent for a leftmost child
+
+
+class PairingHeap:
+    # pairing heap with decrease-key by cutting the node's subtree and melding it back at the root
+    decrease_key = True
+
+    def __init__(self):
+        self.root = None
+        self.nodes = {}
+        self.decrease_keys = 0
+
+    def _meld(self, a, b):
+        if a is None:
+            return b
+        if b is None:
+            return a
+        if b.priority < a.priority:
+            a, b = b, a
+        b.parent = a
+        b.sibling = a.child
+        if a.child is not None:
+            a.child.parent = b
+        a.child = b
+        a.sibling = None
+        a.parent = None
+        return a
+
+    def push(self, item, priority): # O(1), decrease-key o(logn) amortised
+        node = self.nodes.get(item)
+        if node is None:
+            node = self.nodes[item] = _PairingNode(item, priority)
+            self.root = self._meld(self.root, node)
+            return
+        if priority >= node.priority:
+            return
+        self.decrease_keys += 1
+        node.priority = priority
+        if node is self.root:
+            return
+        # detach node from its sibling list
+        if node.parent.child is node:
+            node.parent.child = node.sibling
+        else:
+            node.parent.sibling = node.sibling
+        if node.sibling is not None:
+            node.sibling.parent = node.parent
+        node.sibling = node.parent = None
+        self.root = self._meld(self.root, node)
+
+    def pop(self): # O(logn) amortised
+        root = self.root
+        if root is None:
+            raise IndexError("pop from empty queue")
+        del self.nodes[root.item]
+
+        # two pass pairing of the root's children, iterative so long child lists cannot recurse
+        pairs = []
+        child = root.child
+        while child is not None:
+            first, second = child, child.sibling
+            child = second.sibling if second is not None else None
+            first.sibling = first.parent = None
+            if second is not None:
+                second.sibling = second.parent = None
+            pairs.append(self._meld(first, second))
+        merged = None
+        for tree in reversed(pairs):
+            merged = self._meld(tree, merged)
+        self.root = merged
+        return root.priority, root.item
+
+    def __len__(self):
+        return len(self.nodes)
+
+
+QUEUES = {
+    "binary": BinaryHeap,
+    "dary": DaryHeap,
+    "bucket": BucketQueue,
+    "pairing": PairingHeap,
+}
+
+
+def make_queue(name="binary"):
+    if name not in QUEUES:
+        raise ValueError(f"Unknown priority queue {name!r}, expected one of {sorted(QUEUES)}")
+    return QUEUES[name]()
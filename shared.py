@@ -0,0 +1,112 @@
+#  a graph published once into multiprocessing.shared_memory, so worker processes attach to the CSR arrays
+#  in place instead of each receiving a pickled copy, and a process pool that fans independent queries out over it
+
+import gc
+import os
+from multiprocessing import Pool, util
+from multiprocessing.shared_memory import SharedMemory
+from binary import decode, encode
+from csr import FrozenGraph
+from graph import Graph
+
+_memory = None  # the worker's handle on the shared block, kept open for as long as the process lives
+_shared = None  # the FrozenGraph a worker process searches, set once by _attach_worker
+
+
+class SharedGraph:
+    # owns the shared block: the process that publishes a graph must close() it, workers only attach
+    def __init__(self, g : Graph): # Theta(V+E)
+        sections = encode(g)
+        self.size = sum(len(section) for section in sections)
+        self.memory = SharedMemory(create=True, size=self.size)
+        self.name = self.memory.name
+        position = 0
+        for section in sections:
+            self.memory.buf[position:position + len(section)] = section
+            position += len(section)
+
+    def close(self): # Theta(1), releases the block once every attached process has exited
+        if self.memory is not None:
+            self.memory.close()
+            self.memory.unlink()
+            self.memory = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def attach(name, size): # O(V), the edge arrays stay in the shared block
+    # the returned FrozenGraph's arrays are views into the block, so the handle must outlive them
+    memory = SharedMemory(name=name)
+    return memory, decode(memory.buf[:size])
+
+
+def _attach_worker(name, size):
+    global _memory, _shared
+    _memory, _shared = attach(name, size)
+    # drop the views before the handle, otherwise a spawned worker's exit complains about exported pointers
+    util.Finalize(None, _detach_worker, exitpriority=10)
+
+
+def _detach_worker():
+    global _memory, _shared
+    _shared = None
+    gc.collect()  # the snapshot and its adjacency view form a cycle
+    _memory.close()
+    _memory = None
+
+
+def _run(job):
+    function, args = job
+    return function(_shared, *args)
+
+
+class GraphPool:
+    # with GraphPool(g) as pool: pool.map(dijkstra, [(s, t), ...]) calls dijkstra(graph, s, t) in the workers;
+    # function must be importable by the workers (defined at module level), and results come back pickled
+    def __init__(self, g : Graph, processes=None):
+        if processes is None:
+            processes = os.cpu_count() or 1
+        if processes <= 0:
+            raise ValueError("Number of processes must be positive")
+        self.processes = processes
+        self.shared = SharedGraph(g)
+        try:
+            self.pool = Pool(processes, initializer=_attach_worker, initargs=(self.shared.name, self.shared.size))
+        except BaseException:
+            self.shared.close()
+            raise
+
+    def map(self, function, jobs, chunk_size=None): # results in the order of jobs
+        jobs = [(function, tuple(args)) for args in jobs]
+        if chunk_size is None:
+            chunk_size = max(1, len(jobs) // (4 * self.processes))
+        return self.pool.map(_run, jobs, chunk_size)
+
+    def imap_unordered(self, function, jobs, chunk_size=1): # results as soon as each job finishes
+        return self.pool.imap_unordered(_run, ((function, tuple(args)) for args in jobs), chunk_size)
+
+    def close(self):
+        self.pool.close()
+        self.pool.join()
+        self.shared.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        if exc_info[0] is not None:
+            self.pool.terminate()
+        self.close()
+
+
+def parallel_map(g : Graph, function, jobs, processes=None): # O(total work / processes)
+    # one-shot GraphPool, processes=1 runs every job in this process on a FrozenGraph snapshot
+    if processes == 1:
+        frozen = g if isinstance(g, FrozenGraph) else g.freeze()
+        return [function(frozen, *args) for args in jobs]
+    with GraphPool(g, processes) as pool:
+        return pool.map(function, jobs)
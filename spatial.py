@@ -0,0 +1,228 @@
+#  k-d tree over vertex positions for snapping coordinates to vertices and geometric range queries,
+#  kept in step with inserts and removals through a small unindexed buffer and lazy deletion
+
+import heapq
+import math
+from array import array
+from itertools import count
+
+LEAF_SIZE = 8  # ranges this small are scanned instead of split further
+
+
+class Positions(dict):
+    # label -> (x, y) that counts every write, so an index built over it can tell when it was changed directly
+    version = 0  # a class default, unpickling writes the items before it restores the instance's own count
+
+    def __setitem__(self, label, position):
+        super().__setitem__(label, position)
+        self.version += 1
+
+    def __delitem__(self, label):
+        super().__delitem__(label)
+        self.version += 1
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+    def pop(self, *args):
+        self.version += 1
+        return super().pop(*args)
+
+    def popitem(self):
+        self.version += 1
+        return super().popitem()
+
+    def setdefault(self, label, position=None):
+        self.version += 1
+        return super().setdefault(label, position)
+
+    def update(self, *args, **kwargs):
+        self.version += 1
+        super().update(*args, **kwargs)
+
+    def clear(self):
+        self.version += 1
+        super().clear()
+
+
+class SpatialIndex:
+    def __init__(self, positions=None):
+        # positions maps label -> (x, y), e.g. Graph.positions
+        self._build(dict(positions) if positions else {})
+        self.source = positions  # the Positions this index mirrors, see mirrors()
+        self.source_version = getattr(positions, "version", None)
+
+    def mirrors(self, positions): # Theta(1)
+        # whether the index still matches positions: built from this very Positions, and every write to it since
+        # was followed by insert() or remove() and a catch up of source_version
+        return self.source_version is not None and positions is self.source and positions.version == self.source_version
+
+    def _build(self, points): # O(n log^2 n)
+        labels = list(points)
+        coordinates = ([float(points[label][0]) for label in labels], [float(points[label][1]) for label in labels])
+        order = list(range(len(labels)))
+        # the tree is implicit: the range [lo, hi) splits at mid = (lo + hi) // 2 on axis[mid]
+        self.axis = bytearray(len(labels))
+        stack = [(0, len(order))]
+        while stack:
+            lo, hi = stack.pop()
+            if hi - lo <= LEAF_SIZE:
+                continue
+            part = order[lo:hi]
+            xs = [coordinates[0][i] for i in part]
+            ys = [coordinates[1][i] for i in part]
+            axis = 0 if max(xs) - min(xs) >= max(ys) - min(ys) else 1
+            part.sort(key=coordinates[axis].__getitem__)
+            order[lo:hi] = part
+            mid = (lo + hi) // 2
+            self.axis[mid] = axis
+            stack.append((lo, mid))
+            stack.append((mid + 1, hi))
+
+        self.labels = [labels[i] for i in order]
+        self.xs = array('d', [coordinates[0][i] for i in order])
+        self.ys = array('d', [coordinates[1][i] for i in order])
+        self.slot = {label: i for i, label in enumerate(self.labels)}  # label -> position in the arrays
+        self.alive = bytearray([1]) * len(self.labels)
+        self.dead = 0
+        self.buffer = {}  # label -> (x, y) inserted since the last rebuild, scanned linearly
+
+    def _points(self):
+        points = {label: (self.xs[i], self.ys[i]) for i, label in enumerate(self.labels) if self.alive[i]}
+        points.update(self.buffer)
+        return points
+
+    def _maybe_rebuild(self):
+        # rebuilding is O(n log^2 n), so it waits until the buffer or the tombstones cost about as much
+        n = len(self.labels)
+        if len(self.buffer) > 16 + math.isqrt(n) or self.dead > n // 2 + 16:
+            self._build(self._points())
+
+    def insert(self, label, x, y): # amortised O(log^2 n)
+        self.remove(label)
+        self.buffer[label] = (x, y)
+        self._maybe_rebuild()
+
+    def remove(self, label): # O(1)
+        if self.buffer.pop(label, None) is not None:
+            return
+        i = self.slot.pop(label, None)
+        if i is not None:
+            self.alive[i] = 0
+            self.dead += 1
+            self._maybe_rebuild()
+
+    def __contains__(self, label):
+        return label in self.buffer or label in self.slot
+
+    def __len__(self):
+        return len(self.slot) + len(self.buffer)
+
+    def nearest(self, x, y, k=1): # O(log n) for small k on spread out points
+        # the k closest labels as (label, distance) pairs, nearest first
+        if k <= 0:
+            raise ValueError("k must be positive")
+        xs, ys, axis, alive, labels = self.xs, self.ys, self.axis, self.alive, self.labels
+        best = []  # max-heap of (-squared distance, tie breaker, label) holding at most k entries
+        worst = math.inf
+        tie = count()  # equal distances never fall through to comparing labels
+
+        def offer(d, label):
+            nonlocal worst
+            if len(best) < k:
+                heapq.heappush(best, (-d, next(tie), label))
+            elif d < worst:
+                heapq.heapreplace(best, (-d, next(tie), label))
+            else:
+                return
+            if len(best) == k:
+                worst = -best[0][0]
+
+        for label, (px, py) in self.buffer.items():
+            offer((px - x) ** 2 + (py - y) ** 2, label)
+
+        stack = [(0, len(labels), 0.0)]  # (lo, hi, squared distance from the query to the range's region)
+        while stack:
+            lo, hi, gap = stack.pop()
+            if gap >= worst:
+                continue
+            if hi - lo <= LEAF_SIZE:
+                for i in range(lo, hi):
+                    if alive[i]:
+                        d = (xs[i] - x) ** 2 + (ys[i] - y) ** 2
+                        if d < worst:
+                            offer(d, labels[i])
+                continue
+            mid = (lo + hi) // 2
+            if alive[mid]:
+                d = (xs[mid] - x) ** 2 + (ys[mid] - y) ** 2
+                if d < worst:
+                    offer(d, labels[mid])
+            offset = (x - xs[mid]) if axis[mid] == 0 else (y - ys[mid])
+            near, far = ((lo, mid), (mid + 1, hi)) if offset < 0 else ((mid + 1, hi), (lo, mid))
+            stack.append((far[0], far[1], max(gap, offset * offset)))
+            stack.append((near[0], near[1], gap))
+
+        best.sort(reverse=True)
+        return [(label, math.sqrt(-d)) for d, _, label in best]
+
+    def within(self, x, y, radius): # O(sqrt(n) + matches)
+        # (label, distance) pairs for every point at most radius away, nearest first
+        xs, ys, axis, alive, labels = self.xs, self.ys, self.axis, self.alive, self.labels
+        r2 = radius * radius
+        found = []
+        for label, (px, py) in self.buffer.items():
+            d = (px - x) ** 2 + (py - y) ** 2
+            if d <= r2:
+                found.append((d, label))
+        stack = [(0, len(labels))]
+        while stack:
+            lo, hi = stack.pop()
+            if hi - lo <= LEAF_SIZE:
+                for i in range(lo, hi):
+                    if alive[i]:
+                        d = (xs[i] - x) ** 2 + (ys[i] - y) ** 2
+                        if d <= r2:
+                            found.append((d, labels[i]))
+                continue
+            mid = (lo + hi) // 2
+            if alive[mid]:
+                d = (xs[mid] - x) ** 2 + (ys[mid] - y) ** 2
+                if d <= r2:
+                    found.append((d, labels[mid]))
+            offset = (x - xs[mid]) if axis[mid] == 0 else (y - ys[mid])
+            if offset <= radius:
+                stack.append((lo, mid))
+            if offset >= -radius:
+                stack.append((mid + 1, hi))
+        found.sort(key=lambda item: item[0])
+        return [(label, math.sqrt(d)) for d, label in found]
+
+    def in_box(self, min_x, min_y, max_x, max_y): # O(sqrt(n) + matches)
+        # labels of every point inside the closed rectangle, in no particular order
+        xs, ys, axis, alive, labels = self.xs, self.ys, self.axis, self.alive, self.labels
+        found = [label for label, (px, py) in self.buffer.items() if min_x <= px <= max_x and min_y <= py <= max_y]
+        stack = [(0, len(labels))]
+        while stack:
+            lo, hi = stack.pop()
+            if hi - lo <= LEAF_SIZE:
+                for i in range(lo, hi):
+                    if alive[i] and min_x <= xs[i] <= max_x and min_y <= ys[i] <= max_y:
+                        found.append(labels[i])
+                continue
+            mid = (lo + hi) // 2
+            if alive[mid] and min_x <= xs[mid] <= max_x and min_y <= ys[mid] <= max_y:
+                found.append(labels[mid])
+            split, low, high = (xs[mid], min_x, max_x) if axis[mid] == 0 else (ys[mid], min_y, max_y)
+            if low <= split:
+                stack.append((lo, mid))
+            if high >= split:
+                stack.append((mid + 1, hi))
+        return found
+
+    def nearest_many(self, points, k=1): # O(len(points) log n)
+        # nearest() for a batch of (x, y) points, results in the order given. Each point is its own search:
+        # ordering the batch and seeding every search with a bound from the previous answer was measured under
+        # 20% faster on dense batches and slower on sparse ones, so batching is only a convenience here
+        return [self.nearest(x, y, k) for x, y in points]
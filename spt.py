@@ -0,0 +1,87 @@
+#  single source, all destinations dijkstra kept as a reusable shortest path tree;
+#  cache.QueryCache.tree(source) keeps one per source until the graph changes
+
+from graph import Graph
+from pqueue import make_queue
+
+
+class ShortestPathTree:
+    def __init__(self, source, distances, parent, complete, bound=None, stats=None):
+        self.source = source
+        self.distances = distances  # settled vertex -> final distance from source
+        self.parent = parent  # settled vertex -> previous vertex on its shortest path
+        self.complete = complete  # False when the search stopped early, unsettled vertices are then unknown
+        self.bound = bound
+        self.stats = stats if stats is not None else {}
+
+    def covers(self, vertex): # Theta(1)
+        # whether this tree can answer for vertex, a partial tree only knows what it settled
+        return self.complete or vertex in self.distances
+
+    def distance(self, vertex): # Theta(1)
+        if vertex in self.distances:
+            return self.distances[vertex]
+        if not self.complete:
+            raise ValueError("Vertex was not settled before the search stopped")
+        return float('inf')
+
+    def path(self, vertex): # O(path length)
+        if self.distance(vertex) == float('inf'):
+            return None
+        path = [vertex]
+        while path[-1] != self.source:
+            path.append(self.parent[path[-1]])
+        path.reverse()
+        return path
+
+    def vertices(self): # O(settled)
+        return list(self.distances)
+
+    def __len__(self):
+        return len(self.distances)
+
+
+def shortest_path_tree(g : Graph, source, bound=None, targets=None, pq="binary"): # O((V+E)logV)
+    # bound stops before settling anything farther than bound, targets stops once all of them are settled
+    if source not in g.list_of_neighbours:
+        raise ValueError("Source vertex not in graph")
+
+    stats = {"cost_calls": 0, "pq_pushes": 0, "pq_pops": 0}
+    remaining = set(targets) if targets is not None else None
+    if remaining is not None and any(t not in g.list_of_neighbours for t in remaining):
+        raise ValueError("Target vertex not in graph")
+
+    tentative = {source: 0}
+    distances, parent = {}, {}
+    queue = make_queue(pq)
+    queue.push(source, 0)
+    complete = True
+
+    while queue:
+        d, u = queue.pop()
+        stats["pq_pops"] += 1
+        if u in distances or d > tentative[u]:
+            continue
+        if bound is not None and d > bound:
+            complete = False
+            break
+
+        distances[u] = d
+        if remaining is not None:
+            remaining.discard(u)
+            if not remaining:
+                complete = False
+                break
+
+        for neighbour in g.list_of_neighbours[u]:
+            v, w = (neighbour[0], neighbour[1]) if g.weighted else (neighbour, 1)
+            stats["cost_calls"] += 1
+            distance = d + w
+            if distance < tentative.get(v, float('inf')):
+                tentative[v] = distance
+                parent[v] = u
+                queue.push(v, distance)
+                stats["pq_pushes"] += 1
+
+    parent = {v: parent[v] for v in distances if v != source}
+    return ShortestPathTree(source, distances, parent, complete, bound, stats)
@@ -0,0 +1,467 @@
+import os
+import random
+import tempfile
+import unittest
+import unittest.mock
+from graph import Graph
+import generators
+import a3
+from a3 import dijkstra, a_star, bidirectional_dijkstra, bidirectional_a_star
+from compact import CompactGraph
+from contraction import ContractionHierarchy, build_contraction_hierarchy
+from landmarks import landmark_heuristic
+from matrix import distance_matrix
+from pqueue import QUEUES, make_queue
+from spt import shortest_path_tree
+from cache import QueryCache
+from dynamic import DynamicShortestPathTree
+from heuristics import goal_estimates, haversine, manhattan, octile
+
+
+def path_cost(g, path):
+    return sum(g.get_weight(path[i], path[i + 1]) for i in range(len(path) - 1))
+
+
+class TestShortestPaths(unittest.TestCase):
+
+    def setUp(self):
+        self.graphs = [generators.random_geometric(60, 240, seed=seed, directed=directed)
+                       for directed in (True, False) for seed in range(3)]
+
+    def test_bidirectional_matches_dijkstra(self):
+        for g in self.graphs:
+            for s in range(0, 60, 7):
+                for t in range(0, 60, 5):
+                    _, expected, _ = dijkstra(g, s, t)
+                    for search in (bidirectional_dijkstra, bidirectional_a_star, a_star):
+                        path, cost, stats = search(g, s, t)
+                        self.assertEqual(cost, expected)
+                        if path is not None:
+                            self.assertEqual((path[0], path[-1]), (s, t))
+                            self.assertEqual(path_cost(g, path), cost)
+                        self.assertEqual(set(stats), {"cost_calls", "pq_pushes", "pq_pops"})
+
+    def test_unreachable_goal(self):
+        g = Graph(directed=True, weighted=False)
+        for v in 'abc':
+            g.add_vertex(v)
+        g.add_edge('a', 'b')
+        self.assertEqual(bidirectional_dijkstra(g, 'a', 'c')[:2], (None, float('inf')))
+        self.assertEqual(bidirectional_dijkstra(g, 'a', 'b')[:2], (['a', 'b'], 1))
+
+    def test_unweighted_graphs(self):
+        # bare neighbours, including two-character labels that would unpack like (neighbour, weight) pairs
+        for directed in (True, False):
+            rng = random.Random(12)
+            g = Graph(directed=directed, weighted=False)
+            for v in range(40):
+                g.add_vertex(str(v + 10))
+            while g.get_e() < 90:
+                u, v = rng.sample(list(g.list_of_neighbours), 2)
+                if not g.is_edge(u, v):
+                    g.add_edge(u, v)
+            h = landmark_heuristic(g, k=3, seed=2)
+            for s in list(g.list_of_neighbours)[::6]:
+                for t in list(g.list_of_neighbours)[::5]:
+                    expected = dijkstra(g, s, t)[1]
+                    self.assertEqual(bidirectional_dijkstra(g, s, t)[1], expected)
+                    self.assertEqual(bidirectional_a_star(g, s, t, heuristic=h)[1], expected)
+
+    def test_reverse_edges_reused_until_mutation(self):
+        g = generators.random_geometric(60, 240, seed=4)
+        frozen, compact = g.freeze(), CompactGraph.from_graph(g)
+        for h in (g, frozen, compact):
+            bidirectional_dijkstra(h, 0, 59)
+            index = a3._reverse_indexes[h][1]
+            bidirectional_dijkstra(h, 1, 58)
+            self.assertIs(a3._reverse_indexes[h][1], index)
+        s, t = 0, g.neighbours(0)[0][0]
+        for h in (g, compact):
+            h.remove_edge(s, t)
+            self.assertEqual(bidirectional_dijkstra(h, s, t)[1], dijkstra(h, s, t)[1])
+        g.build_reverse_index()
+        self.assertEqual(bidirectional_dijkstra(g, 2, 57)[1], dijkstra(g, 2, 57)[1])
+
+class TestContractionHierarchy(unittest.TestCase):
+
+    def test_matches_dijkstra(self):
+        for directed in (True, False):
+            g = generators.random_geometric(80, 320, seed=4, directed=directed)
+            ch = build_contraction_hierarchy(g)
+            self.assertGreater(ch.shortcut_count(), 0)
+            for s in range(0, 80, 3):
+                for t in range(0, 80, 7):
+                    _, expected, _ = dijkstra(g, s, t)
+                    path, cost, _ = ch.query(s, t)
+                    self.assertEqual(cost, expected)
+                    if path is not None:
+                        self.assertEqual((path[0], path[-1]), (s, t))
+                        self.assertEqual(path_cost(g, path), cost)
+
+    def test_save_and_load(self):
+        g = generators.random_geometric(30, 90, seed=5)
+        g.list_of_neighbours = {str(v): [(str(u), w) for u, w in edges] for v, edges in g.list_of_neighbours.items()}
+        ch = build_contraction_hierarchy(g)
+        fd, path = tempfile.mkstemp(suffix=".json")
+        os.close(fd)
+        self.addCleanup(os.remove, path)
+        ch.save(path)
+        loaded = ContractionHierarchy.load(path)
+        for t in range(30):
+            self.assertEqual(loaded.query('0', str(t))[:2], ch.query('0', str(t))[:2])
+
+        g.list_of_neighbours = {('v', v): [(('v', u), w) for u, w in edges] for v, edges in g.list_of_neighbours.items()}
+        ch = build_contraction_hierarchy(g)
+        ch.save(path)
+        loaded = ContractionHierarchy.load(path)
+        self.assertEqual(loaded.labels, ch.labels)
+        for t in range(30):
+            self.assertEqual(loaded.query(('v', '0'), ('v', str(t)))[:2], ch.query(('v', '0'), ('v', str(t)))[:2])
+
+class TestLandmarks(unittest.TestCase):
+
+    def test_alt_matches_dijkstra(self):
+        for directed in (True, False):
+            g = generators.random_geometric(70, 260, seed=6, directed=directed)
+            g.positions = {}  # ALT must not need coordinates
+            for strategy in ("farthest", "avoid"):
+                h = landmark_heuristic(g, k=4, strategy=strategy, seed=1)
+                self.assertEqual(len(set(h.landmarks)), 4)
+                for s in range(0, 70, 9):
+                    for t in range(0, 70, 4):
+                        _, expected, dijkstra_stats = dijkstra(g, s, t)
+                        path, cost, stats = a_star(g, s, t, heuristic=h)
+                        self.assertEqual(cost, expected)
+                        self.assertLessEqual(h(s, t), expected)
+                        self.assertEqual(bidirectional_a_star(g, s, t, heuristic=h)[1], expected)
+                        self.assertEqual(a_star(g.freeze(), s, t, heuristic=h)[1], expected)
+
+    def test_alt_on_unweighted_graphs(self):
+        for directed in (True, False):
+            rng = random.Random(13)
+            g = Graph(directed=directed, weighted=False)
+            for v in range(50):
+                g.add_vertex(v)
+            while g.get_e() < 120:
+                u, v = rng.sample(range(50), 2)
+                if not g.is_edge(u, v):
+                    g.add_edge(u, v)
+            for strategy in ("farthest", "avoid"):
+                h = landmark_heuristic(g, k=4, strategy=strategy, seed=3)
+                for s in range(0, 50, 7):
+                    for t in range(0, 50, 3):
+                        expected = dijkstra(g, s, t)[1]
+                        self.assertLessEqual(h(s, t), expected)
+                        self.assertEqual(a_star(g, s, t, heuristic=h)[1], expected)
+
+class TestDistanceMatrix(unittest.TestCase):
+
+    def test_matches_dijkstra(self):
+        g = generators.random_geometric(50, 150, seed=7)
+        sources, targets = [0, 3, 9, 27], [1, 2, 3, 40, 49]
+        for processes in (1, 2):
+            matrix = distance_matrix(g, sources, targets, processes=processes)
+            for i, s in enumerate(sources):
+                for j, t in enumerate(targets):
+                    self.assertEqual(matrix[i, j], dijkstra(g, s, t)[1])
+            self.assertEqual(matrix.distance(27, 49), matrix[3, 4])
+            self.assertEqual(len(matrix.to_lists()), 4)
+        with self.assertRaises(ValueError):
+            matrix.distance(1, 49)
+
+    def test_small_matrices_stay_in_process(self):
+        g = generators.random_geometric(50, 150, seed=7)
+        with unittest.mock.patch("os.cpu_count", return_value=8), \
+                unittest.mock.patch("matrix.GraphPool", side_effect=AssertionError("started a pool")):
+            matrix = distance_matrix(g, [0, 3, 9], [1])
+        self.assertEqual(matrix[2, 0], dijkstra(g, 9, 1)[1])
+
+    def test_workers_attach_to_a_mapped_graph(self):
+        g = generators.random_geometric(50, 150, seed=8)
+        fd, path = tempfile.mkstemp(suffix=".bin")
+        os.close(fd)
+        self.addCleanup(os.remove, path)
+        g.save_binary(path)
+        loaded = Graph.load_binary(path)  # memoryview arrays, which cannot be pickled
+        sources = [0, 5, 5, 12]
+        matrix = distance_matrix(loaded, sources, [1, 2, 3], processes=2)
+        self.assertEqual(matrix.to_lists(), distance_matrix(g, sources, [1, 2, 3], processes=1).to_lists())
+        self.assertEqual(matrix.distance(5, 3), matrix[1, 2])
+
+class TestPriorityQueues(unittest.TestCase):
+
+    def test_pop_order_with_decrease_key(self):
+        rng = random.Random(8)
+        for name in QUEUES:
+            queue = make_queue(name)
+            best = {}
+            for _ in range(300):
+                item, priority = rng.randrange(100), rng.randrange(1000)
+                queue.push(item, priority)
+                best[item] = min(priority, best.get(item, priority))
+            popped = []
+            while queue:
+                priority, item = queue.pop()
+                popped.append(priority)
+                if queue.decrease_key:
+                    self.assertEqual(priority, best.pop(item))
+            self.assertEqual(popped, sorted(popped))
+            if queue.decrease_key:
+                self.assertEqual(best, {})
+
+    def test_backends_agree(self):
+        g = generators.random_geometric(60, 240, seed=9)
+        for s in range(0, 60, 11):
+            for t in range(0, 60, 6):
+                expected = dijkstra(g, s, t)[1]
+                for name in QUEUES:
+                    path, cost, stats = dijkstra(g, s, t, pq=name)
+                    self.assertEqual(cost, expected)
+                    self.assertEqual(dijkstra(g.freeze(), s, t, pq=name)[1], expected)
+                    self.assertEqual("pq_decrease_keys" in stats, make_queue(name).decrease_key)
+                    if name != "bucket":
+                        self.assertEqual(a_star(g, s, t, pq=name)[1], expected)
+
+    def test_bucket_queue_rejects_fractional_priorities(self):
+        queue = make_queue("bucket")
+        with self.assertRaises(ValueError):
+            queue.push('a', 1.5)
+        with self.assertRaises(ValueError):
+            make_queue("fibonacci")
+
+class TestShortestPathTree(unittest.TestCase):
+
+    def test_matches_dijkstra(self):
+        g = generators.random_geometric(60, 200, seed=10)
+        tree = shortest_path_tree(g, 0)
+        self.assertTrue(tree.complete)
+        for t in range(60):
+            path, cost, _ = dijkstra(g, 0, t)
+            self.assertEqual(tree.distance(t), cost)
+            if path is None:
+                self.assertIsNone(tree.path(t))
+            else:
+                self.assertEqual(tree.path(t)[0], 0)
+                self.assertEqual(path_cost(g, tree.path(t)), cost)
+
+    def test_early_termination(self):
+        g = generators.random_geometric(60, 200, seed=10)
+        full = shortest_path_tree(g, 0)
+        bounded = shortest_path_tree(g, 0, bound=60)
+        self.assertFalse(bounded.complete)
+        for t in range(60):
+            if full.distance(t) <= 60:
+                self.assertEqual(bounded.distance(t), full.distance(t))
+            else:
+                self.assertFalse(bounded.covers(t))
+                with self.assertRaises(ValueError):
+                    bounded.distance(t)
+        reachable = [t for t in range(60) if full.distance(t) != float('inf')]
+        partial = shortest_path_tree(g, 0, targets=reachable[:3])
+        for t in reachable[:3]:
+            self.assertEqual(partial.path(t), full.path(t))
+        self.assertLess(len(partial), len(full))
+
+class TestQueryCache(unittest.TestCase):
+
+    def setUp(self):
+        self.graph = Graph(directed=True, weighted=True)
+        for v in 'abcd':
+            self.graph.add_vertex(v)
+        self.graph.add_edge('a', 'b', 1)
+        self.graph.add_edge('b', 'c', 1)
+        self.graph.add_edge('a', 'c', 5)
+
+    def test_hits_and_invalidation(self):
+        cache = QueryCache(self.graph)
+        self.assertEqual(cache.query(dijkstra, 'a', 'c')[1], 2)
+        self.assertEqual(cache.query(dijkstra, 'a', 'c')[1], 2)
+        self.assertEqual(cache.query(dijkstra, 'a', 'c', pq="pairing")[1], 2)
+        self.assertEqual((cache.stats["hits"], cache.stats["misses"]), (1, 2))
+
+        mutations = [
+            lambda g: g.set_weight('b', 'c', 10),
+            lambda g: g.remove_edge('a', 'c'),
+            lambda g: g.add_edge('a', 'c', 1),
+            lambda g: g.remove_vertex('d'),
+            lambda g: g.change_if_directed(False),
+            lambda g: g.change_if_weighted(False),
+        ]
+        for mutate in mutations:
+            cache.query(dijkstra, 'a', 'c')
+            mutate(self.graph)
+            self.assertEqual(cache.query(dijkstra, 'a', 'c')[1], dijkstra(self.graph, 'a', 'c')[1])
+        self.assertEqual(cache.stats["invalidations"], len(mutations))
+
+    def test_trees_per_source(self):
+        cache = QueryCache(self.graph)
+        tree = cache.tree('a')
+        self.assertIs(cache.tree('a'), tree)
+        self.assertIsNot(cache.tree('b'), tree)
+        self.assertEqual((cache.stats["hits"], cache.stats["misses"]), (1, 2))
+        self.assertEqual(tree.distance('c'), 2)
+        self.graph.set_weight('a', 'b', 7)
+        self.assertEqual(cache.tree('a').distance('c'), 5)
+        self.assertEqual(cache.stats["invalidations"], 1)
+
+    def test_rejected_mutations_keep_entries(self):
+        cache = QueryCache(self.graph)
+        cache.query(dijkstra, 'a', 'c')
+        version = self.graph.version
+        for mutate, message in [(lambda g: g.add_edge('a', 'b', 3), "Edge already exists"),
+                                (lambda g: g.remove_edge('c', 'a'), "Edge does not exist"),
+                                (lambda g: g.set_weight('c', 'a', 3), "Edge does not exist")]:
+            with self.assertRaisesRegex(ValueError, message):
+                mutate(self.graph)
+        self.assertEqual(self.graph.version, version)
+        cache.query(dijkstra, 'a', 'c')
+        self.assertEqual(cache.stats["invalidations"], 0)
+
+        self.graph.set_position('a', 0.0, 0.0)
+        cache.query(dijkstra, 'a', 'c')
+        self.assertEqual(cache.stats["invalidations"], 1)
+
+    def test_lru_and_ttl(self):
+        now = [0.0]
+        cache = QueryCache(self.graph, maxsize=2, ttl=10, clock=lambda: now[0])
+        cache.query(dijkstra, 'a', 'b')
+        cache.query(dijkstra, 'a', 'c')
+        cache.query(dijkstra, 'a', 'b')
+        cache.query(dijkstra, 'b', 'c')
+        self.assertEqual(cache.stats["evictions"], 1)
+        self.assertIsNone(cache.get((dijkstra, 'a', 'c', ())))
+        now[0] = 11
+        cache.query(dijkstra, 'a', 'b')
+        self.assertEqual(cache.stats["expirations"], 1)
+        self.assertEqual(len(cache), 2)
+
+class TestDynamicShortestPathTree(unittest.TestCase):
+
+    def test_matches_recompute(self):
+        for directed in (True, False):
+            rng = random.Random(11)
+            g = generators.random_geometric(50, 150, seed=11, directed=directed)
+            tree = DynamicShortestPathTree(g, 0)
+            for _ in range(30):
+                changes, touched = [], set()
+                for _ in range(rng.randrange(1, 5)):
+                    u, v = rng.randrange(50), rng.randrange(50)
+                    if u == v or (u, v) in touched or (v, u) in touched:
+                        continue
+                    touched.add((u, v))
+                    if g.is_edge(u, v):
+                        changes.append((u, v, None if rng.random() < 0.3 else rng.randrange(1, 200)))
+                    else:
+                        changes.append((u, v, rng.randrange(1, 200)))
+                tree.apply(changes)
+                expected = shortest_path_tree(g, 0)
+                for t in range(50):
+                    self.assertEqual(tree.distance(t), expected.distance(t))
+                    if tree.path(t) is not None:
+                        self.assertEqual(path_cost(g, tree.path(t)), tree.distance(t))
+
+    def test_rejected_batch_changes_nothing(self):
+        g = generators.random_geometric(30, 90, seed=12)
+        tree = DynamicShortestPathTree(g, 0)
+        self.assertIsNone(g.reverse_index)  # the in-edges are kept by the tree, not the caller's graph
+        u, (v, w) = 0, g.neighbours(0)[0]
+        x = next(x for x in range(1, 30) if not g.is_edge(0, x))
+        before, distances = str(g), dict(tree.distances)
+        for batch in ([(u, v, None), (0, x, 5), (u, v, None)], [(0, x, 5), (0, 99, 1)], [(1, x, None)]):
+            with self.assertRaises(ValueError):
+                tree.apply(batch)
+            self.assertEqual(str(g), before)
+            self.assertEqual(tree.distances, distances)
+        self.assertEqual(tree.stats["batches"], 0)
+
+        batches = []
+        for batch in ([(u, v, None), (u, v, w + 1)], [(0, x, 1)], [(u, v, None)]):  # a deleted edge can come back
+            tree.apply(batch)
+            batches.append(tree.last_batch)
+        self.assertFalse(g.is_edge(u, v))
+        self.assertEqual(tree.stats["batches"], 3)
+        for key in ("affected", "repaired"):
+            self.assertEqual(tree.stats[key], sum(batch[key] for batch in batches))
+        self.assertGreater(tree.stats["pq_pops"], 0)  # the initial search counters are kept
+        expected = shortest_path_tree(g, 0)
+        self.assertEqual({t: tree.distance(t) for t in range(30)}, {t: expected.distance(t) for t in range(30)})
+
+class TestHeuristics(unittest.TestCase):
+
+    def test_metrics(self):
+        self.assertEqual(manhattan(0, 0, 3, -4), 7)
+        self.assertAlmostEqual(octile(0, 0, 3, -4), 4 + 3 * (2 ** 0.5 - 1))
+        # London to Paris, about 344 km
+        self.assertAlmostEqual(haversine(-0.1276, 51.5072, 2.3522, 48.8566) / 1000, 343.5, delta=1)
+        self.assertEqual(haversine(10, 20, 10, 20), 0)
+
+    def test_named_heuristics_are_exact(self):
+        cases = [(generators.grid_network(12, 12), ("euclidean", "manhattan")),
+                 (generators.grid_network(12, 12, diagonal=True), ("euclidean", "octile")),
+                 (generators.random_geometric(80, 300), ("euclidean",))]
+        rng = random.Random(5)
+        for g, names in cases:
+            vertices = list(g.list_of_neighbours)
+            frozen = g.freeze()
+            for _ in range(10):
+                s, t = rng.choice(vertices), rng.choice(vertices)
+                expected = dijkstra(g, s, t)[1]
+                for name in names:
+                    for precompute in (False, True):
+                        self.assertAlmostEqual(a_star(g, s, t, name, precompute=precompute)[1], expected)
+                        self.assertAlmostEqual(a_star(frozen, s, t, name, precompute=precompute)[1], expected)
+                    self.assertAlmostEqual(bidirectional_a_star(g, s, t, name)[1], expected)
+            g.build_coordinates()
+            for _ in range(5):
+                s, t = rng.choice(vertices), rng.choice(vertices)
+                for precompute in (False, True):
+                    self.assertAlmostEqual(a_star(g, s, t, names[-1], precompute=precompute)[1], dijkstra(g, s, t)[1])
+
+    def test_each_vertex_is_estimated_once(self):
+        g = generators.grid_network(10, 10)
+        calls = []
+
+        def counting(v, goal):
+            calls.append(v)
+            return g.euclidean_distance(v, goal)
+
+        for graph in (g, g.freeze()):
+            calls.clear()
+            a_star(graph, 0, 99, heuristic=counting)
+            self.assertEqual(len(calls), len(set(calls)))
+        h = goal_estimates(g, 99, counting, precompute=True)
+        self.assertAlmostEqual(h[0], 9 * 2 ** 0.5 * generators.GRID_SPACING)
+
+    def test_coordinates_follow_the_graph(self):
+        g = generators.grid_network(4, 4)
+        g.build_coordinates()
+        g.remove_vertex(5)
+        g.add_vertex('extra')
+        g.add_edge('extra', 0, 10)
+        with self.assertRaises(ValueError):
+            a_star(g, 15, 'extra')
+        with self.assertRaises(ValueError):
+            a_star(g, 'extra', 15, precompute=True)
+        g.set_position('extra', -1.0, -1.0)
+        self.assertEqual(g.coordinates.get('extra'), (-1.0, -1.0))
+        self.assertAlmostEqual(a_star(g, 15, 'extra', precompute=True)[1], dijkstra(g, 15, 'extra')[1])
+        with self.assertRaises(ValueError):
+            g.coordinates.get(5)
+        with self.assertRaises(ValueError):
+            a_star(g, 0, 15, heuristic="chebyshev")
+
+    def test_precompute_skips_unpositioned_vertices(self):
+        g = generators.grid_network(4, 4)
+        g.add_vertex('island')  # no position and no edges, never reached
+        expected = dijkstra(g, 0, 15)[1]
+        for graph in (g, g.freeze()):
+            for precompute in (False, True):
+                self.assertAlmostEqual(a_star(graph, 0, 15, precompute=precompute)[1], expected)
+        g.build_coordinates()
+        self.assertAlmostEqual(a_star(g, 0, 15, precompute=True)[1], expected)
+        g.add_edge(15, 'island', 1)
+        with self.assertRaisesRegex(ValueError, "Vertex position not found"):
+            a_star(g, 0, 'island', precompute=True)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,17 @@
+import contextlib
+import io
+import random
 import unittest
 from graph import Graph
-from a4 import topological_sort, longest_path_dag, bonus_problem
+import generators
+from a4 import (topological_sort, longest_path_dag, bonus_problem, build_tree, tree_to_graph,
+                shortest_path_dag, dag_path_tree, critical_path)
+
+def all_path_costs(g, u, t):
+    # every path cost from u to t by exhaustive search, fine for small DAGs
+    if u == t:
+        return [0]
+    return [w + c for v, w in g.neighbours(u) for c in all_path_costs(g, v, t)]
 
 class TestGraphAlgorithms(unittest.TestCase):
 
@@ -93,6 +104,85 @@ class TestGraphAlgorithms(unittest.TestCase):
         for u, v in expected_edges:
             self.assertIn(v, graph_from_tree.neighbours(u))
 
+class TestDagEngine(unittest.TestCase):
+
+    def test_paths_match_exhaustive_search(self):
+        for seed in range(10):
+            g = generators.random_dag(9, 20, seed, min_weight=-5, max_weight=10)
+            tree = dag_path_tree(g, 0)
+            for t in range(9):
+                costs = all_path_costs(g, 0, t)
+                shortest = shortest_path_dag(g, 0, t)
+                longest = longest_path_dag(g, 0, t)
+                if not costs:
+                    self.assertIsNone(shortest)
+                    self.assertIsNone(longest)
+                    self.assertNotIn(t, tree.distances)
+                    continue
+                self.assertEqual(shortest[1], min(costs))
+                self.assertEqual(longest[1], max(costs))
+                self.assertEqual(tree.distance(t), min(costs))
+                for path, cost in (shortest, longest):
+                    self.assertEqual(sum(dict(g.neighbours(u))[v] for u, v in zip(path, path[1:])), cost)
+
+    def test_silent_and_cycle_aware(self):
+        g = generators.random_dag(30, 80, seed=1, min_weight=-5, max_weight=10)
+        with contextlib.redirect_stdout(io.StringIO()) as out:
+            longest_path_dag(g, 0, 29)
+            topological_sort(g.freeze())
+        self.assertEqual(out.getvalue(), "")
+        g.add_edge(29, 0, 1)
+        self.assertIsNone(topological_sort(g))
+        with self.assertRaisesRegex(ValueError, "not a DAG"):
+            longest_path_dag(g, 0, 29)
+        with self.assertRaises(ValueError):
+            shortest_path_dag(g, 0, 29)
+
+    def test_critical_path(self):
+        g = Graph(directed=True, weighted=True)
+        for v in 'abcdef':
+            g.add_vertex(v)
+        for u, v, w in [('a', 'b', 3), ('a', 'c', 2), ('b', 'd', 4), ('c', 'd', 1), ('e', 'd', 9), ('c', 'f', 1)]:
+            g.add_edge(u, v, w)
+        path, length, finish = critical_path(g)
+        self.assertEqual((path, length), (['e', 'd'], 9))
+        self.assertEqual(finish, {'d': 9, 'f': 3})
+
+    def test_deep_tree(self):
+        n = 100000
+        preorder = list(range(n))
+        inorder = list(reversed(preorder))  # every node is the left child of the one before
+        tree = build_tree(inorder, preorder)
+        g = tree_to_graph(tree)
+        self.assertEqual(g.get_v(), n)
+        self.assertEqual(g.neighbours(0), [1])
+        self.assertEqual(topological_sort(g), preorder)
+
+    def test_build_tree_round_trip(self):
+        rng = random.Random(3)
+        for _ in range(20):
+            # a random binary search tree, whose inorder is just its sorted keys
+            keys = list(range(rng.randint(1, 30)))
+            rng.shuffle(keys)
+            children = {keys[0]: [None, None]}
+            for k in keys[1:]:
+                node = keys[0]
+                while children[node][k > node] is not None:
+                    node = children[node][k > node]
+                children[node][k > node] = k
+                children[k] = [None, None]
+
+            def as_tuple(node):
+                if node is None:
+                    return None
+                return (node, as_tuple(children[node][0]), as_tuple(children[node][1]))
+
+            def preorder(node):
+                return [] if node is None else [node[0]] + preorder(node[1]) + preorder(node[2])
+
+            expected = as_tuple(keys[0])
+            self.assertEqual(build_tree(sorted(keys), preorder(expected)), expected)
+
 if __name__ == "__main__":
     unittest.main()
 
@@ -0,0 +1,196 @@
+import random
+import unittest
+from graph import Graph
+import generators
+from a5 import UNMATCHED, IncrementalMatching, _hopcroft_karp, bipartition, maximum_matching_bipartite, min_cost_assignment
+
+def brute_force_matching(g, left):
+    # size of a maximum matching by trying every choice for every left vertex
+    def best(i, used):
+        if i == len(left):
+            return 0
+        result = best(i + 1, used)
+        for edge in g.list_of_neighbours[left[i]]:
+            v = edge[0] if g.weighted else edge
+            if v not in used:
+                result = max(result, 1 + best(i + 1, used | {v}))
+        return result
+    return best(0, frozenset())
+
+def brute_force_assignment(g, left, maximize=False):
+    # best total weight over the matchings of maximum size
+    size = len(maximum_matching_bipartite(g))
+    def best(i, used, count):
+        if i == len(left):
+            return 0 if count == size else None
+        options = [best(i + 1, used, count)]
+        for v, w in g.list_of_neighbours[left[i]]:
+            if v not in used:
+                rest = best(i + 1, used | {v}, count + 1)
+                options.append(None if rest is None else rest + w)
+        options = [o for o in options if o is not None]
+        if not options:
+            return None
+        return max(options) if maximize else min(options)
+    return best(0, frozenset(), 0)
+
+class TestMaximumMatching(unittest.TestCase):
+
+    def assertValidMatching(self, g, pairs):
+        vertices = [v for pair in pairs for v in pair]
+        self.assertEqual(len(vertices), len(set(vertices)))
+        for u, v in pairs:
+            self.assertTrue(g.is_edge(u, v))
+
+    def test_matches_brute_force(self):
+        for seed in range(40):
+            for weighted in (False, True):
+                g = generators.random_bipartite(6, 5, 14, seed, weighted, max_weight=20)
+                pairs = maximum_matching_bipartite(g)
+                self.assertValidMatching(g, pairs)
+                left = [v for v in g.get_vertices() if v[0] == 'L']
+                self.assertEqual(len(pairs), brute_force_matching(g, left))
+
+    def test_long_augmenting_path(self):
+        # a path matched on its inner edges leaves one augmenting path through every vertex
+        g = Graph(directed=False)
+        n = 20000
+        for i in range(2 * n):
+            g.add_vertex(i)
+        for i in range(2 * n - 1):
+            g.add_edge(i, i + 1)
+        frozen = g.freeze()
+        mate = [UNMATCHED] + [i + 1 if i % 2 else i - 1 for i in range(1, 2 * n - 1)] + [UNMATCHED]
+        _hopcroft_karp(frozen.offsets, frozen.targets, range(0, 2 * n, 2), mate)
+        self.assertEqual(mate, [i + 1 if i % 2 == 0 else i - 1 for i in range(2 * n)])
+
+        pairs = maximum_matching_bipartite(g)
+        self.assertEqual(len(pairs), n)
+        self.assertValidMatching(g, pairs)
+
+    def test_rejects_invalid_graphs(self):
+        g = Graph(directed=False)
+        for v in 'abc':
+            g.add_vertex(v)
+        g.add_edge('a', 'b')
+        g.add_edge('b', 'c')
+        g.add_edge('c', 'a')
+        with self.assertRaises(ValueError):
+            maximum_matching_bipartite(g)
+        with self.assertRaises(ValueError):
+            maximum_matching_bipartite(Graph(directed=True))
+
+    def test_bipartition(self):
+        g = generators.random_bipartite(5, 5, 12, seed=1)
+        U, V = bipartition(g)
+        self.assertEqual(set(U) | set(V), set(g.get_vertices()))
+        for u in U:
+            for v in g.list_of_neighbours[u]:
+                self.assertIn(v, V)
+
+class TestAssignment(unittest.TestCase):
+
+    def test_matches_brute_force(self):
+        for seed in range(60):
+            rng = random.Random(seed)
+            a, b = rng.randint(1, 6), rng.randint(1, 6)
+            floats = seed % 2 == 0  # negative float costs as well
+            g = generators.random_bipartite(a, b, min(rng.randint(0, 20), a * b), seed, True, max_weight=20,
+                                            min_weight=-5 if floats else 1, floats=floats)
+            left = [v for v in g.get_vertices() if v[0] == 'L']
+            for maximize in (False, True):
+                expected = brute_force_assignment(g, left, maximize)
+                for method in ("dense", "sparse"):
+                    pairs, total = min_cost_assignment(g, left, maximize, method)
+                    self.assertAlmostEqual(total, expected)
+                    self.assertEqual(len(pairs), len(maximum_matching_bipartite(g)))
+                    self.assertTrue(all(u[0] == 'L' and g.is_edge(u, v) for u, v in pairs))
+
+    def test_prefers_cardinality_then_cost(self):
+        g = Graph(directed=False, weighted=True)
+        for v in ('a', 'b', 'x', 'y'):
+            g.add_vertex(v)
+        g.add_edge('a', 'x', 1)
+        g.add_edge('a', 'y', 100)
+        g.add_edge('b', 'x', 50)
+        for method in ("dense", "sparse"):
+            pairs, total = min_cost_assignment(g, left=['a', 'b'], method=method)
+            self.assertEqual(sorted(pairs), [('a', 'y'), ('b', 'x')])
+            self.assertEqual(total, 150)
+
+    def test_rejects_bad_input(self):
+        g = generators.random_bipartite(3, 3, 5, weighted=True, max_weight=20)
+        with self.assertRaises(ValueError):
+            min_cost_assignment(g, method="simplex")
+        with self.assertRaises(ValueError):
+            min_cost_assignment(g, left=['missing'])
+
+class TestIncrementalMatching(unittest.TestCase):
+
+    def assertConsistent(self, g, matcher):
+        self.assertEqual(len(matcher), len(maximum_matching_bipartite(g)))
+        self.assertEqual(len(matcher.pairs()), len(matcher))
+        for u, v in matcher.mate.items():
+            self.assertEqual(matcher.mate[v], u)
+            self.assertTrue(g.is_edge(u, v))
+        for u in g.get_vertices():
+            for v in g.neighbours(u):
+                self.assertNotEqual(matcher.colour[u], matcher.colour[v])
+
+    def test_random_updates(self):
+        for seed in range(20):
+            rng = random.Random(seed)
+            g = Graph(directed=False)
+            vertices = list(range(10))
+            for v in vertices:
+                g.add_vertex(v)
+            matcher = IncrementalMatching(g)
+            for step in range(60):
+                u, v = rng.sample(vertices, 2)
+                op = rng.random()
+                try:
+                    if op < 0.5 and not g.is_edge(u, v):
+                        matcher.add_edge(u, v)
+                    elif op < 0.8 and g.is_edge(u, v):
+                        matcher.remove_edge(u, v)
+                    elif op < 0.9 and len(vertices) > 4:
+                        matcher.remove_vertex(u)
+                        vertices.remove(u)
+                    elif op >= 0.9:
+                        matcher.add_vertex(100 + step)
+                        vertices.append(100 + step)
+                except ValueError as e:
+                    self.assertIn("bipartite", str(e))
+                self.assertConsistent(g, matcher)
+
+    def test_odd_cycle_is_rejected_untouched(self):
+        g = Graph(directed=False)
+        for v in 'abc':
+            g.add_vertex(v)
+        matcher = IncrementalMatching(g)
+        matcher.add_edge('a', 'b')
+        matcher.add_edge('b', 'c')
+        with self.assertRaises(ValueError):
+            matcher.add_edge('c', 'a')
+        self.assertFalse(g.is_edge('c', 'a'))
+        self.assertConsistent(g, matcher)
+
+    def test_direct_graph_changes_are_picked_up(self):
+        g = generators.random_bipartite(5, 5, 8, seed=2)
+        matcher = IncrementalMatching(g)
+        for v in list(g.list_of_neighbours[('L', 0)]):
+            g.remove_edge(('L', 0), v)
+        g.add_vertex('new')
+        matcher.add_edge('new', ('L', 0))
+        self.assertConsistent(g, matcher)
+
+        g.add_vertex('isolated')  # leaves the version alone, adopted without a rebuild
+        mate = matcher.mate
+        matcher.add_edge('isolated', ('R', 0))
+        self.assertIs(matcher.mate, mate)
+        self.assertConsistent(g, matcher)
+        with self.assertRaises(ValueError):
+            matcher.add_edge('missing', ('R', 0))
+
+if __name__ == "__main__":
+    unittest.main()
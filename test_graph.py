@@ -0,0 +1,776 @@
+import gc
+import itertools
+import json
+import os
+import random
+import tempfile
+import unittest
+from graph import Graph
+from loader import load_edge_list
+from multibfs import batched_bfs, multi_source_bfs
+from shared import GraphPool, SharedGraph, attach, parallel_map
+from spatial import SpatialIndex
+from compact import CompactGraph, load_compact
+from benchmark import SCENARIOS, compare, run_suite
+import generators
+import instrument
+from instrument import JSONLinesSink, LoggingSink, MemorySink
+from a3 import dijkstra, a_star, bidirectional_dijkstra
+from dynamic import DynamicShortestPathTree
+from spt import shortest_path_tree
+from a4 import topological_sort, longest_path_dag
+from a5 import maximum_matching_bipartite
+import io
+import logging
+
+class TestFrozenGraph(unittest.TestCase):
+
+    def setUp(self):
+        self.graph = Graph(directed=True, weighted=True)
+        for v in ['A', 'B', 'C', 'D', 'E']:
+            self.graph.add_vertex(v)
+        edges = [('A', 'B', 4), ('A', 'C', 1), ('C', 'B', 2), ('B', 'D', 1), ('C', 'D', 5), ('D', 'E', 3)]
+        for u, v, w in edges:
+            self.graph.add_edge(u, v, w)
+        for i, v in enumerate(['A', 'B', 'C', 'D', 'E']):
+            self.graph.positions[v] = (float(i), 0.0)
+
+    def test_read_only_interface(self):
+        frozen = self.graph.freeze()
+        self.assertEqual(frozen.get_v(), self.graph.get_v())
+        self.assertEqual(frozen.get_e(), self.graph.get_e())
+        self.assertEqual(frozen.get_vertices(), self.graph.get_vertices())
+        for v in self.graph.get_vertices():
+            self.assertEqual(frozen.neighbours(v), self.graph.neighbours(v))
+        self.assertTrue(frozen.is_edge('A', 'C'))
+        self.assertFalse(frozen.is_edge('C', 'A'))
+        self.assertEqual(frozen.get_weight('C', 'B'), 2)
+        self.assertEqual(sorted(frozen.inbound_neighbours('D')), ['B', 'C'])
+        self.assertEqual(str(frozen), str(self.graph))
+        with self.assertRaises(AttributeError):
+            frozen.directed = False
+
+    def test_algorithms_accept_frozen(self):
+        frozen = self.graph.freeze()
+        self.assertEqual(dijkstra(frozen, 'A', 'E')[:2], dijkstra(self.graph, 'A', 'E')[:2])
+        self.assertEqual(a_star(frozen, 'A', 'E')[:2], (['A', 'C', 'B', 'D', 'E'], 7))
+        self.assertEqual(topological_sort(frozen), topological_sort(self.graph))
+        self.assertEqual(longest_path_dag(frozen, 'A', 'E'), longest_path_dag(self.graph, 'A', 'E'))
+        self.assertEqual([v for v, _ in frozen.BFS_iter('A')], [v for v, _ in self.graph.BFS_iter('A')])
+
+    def test_matching_on_frozen(self):
+        g = Graph(directed=False, weighted=False)
+        for v in ['a', 'b', '1', '2']:
+            g.add_vertex(v)
+        g.add_edge('a', '1')
+        g.add_edge('a', '2')
+        g.add_edge('b', '1')
+        self.assertEqual(len(maximum_matching_bipartite(g.freeze())), 2)
+
+class TestEdgeIndex(unittest.TestCase):
+
+    def build(self, directed, weighted, indexed):
+        g = Graph(directed=directed, weighted=weighted, indexed=indexed)
+        for v in range(6):
+            g.add_vertex(v)
+        for u, v in [(0, 1), (0, 2), (0, 3), (1, 2), (2, 4), (3, 4), (4, 5)]:
+            g.add_edge(u, v, u + v)
+        return g
+
+    def test_matches_unindexed_graph(self):
+        for directed in (True, False):
+            for weighted in (True, False):
+                plain = self.build(directed, weighted, False)
+                indexed = self.build(directed, weighted, True)
+                for g in (plain, indexed):
+                    g.remove_edge(0, 2)
+                    g.remove_vertex(3)
+                    g.add_edge(5, 0, 7)
+                    if weighted:
+                        g.set_weight(1, 2, 10)
+                self.assertEqual(indexed.list_of_neighbours, plain.list_of_neighbours)
+                self.assertEqual(indexed.edge_index, Graph(indexed.list_of_neighbours, directed, weighted, True).edge_index)
+                for u in indexed.get_vertices():
+                    for v in indexed.get_vertices():
+                        self.assertEqual(indexed.is_edge(u, v), plain.is_edge(u, v))
+                if weighted:
+                    self.assertEqual(indexed.get_weight(1, 2), 10)
+
+    def test_errors(self):
+        g = self.build(True, True, True)
+        with self.assertRaises(ValueError):
+            g.add_edge(0, 1, 3)
+        with self.assertRaises(ValueError):
+            g.remove_edge(1, 0)
+        with self.assertRaises(ValueError):
+            g.get_weight(5, 4)
+        with self.assertRaises(ValueError):
+            g.set_weight(5, 4, 1)
+
+class TestReverseIndex(unittest.TestCase):
+
+    def test_matches_rebuilt_index(self):
+        for directed in (True, False):
+            for weighted in (True, False):
+                for indexed in (True, False):
+                    g = Graph(directed=directed, weighted=weighted, indexed=indexed, reverse_indexed=True)
+                    plain = Graph(directed=directed, weighted=weighted)
+                    for h in (g, plain):
+                        for v in range(6):
+                            h.add_vertex(v)
+                        for u, v in [(0, 1), (0, 2), (1, 1), (2, 1), (3, 1), (4, 3), (5, 1)]:
+                            h.add_edge(u, v, u * 10 + v)
+                        h.remove_edge(0, 2)
+                        h.remove_vertex(1)
+                        h.add_edge(5, 0, 3)
+                        if weighted:
+                            h.set_weight(4, 3, 99)
+                    self.assertEqual(g.list_of_neighbours, plain.list_of_neighbours)
+                    self.assertEqual(g.reverse_index, Graph(g.list_of_neighbours, directed, weighted, reverse_indexed=True).reverse_index)
+                    for v in g.get_vertices():
+                        self.assertEqual(sorted(map(str, g.inbound_neighbours(v))), sorted(map(str, plain.inbound_neighbours(v))))
+
+    def test_change_if_directed(self):
+        g = Graph(directed=True, weighted=True, reverse_indexed=True)
+        for v in 'abc':
+            g.add_vertex(v)
+        g.add_edge('a', 'b', 2)
+        g.add_edge('b', 'c', 5)
+        g.change_if_directed(False)
+        self.assertEqual(g.reverse_index['a'], {'b': 2})
+        self.assertEqual(g.reverse_index['b'], {'a': 2, 'c': 5})
+
+class TestTraversals(unittest.TestCase):
+
+    def test_bfs_depths_are_hop_distances(self):
+        g = Graph({'A': ['B', 'C'], 'B': ['D'], 'C': ['D'], 'D': ['E'], 'E': []})
+        self.assertEqual(list(g.BFS_iter('A')), [('A', 0), ('B', 1), ('C', 1), ('D', 2), ('E', 3)])
+        self.assertEqual(list(g.DFS_iter('A')), [('A', 0), ('C', 1), ('D', 2), ('E', 3), ('B', 1)])
+        with self.assertRaises(ValueError):
+            g.BFS_levels('Z')
+
+    def test_levels_match_bfs(self):
+        for directed in (True, False):
+            for weighted in (True, False):
+                g = generators.erdos_renyi(200, 1400, 0, directed, weighted)
+                g.build_reverse_index()  # bottom-up steps of a directed graph need in-edges
+                expected = {}
+                for v, depth in g.BFS_iter(0):
+                    expected.setdefault(depth, set()).add(v)
+                for optimizing in (False, True):
+                    levels = {depth: set(layer) for depth, layer in g.BFS_levels(0, direction_optimizing=optimizing)}
+                    self.assertEqual(levels, expected)
+                frozen = {depth: set(layer) for depth, layer in g.freeze().BFS_levels(0, True)}
+                self.assertEqual(frozen, expected)
+
+    def test_direction_optimizing_goes_bottom_up(self):
+        g = generators.erdos_renyi(200, 1400, directed=False, weighted=False)
+        levels = g.BFS_levels(0, direction_optimizing=True)
+        went_bottom_up = False
+        for _ in levels:
+            went_bottom_up |= levels.bottom_up
+        self.assertTrue(went_bottom_up)
+
+class TestMultiSourceBFS(unittest.TestCase):
+
+    def bfs_distances(self, g, source, max_depth=None):
+        distances = {}
+        for v, depth in g.BFS_iter(source):
+            if max_depth is not None and depth > max_depth:
+                break
+            distances[v] = depth
+        return distances
+
+    def test_nearest_source(self):
+        g = generators.erdos_renyi(200, 1400, seed=3)
+        sources = [5, 17, 42]
+        distances, nearest = multi_source_bfs(g, sources + [5])
+        per_source = [self.bfs_distances(g, s) for s in sources]
+        for v, d in distances.items():
+            best = min(p.get(v, float('inf')) for p in per_source)
+            self.assertEqual(d, best)
+            self.assertEqual(per_source[sources.index(nearest[v])][v], d)
+        self.assertEqual(set(distances), set().union(*per_source))
+        distances, _ = multi_source_bfs(g, sources, max_depth=1)
+        self.assertEqual(max(distances.values()), 1)
+        with self.assertRaises(ValueError):
+            multi_source_bfs(g, [999])
+
+    def test_batched_matches_independent_sweeps(self):
+        for directed in (True, False):
+            g = generators.erdos_renyi(200, 1400, 4, directed, weighted=False)
+            sources = list(range(0, 200, 3)) + [0]
+            for max_depth in (None, 2):
+                expected = [self.bfs_distances(g, s, max_depth) for s in sources]
+                self.assertEqual(batched_bfs(g, sources, max_depth, batch_size=16), expected)
+            self.assertEqual(batched_bfs(g.freeze(), sources, processes=2), [self.bfs_distances(g, s) for s in sources])
+        with self.assertRaises(ValueError):
+            batched_bfs(g, sources, batch_size=0)
+
+class TestSharedGraph(unittest.TestCase):
+
+    def test_attach_sees_published_graph(self):
+        g = generators.erdos_renyi(200, 1400, seed=5)
+        with SharedGraph(g) as shared:
+            memory, frozen = attach(shared.name, shared.size)
+            self.assertEqual(frozen.get_e(), g.get_e())
+            self.assertEqual(frozen.list_of_neighbours[7], g.list_of_neighbours[7])
+            del frozen
+            gc.collect()  # the snapshot's views pin the block until they are collected
+            memory.close()
+
+    def test_pool_matches_serial(self):
+        g = generators.erdos_renyi(200, 1400, seed=6)
+        jobs = [(0, v) for v in range(0, 200, 7)]
+        serial = parallel_map(g, dijkstra, jobs, processes=1)
+        with GraphPool(g, processes=2) as pool:
+            parallel = pool.map(dijkstra, jobs)
+            sweeps = pool.map(batched_bfs, [([1, 2], 2)])
+        self.assertEqual([r[:2] for r in parallel], [r[:2] for r in serial])
+        self.assertEqual(sweeps[0], batched_bfs(g, [1, 2], 2))
+        with self.assertRaises(ValueError):
+            GraphPool(g, processes=0)
+
+class TestLoader(unittest.TestCase):
+
+    def write(self, text):
+        fd, path = tempfile.mkstemp(suffix=".txt")
+        with os.fdopen(fd, 'w') as file:
+            file.write(text)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def test_matches_add_edge(self):
+        path = self.write("undirected weighted\nA B 3\nB C 4\nD\nC A 1\nE E 2\n")
+        expected = Graph(directed=False, weighted=True)
+        for v in 'ABCDE':
+            expected.add_vertex(v)
+        for u, v, w in [('A', 'B', 3), ('B', 'C', 4), ('C', 'A', 1), ('E', 'E', 2)]:
+            expected.add_edge(u, v, w)
+        for use_mmap in (False, True):
+            lines = []
+            g = load_edge_list(path, use_mmap=use_mmap, chunk_size=5, progress=lambda n, b: lines.append(n))
+            self.assertEqual(g.list_of_neighbours, expected.list_of_neighbours)
+            self.assertFalse(g.directed)
+            self.assertTrue(g.weighted)
+            self.assertEqual(lines[-1], 6)
+        self.assertEqual(str(Graph.read_from_file(path)), str(expected))
+
+    def test_errors_report_line_numbers(self):
+        with self.assertRaisesRegex(ValueError, "Line 4: edge already exists"):
+            load_edge_list(self.write("undirected unweighted\nA B\nB C\nB A\n"))
+        with self.assertRaisesRegex(ValueError, "Line 3: invalid weight"):
+            load_edge_list(self.write("directed weighted\nA B 1\nB C x\n"))
+        with self.assertRaisesRegex(ValueError, "Line 2: expected 3 fields"):
+            load_edge_list(self.write("directed weighted\nA B\n"))
+
+class TestBinaryFormat(unittest.TestCase):
+
+    def test_round_trip(self):
+        g = Graph(directed=False, weighted=True)
+        for v in ['A', 'B', 'C', 'D']:
+            g.add_vertex(v)
+        g.add_edge('A', 'B', 2)
+        g.add_edge('B', 'C', 3)
+        g.add_edge('A', 'C', 7)
+        g.positions = {'A': (0.0, 0.0), 'B': (1.0, 0.5), 'C': (2.0, 0.0)}
+
+        fd, path = tempfile.mkstemp(suffix=".bin")
+        os.close(fd)
+        self.addCleanup(os.remove, path)
+        g.save_binary(path)
+        loaded = Graph.load_binary(path)
+
+        self.assertFalse(loaded.directed)
+        self.assertTrue(loaded.weighted)
+        self.assertEqual(str(loaded), str(g))
+        self.assertEqual(loaded.positions, g.positions)
+        self.assertEqual(dijkstra(loaded, 'A', 'C')[:2], (['A', 'B', 'C'], 5))
+
+        loaded.save_binary(path)
+        self.assertEqual(str(Graph.load_binary(path)), str(g))
+
+    def test_tuple_labels_round_trip(self):
+        g = generators.random_bipartite(6, 5, 15, seed=2, weighted=True)
+        fd, path = tempfile.mkstemp(suffix=".bin")
+        os.close(fd)
+        self.addCleanup(os.remove, path)
+        g.save_binary(path)
+        loaded = Graph.load_binary(path)
+        self.assertEqual(dict(loaded.list_of_neighbours), g.list_of_neighbours)
+        with SharedGraph(g) as shared:
+            memory, frozen = attach(shared.name, shared.size)
+            self.assertEqual(frozen.neighbours(('L', 0)), g.neighbours(('L', 0)))
+            del frozen
+            gc.collect()
+            memory.close()
+
+        g.add_vertex(frozenset())
+        with self.assertRaisesRegex(ValueError, "Vertex labels must be"):
+            g.save_binary(path)
+
+    def test_rejects_other_files(self):
+        fd, path = tempfile.mkstemp(suffix=".bin")
+        with os.fdopen(fd, 'wb') as file:
+            file.write(b"directed weighted\n" * 4)
+        self.addCleanup(os.remove, path)
+        with self.assertRaises(ValueError):
+            Graph.load_binary(path)
+
+class TestSpatialIndex(unittest.TestCase):
+
+    def setUp(self):
+        rng = random.Random(3)
+        # integer grid coordinates give plenty of exact ties and duplicate points
+        self.points = {i: (float(rng.randint(0, 40)), float(rng.randint(0, 40))) for i in range(500)}
+        self.queries = [(rng.uniform(-5, 45), rng.uniform(-5, 45)) for _ in range(50)]
+
+    def brute_distances(self, points, x, y):
+        return sorted(((px - x) ** 2 + (py - y) ** 2) ** 0.5 for px, py in points.values())
+
+    def assertMatchesBruteForce(self, index, points):
+        self.assertEqual(len(index), len(points))
+        for x, y in self.queries:
+            expected = self.brute_distances(points, x, y)
+            for k in (1, 5):
+                found = index.nearest(x, y, k)
+                self.assertEqual(len(found), min(k, len(points)))
+                for (label, d), e in zip(found, expected):
+                    self.assertAlmostEqual(d, e)
+                    self.assertAlmostEqual(d, ((points[label][0] - x) ** 2 + (points[label][1] - y) ** 2) ** 0.5)
+            within = index.within(x, y, 6.5)
+            self.assertEqual(len(within), sum(1 for d in expected if d <= 6.5))
+            self.assertEqual([d for _, d in within], sorted(d for _, d in within))
+            box = {v for v, (px, py) in points.items() if x - 3 <= px <= x + 4 and y - 2 <= py <= y + 5}
+            self.assertEqual(sorted(index.in_box(x - 3, y - 2, x + 4, y + 5)), sorted(box))
+
+    def test_queries_match_brute_force(self):
+        self.assertMatchesBruteForce(SpatialIndex(self.points), self.points)
+
+    def test_inserts_and_removals(self):
+        rng = random.Random(4)
+        points = dict(list(self.points.items())[:50])
+        index = SpatialIndex(points)
+        for step in range(600):
+            if points and rng.random() < 0.4:
+                label = rng.choice(list(points))
+                del points[label]
+                index.remove(label)
+            else:
+                label = rng.randrange(1000)  # sometimes moves a point that is already there
+                points[label] = (rng.uniform(0, 40), rng.uniform(0, 40))
+                index.insert(label, *points[label])
+            if step % 100 == 0:
+                self.assertMatchesBruteForce(index, points)
+        self.assertMatchesBruteForce(index, points)
+        self.assertNotIn(-1, index)
+
+    def test_nearest_many_keeps_input_order(self):
+        index = SpatialIndex(self.points)
+        self.assertEqual(index.nearest_many(self.queries, 3), [index.nearest(x, y, 3) for x, y in self.queries])
+        self.assertEqual(index.nearest_many([]), [])
+        with self.assertRaises(ValueError):
+            index.nearest(0, 0, 0)
+
+    def test_graph_keeps_index_in_sync(self):
+        g = Graph(directed=False)
+        for v, (x, y) in self.points.items():
+            g.add_vertex(v)
+            g.set_position(v, x, y)
+        unindexed = [g.nearest_vertex(x, y) for x, y in self.queries]
+        g.build_spatial_index()
+        for (x, y), v in zip(self.queries, unindexed):
+            # ties may snap to a different vertex at the same distance
+            snapped = g.positions[g.nearest_vertex(x, y)]
+            self.assertAlmostEqual((snapped[0] - x) ** 2 + (snapped[1] - y) ** 2,
+                                   (g.positions[v][0] - x) ** 2 + (g.positions[v][1] - y) ** 2)
+        for v in range(0, 500, 2):
+            g.remove_vertex(v)
+        g.add_vertex('far')
+        g.set_position('far', 1000.0, 1000.0)
+        self.assertEqual(g.nearest_vertex(999.0, 999.0), 'far')
+        self.assertNotIn(0, g.positions)
+        self.assertEqual(len(g.spatial_index), len(g.positions))
+        for x, y in self.queries:
+            v = g.nearest_vertex(x, y)
+            self.assertEqual(v % 2, 1)
+        with self.assertRaises(ValueError):
+            Graph().nearest_vertex(0, 0)
+
+        direct = Graph()
+        direct.build_spatial_index()  # empty, then positions are assigned around it
+        direct.add_vertex('a')
+        direct.positions['a'] = (1.0, 2.0)
+        self.assertEqual(direct.nearest_vertex(0, 0), 'a')
+        direct.add_vertex('b')
+        direct.set_position('b', 50.0, 50.0)
+        direct.positions['a'] = (100.0, 100.0)  # moved without changing the number of positions
+        self.assertEqual(direct.nearest_vertex(99, 99), 'a')
+        direct.set_position('b', 0.0, 0.0)  # through the graph again, the stale index is still rebuilt
+        direct.positions['a'] = (60.0, 60.0)
+        self.assertEqual(direct.nearest_vertex(70, 70), 'a')
+        self.assertEqual(direct.nearest_vertex(1, 1), 'b')
+        direct.positions = {'a': (5.0, 5.0), 'b': (90.0, 90.0)}  # replaced wholesale
+        self.assertEqual(direct.nearest_vertex(1, 1), 'a')
+        direct.positions['b'] = (2.0, 2.0)
+        self.assertEqual(direct.nearest_vertex(1, 1), 'b')
+        compact = CompactGraph.from_graph(direct)
+        compact.build_spatial_index()
+        compact.positions['a'] = (0.0, 0.0)
+        self.assertEqual(compact.nearest_vertex(1, 1), 'a')
+
+class TestGenerators(unittest.TestCase):
+
+    def assertSameGraph(self, a, b):
+        self.assertEqual(a.list_of_neighbours, b.list_of_neighbours)
+        self.assertEqual(a.positions, b.positions)
+
+    def test_seeded_and_well_formed(self):
+        cases = [
+            (generators.grid_network, (6, 7), dict(directed=True, drop=0.1)),
+            (generators.grid_network, (6, 7), dict()),
+            (generators.grid_network, (6, 7), dict(diagonal=True)),
+            (generators.random_geometric, (40, 150), dict()),
+            (generators.random_geometric, (40, 150), dict(directed=False)),
+            (generators.erdos_renyi, (50, 200), dict()),
+            (generators.erdos_renyi, (50, 200), dict(directed=False, weighted=False)),
+            (generators.barabasi_albert, (200, 3), dict()),
+            (generators.random_dag, (60, 300), dict()),
+            (generators.random_bipartite, (20, 30, 100), dict()),
+            (generators.random_bipartite, (20, 30, 100), dict(weighted=True, min_weight=-5, floats=True)),
+        ]
+        for generator, args, kwargs in cases:
+            g = generator(*args, seed=5, **kwargs)
+            self.assertSameGraph(g, generator(*args, seed=5, **kwargs))
+            self.assertNotEqual(g.list_of_neighbours, generator(*args, seed=6, **kwargs).list_of_neighbours)
+            for u, edges in g.list_of_neighbours.items():
+                targets = [e[0] for e in edges] if g.weighted else edges
+                self.assertEqual(len(targets), len(set(targets)))
+                self.assertNotIn(u, targets)
+                for e in edges:
+                    v = e[0] if g.weighted else e
+                    if not g.directed:
+                        self.assertTrue(g.is_edge(v, u))
+
+        self.assertEqual(generators.erdos_renyi(50, 200).get_e(), 200)
+        self.assertEqual(generators.erdos_renyi(50, 200, directed=False).get_e(), 400)  # both directions counted
+        self.assertIsNotNone(topological_sort(generators.random_dag(60, 300)))
+        for grid in (generators.grid_network(5, 5), generators.grid_network(5, 5, diagonal=True),
+                     generators.random_geometric(30, 100, directed=False)):
+            for u in grid.get_vertices():
+                for v, w in grid.neighbours(u):
+                    self.assertGreaterEqual(w, grid.euclidean_distance(u, v))
+        self.assertEqual(len(generators.grid_network(5, 5, diagonal=True).neighbours(6)), 8)
+        weights = [w for edges in generators.random_dag(30, 100, min_weight=-5, max_weight=10).list_of_neighbours.values()
+                   for _, w in edges]
+        self.assertTrue(all(-5 <= w <= 10 for w in weights) and min(weights) < 0)
+        with self.assertRaises(ValueError):
+            generators.erdos_renyi(3, 4, directed=False)
+
+    def test_barabasi_albert_has_hubs(self):
+        g = generators.barabasi_albert(2000, 2)
+        degrees = sorted(len(edges) for edges in g.list_of_neighbours.values())
+        self.assertEqual(degrees[0], 2)
+        self.assertGreater(degrees[-1], 10 * degrees[len(degrees) // 2])
+
+class TestBenchmark(unittest.TestCase):
+
+    def test_runs_every_scenario(self):
+        report = run_suite(60, repeat=1)
+        self.assertEqual(list(report["results"]), [name for name, _, _ in SCENARIOS])
+        for entry in report["results"].values():
+            self.assertGreaterEqual(entry["seconds"], 0)
+            self.assertGreater(entry["peak_bytes"], 0)
+        self.assertIn("pq_pops", report["results"]["shortest_path/dijkstra"]["stats"])
+
+        slower = json.loads(json.dumps(report))
+        slower["results"]["freeze"]["seconds"] = report["results"]["freeze"]["seconds"] * 3 + 1
+        rows = {row[0]: row for row in compare(slower, report)}
+        self.assertTrue(rows["freeze"][4])
+        self.assertFalse(rows["traversal/bfs"][4])
+
+    def test_filters_scenarios(self):
+        report = run_suite(40, repeat=1, only=["dag/*"])
+        self.assertEqual(sorted(report["results"]), ["dag/critical_path", "dag/topological_sort"])
+        with self.assertRaises(ValueError):
+            run_suite(40, only=["nothing"])
+        with self.assertRaises(ValueError):
+            compare(report, run_suite(50, repeat=1, only=["dag/*"]))
+
+class TestInstrumentation(unittest.TestCase):
+
+    def test_disabled_by_default(self):
+        self.assertIsNone(instrument.recorder)
+        instrument.count("ignored")
+        with instrument.phase("ignored"):
+            pass
+
+    def test_counters_and_spans(self):
+        g = generators.grid_network(8, 8)
+        sink = MemorySink()
+        with instrument.recording(sink) as recorder:
+            path, cost, stats = dijkstra(g, 0, 63)
+            a_star(g.freeze(), 0, 63)
+            g.add_vertex('new')
+            g.add_edge('new', 0, 5)
+            self.assertEqual(sum(1 for _ in g.BFS_iter(0)), 65)
+            topological_sort(generators.random_dag(30, 60))
+            maximum_matching_bipartite(generators.random_bipartite(20, 20, 60))
+        self.assertIsNone(instrument.recorder)
+
+        counters = recorder.counters
+        self.assertEqual(counters["dijkstra.pq_pops"], stats["pq_pops"])
+        self.assertEqual(counters["graph.add_edge"], 1)
+        self.assertEqual(counters["graph.add_vertex"], 1)
+        self.assertEqual(counters["bfs.vertices"], 65)
+        self.assertEqual(counters["bfs.edges_scanned"], g.get_e())
+        self.assertGreater(counters["matching.phases"] + counters["matching.greedy_pairs"], 0)
+
+        events = [record["event"] for record in sink.records]
+        for name in ("dijkstra", "freeze", "a_star", "topological_sort", "matching.colour", "matching.augment",
+                     "maximum_matching_bipartite", "summary"):
+            self.assertIn(name, events)
+        self.assertEqual(events[-1], "summary")
+        # phases nest inside their operation and report their own counters
+        matching = next(r for r in sink.records if r["event"] == "maximum_matching_bipartite")
+        augment = next(r for r in sink.records if r["event"] == "matching.augment")
+        self.assertLessEqual(augment["seconds"], matching["seconds"])
+        self.assertIn("matching.phases", matching["counters"])
+        self.assertEqual(recorder.summary()["timers"]["dijkstra"]["calls"], 1)
+
+    def test_memory_and_sinks(self):
+        stream = io.StringIO()
+        logger = logging.getLogger("graph.test")
+        logger.propagate = False
+        handler = logging.StreamHandler(io.StringIO())
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        try:
+            with instrument.recording(JSONLinesSink(stream), LoggingSink(logger), memory=True) as recorder:
+                with instrument.phase("outer"):
+                    with instrument.phase("inner"):
+                        data = [0] * 100000
+                    del data
+                recorder.snapshot("after")
+        finally:
+            logger.removeHandler(handler)
+
+        records = [json.loads(line) for line in stream.getvalue().splitlines()]
+        self.assertEqual([r["event"] for r in records], ["inner", "outer", "memory_snapshot", "summary"])
+        inner, outer = records[0], records[1]
+        self.assertGreaterEqual(inner["peak_bytes"], 790000)  # a list of 100000 pointers
+        self.assertGreaterEqual(outer["peak_bytes"], inner["peak_bytes"])
+        self.assertLess(outer["memory_bytes"], 790000)
+        self.assertEqual(len(handler.stream.getvalue().splitlines()), 4)
+        with self.assertRaises(ValueError):
+            instrument.Recorder().snapshot("no tracing")
+
+class TestCompactGraph(unittest.TestCase):
+
+    def assertSameGraph(self, compact, g):
+        self.assertEqual(dict(compact.list_of_neighbours), g.list_of_neighbours)
+        self.assertEqual(compact.get_v(), g.get_v())
+        self.assertEqual(compact.get_e(), g.get_e())
+
+    def test_random_mutations_match_graph(self):
+        for directed, weighted, reverse_indexed in itertools.product((True, False), repeat=3):
+            rng = random.Random(7)
+            g = Graph(directed=directed, weighted=weighted, reverse_indexed=reverse_indexed)
+            compact = CompactGraph(directed=directed, weighted=weighted)
+            if reverse_indexed:
+                compact.build_reverse_index()
+            next_vertex = 0
+            for step in range(3000):
+                roll = rng.random()
+                vertices = g.get_vertices()
+                if roll < 0.1 or len(vertices) < 2:
+                    for h in (g, compact):
+                        h.add_vertex(f"v{next_vertex}")
+                    next_vertex += 1
+                elif roll < 0.7:
+                    u, v = rng.sample(vertices, 2)
+                    w = rng.randint(1, 9)
+                    if g.is_edge(u, v):
+                        self.assertTrue(compact.is_edge(u, v))
+                        with self.assertRaises(ValueError):
+                            compact.add_edge(u, v, w)
+                    else:
+                        self.assertFalse(compact.is_edge(u, v))
+                        g.add_edge(u, v, w)
+                        compact.add_edge(u, v, w)
+                elif roll < 0.85:
+                    u = rng.choice(vertices)
+                    edges = g.neighbours(u)
+                    if edges:
+                        v = rng.choice(edges)[0] if weighted else rng.choice(edges)
+                        g.remove_edge(u, v)
+                        compact.remove_edge(u, v)
+                elif roll < 0.9:
+                    v = rng.choice(vertices)
+                    g.remove_vertex(v)
+                    compact.remove_vertex(v)
+                elif weighted:
+                    u = rng.choice(vertices)
+                    for v, w in g.neighbours(u):
+                        self.assertEqual(compact.get_weight(u, v), w)
+                        if not directed or not g.is_edge(v, u) or rng.random() < 0.5:
+                            w = w + 1 if rng.random() < 0.9 else w + 0.5
+                            g.set_weight(u, v, w)
+                            compact.set_weight(u, v, w)
+                if step % 500 == 0:
+                    self.assertSameGraph(compact, g)
+                    self.assertEqual(compact.reverse_index, g.reverse_index)
+                    if weighted:  # ints stay ints next to float weights
+                        self.assertEqual([type(w) for u in g.get_vertices() for _, w in compact.neighbours(u)],
+                                         [type(w) for u in g.get_vertices() for _, w in g.neighbours(u)])
+            self.assertSameGraph(compact, g)
+            for v in g.get_vertices():
+                self.assertEqual(sorted(compact.inbound_neighbours(v), key=str),
+                                 sorted(g.inbound_neighbours(v), key=str))
+                self.assertEqual(compact.out_degree(v), len(g.neighbours(v)))
+            compact.pack()
+            self.assertEqual(compact.garbage, 0)
+            self.assertEqual(len(compact.targets), compact.get_e())
+            self.assertSameGraph(compact, g)
+            self.assertEqual(compact.thaw().list_of_neighbours, g.list_of_neighbours)
+
+            for h in (g, compact):
+                h.change_if_weighted(not weighted)
+                h.change_if_directed(not directed)
+            self.assertEqual({v: sorted(e, key=str) for v, e in compact.list_of_neighbours.items()},
+                             {v: sorted(e, key=str) for v, e in g.list_of_neighbours.items()})
+            self.assertEqual(compact.reverse_index, g.reverse_index)
+
+    def test_index_consumers(self):
+        g = generators.erdos_renyi(60, 240, seed=5, directed=True)
+        compact = CompactGraph.from_graph(g)
+        compact.build_edge_index()  # nothing to build, lookups scan the blocks
+        self.assertIsNone(compact.edge_index)
+        tree = DynamicShortestPathTree(compact, 0)
+        rng = random.Random(5)
+        for _ in range(20):
+            u, v = rng.sample(range(60), 2)
+            tree.apply([(u, v, None if compact.is_edge(u, v) else rng.randint(1, 9))])
+            expected = shortest_path_tree(compact, 0)
+            self.assertEqual({t: tree.distance(t) for t in range(60)}, {t: expected.distance(t) for t in range(60)})
+        compact.build_reverse_index()
+        self.assertEqual([(depth, sorted(level)) for depth, level in compact.BFS_levels(0, direction_optimizing=True)],
+                         [(depth, sorted(level)) for depth, level in compact.thaw().BFS_levels(0)])
+        self.assertEqual(bidirectional_dijkstra(compact, 0, 59)[1], dijkstra(compact, 0, 59)[1])
+        compact.remove_vertex(3)
+        self.assertEqual(compact.reverse_index, Graph(dict(compact.list_of_neighbours), True, True, reverse_indexed=True).reverse_index)
+        compact.drop_reverse_index()
+        compact.drop_edge_index()
+        self.assertIsNone(compact.reverse_index)
+
+    def test_errors_match_graph(self):
+        compact = CompactGraph(directed=False, weighted=True)
+        compact.add_vertex("a")
+        compact.add_vertex("b")
+        compact.add_edge("a", "b", 2)
+        for call, message in [(lambda: compact.add_vertex("a"), "Vertex already in Graph"),
+                              (lambda: compact.add_edge("a", "c"), "Vertices do not exist"),
+                              (lambda: compact.add_edge("b", "a"), "Edge already exists"),
+                              (lambda: compact.remove_edge("a", "a"), "Edge does not exist"),
+                              (lambda: compact.get_weight("a", "c"), "Edge does not exist"),
+                              (lambda: compact.get_weight("c", "a"), "Start vertex does not exist"),
+                              (lambda: compact.neighbours("c"), "Vertex not in Graph"),
+                              (lambda: compact.remove_vertex("c"), "Vertex does not exist")]:
+            with self.assertRaisesRegex(ValueError, message):
+                call()
+        with self.assertRaises(AttributeError):
+            compact.extra = 1  # __slots__, no per-instance dict
+
+    def test_weights_widen(self):
+        compact = CompactGraph(weighted=True)
+        for v in range(3):
+            compact.add_vertex(v)
+        compact.add_edge(0, 1, 5)
+        self.assertEqual(compact.weights.typecode, 'i')
+        compact.add_edge(0, 2, 2 ** 40)
+        self.assertEqual(compact.weights.typecode, 'q')
+        compact.set_weight(0, 1, 0.5)
+        self.assertEqual(compact.weights.typecode, 'd')
+        self.assertEqual(compact.neighbours(0), [(1, 0.5), (2, 2 ** 40)])
+        self.assertIs(type(compact.get_weight(0, 2)), int)  # ints stay ints once the buffer holds floats
+        compact.add_vertex(3)
+        compact.add_edge(3, 0, 1)
+        compact.remove_edge(0, 1)
+        compact.pack()
+        self.assertEqual(compact.neighbours(0), [(2, 2 ** 40)])
+        self.assertIs(type(compact.get_weight(3, 0)), int)
+        compact.set_weight(3, 0, 2.5)
+        self.assertEqual(compact.get_weight(3, 0), 2.5)
+
+        version = compact.version
+        for call in (lambda: compact.add_edge(0, 2), lambda: compact.remove_edge(2, 0),
+                     lambda: compact.set_weight(2, 0, 1)):
+            with self.assertRaises(ValueError):
+                call()
+        self.assertEqual(compact.version, version)
+
+        fd, path = tempfile.mkstemp(suffix=".bin")
+        os.close(fd)
+        self.addCleanup(os.remove, path)
+        small = CompactGraph(weighted=True)
+        for v in 'ab':
+            small.add_vertex(v)
+        small.add_edge('a', 'b', 3)
+        small.save_binary(path)
+        self.assertEqual(Graph.load_binary(path).get_weight('a', 'b'), 3)
+
+        g = Graph({0: [(1, 1.5)], 1: []}, weighted=True)
+        self.assertEqual(CompactGraph.from_graph(g).get_weight(0, 1), 1.5)
+
+    def test_load_compact_matches_loader(self):
+        for header, directed in (("directed weighted", True), ("undirected weighted", False)):
+            source = generators.erdos_renyi(300, 1500, seed=3, directed=directed)
+            fd, path = tempfile.mkstemp(suffix=".txt")
+            os.close(fd)
+            self.addCleanup(os.remove, path)
+            with open(path, 'w') as file:
+                file.write(header + "\n")
+                for u, edges in source.list_of_neighbours.items():
+                    file.write(f"{u}\n")
+                    for v, w in edges:
+                        if directed or u < v:
+                            file.write(f"{u} {v} {w}\n")
+            expected = load_edge_list(path)
+            with instrument.recording() as recorder:
+                compact = load_compact(path, chunk_size=64)
+            self.assertSameGraph(compact, expected)
+            self.assertEqual(compact.garbage, 0)
+            self.assertEqual(recorder.summary()["counters"]["load_compact.lines"],
+                             1500 + 300)
+            self.assertEqual(str(compact), str(expected))
+
+        with open(path, 'a') as file:
+            file.write("0 1 1\n1 0 1\n")
+        with self.assertRaisesRegex(ValueError, "edge already exists"):
+            load_compact(path)
+
+    def test_algorithms_on_compact_and_frozen(self):
+        grid = generators.grid_network(12, 12, seed=2, drop=0.1)
+        compact = CompactGraph.from_graph(grid)
+        compact.remove_vertex(5)
+        compact.add_vertex(5)  # reuses the freed id, so freezing has to renumber
+        grid.remove_vertex(5)
+        grid.add_vertex(5)
+        compact.set_position(5, 500.0, 0.0)
+        grid.set_position(5, 500.0, 0.0)
+        frozen = compact.freeze()
+        self.assertEqual(dict(frozen.list_of_neighbours), grid.list_of_neighbours)
+        for h in (compact, frozen):
+            self.assertEqual(dijkstra(h, 0, 143)[:2], dijkstra(grid, 0, 143)[:2])
+            self.assertEqual(a_star(h, 0, 143)[1], a_star(grid, 0, 143)[1])
+        self.assertEqual(list(compact.BFS_iter(0)), list(grid.BFS_iter(0)))
+        self.assertEqual(compact.nearest_vertex(480, 10), 5)
+
+        bipartite = generators.random_bipartite(30, 30, 120, seed=4)
+        self.assertEqual(len(maximum_matching_bipartite(CompactGraph.from_graph(bipartite))),
+                         len(maximum_matching_bipartite(bipartite)))
+        dag = generators.random_dag(80, 300, seed=1)
+        self.assertEqual(topological_sort(CompactGraph.from_graph(dag)), topological_sort(dag))
+
+if __name__ == "__main__":
+    unittest.main()